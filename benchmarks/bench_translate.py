@@ -0,0 +1,267 @@
+"""
+Сквозные бенчмарки перевода против локального мок-сервера OpenAI и
+фейкового googletrans. Каждый сценарий идёт в отдельном процессе с пустыми
+кэшами во временной папке; сеть не нужна.
+
+    python benchmarks/bench_translate.py                 # все сценарии
+    python benchmarks/bench_translate.py --quick --json results.json
+    python benchmarks/bench_translate.py --scenario concurrent --latency 0.2
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import types
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIOS = ["single", "concurrent", "stream", "batch", "document", "detect", "google", "faults", "gui_worker"]
+
+_NOUNS = (
+    "weather station morning coffee window garden river market letter evening music friend office "
+    "ticket museum summer winter bridge forest village doctor teacher kitchen street message answer "
+    "question holiday airport picture library mountain"
+).split()
+_ADJECTIVES = "quiet busy old new small large cold warm bright early late strange".split()
+_VERBS = "walked went drove looked wrote talked listened waited".split()
+
+
+def make_texts(count, seed, words=(6, 14)):
+    # Обычные английские предложения, чтобы локальный детектор языка узнавал
+    # их как в жизни. Без цифр: иначе память переводов подставит числа и
+    # запрос не уйдёт
+    rng = random.Random(seed)
+    texts = set()
+    while len(texts) < count:
+        parts = [f"the {rng.choice(_ADJECTIVES)} {rng.choice(_NOUNS)}"]
+        while len(" ".join(parts).split()) < rng.randint(*words):
+            parts.append(rng.choice([
+                f"and we {rng.choice(_VERBS)} to the {rng.choice(_NOUNS)}",
+                f"with a {rng.choice(_ADJECTIVES)} {rng.choice(_NOUNS)}",
+                f"was {rng.choice(_ADJECTIVES)} this {rng.choice(_NOUNS)}",
+                f"because the {rng.choice(_NOUNS)} is {rng.choice(_ADJECTIVES)}",
+            ]))
+        texts.add(" ".join(parts).capitalize() + ".")
+    return sorted(texts)
+
+
+def percentiles(samples):
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+
+    def pick(q):
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+
+    return {"p50_ms": pick(0.5), "p95_ms": pick(0.95), "p99_ms": pick(0.99), "max_ms": ordered[-1] * 1000}
+
+
+def max_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux — килобайты, macOS — байты
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+# --- дочерний процесс: один сценарий ---
+
+def setup(args, google=False):
+    os.chdir(tempfile.mkdtemp(prefix="translate-bench-"))
+    from mock_server import FakeGoogleTranslator, MockOpenAIServer
+    server = MockOpenAIServer(
+        latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+    ).start()
+    config = types.ModuleType("config")
+    config.OPENAI_API_KEY = "bench"
+    config.OPENAI_BASE_URL = server.base_url
+    config.MODEL_NAME = "bench-model"
+    config.HOTKEY = "ctrl+shift+t"
+    sys.modules["config"] = config
+    import http_client
+    import translator
+    fake_google = None
+    if google:
+        fake_google = FakeGoogleTranslator(latency=args.latency * 0.6, jitter=args.jitter, error_rate=args.error_rate)
+        http_client._google_translator = fake_google
+        http_client.HAS_GOOGLETRANS = True
+    translator.HAS_GOOGLETRANS = google
+    return server, fake_google, translator
+
+
+def timed(func, *args, **kwargs):
+    started = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - started, result
+
+
+def run_scenario(args):
+    name = args.scenario
+    scale = 0.25 if args.quick else 1.0
+    google = name == "google"
+    if name == "faults":
+        args.error_rate = args.error_rate or 0.1
+        args.rate_limit_rate = args.rate_limit_rate or 0.1
+    server, fake_google, translator = setup(args, google=google)
+    latencies, extra = [], {}
+    errors = 0
+    started = time.perf_counter()
+
+    if name in ("single", "google", "faults"):
+        texts = make_texts(int(60 * scale), seed=1)
+        for text in texts:
+            seconds, result = timed(translator.translate_text, text, "Russian", "ru")
+            latencies.append(seconds)
+            errors += isinstance(result, translator.ErrorText)
+        ops = len(texts)
+    elif name == "concurrent":
+        texts = make_texts(int(240 * scale), seed=2)
+        with ThreadPoolExecutor(max_workers=args.threads) as pool:
+            results = list(pool.map(lambda t: timed(translator.translate_text, t, "Russian", "ru"), texts))
+        latencies = [seconds for seconds, _ in results]
+        errors = sum(isinstance(result, translator.ErrorText) for _, result in results)
+        ops = len(texts)
+    elif name == "stream":
+        first_tokens = []
+        for text in make_texts(int(40 * scale), seed=3):
+            begin = time.perf_counter()
+            first = None
+            for piece in translator.translate_text_stream(text, "Russian", "ru"):
+                if first is None:
+                    first = time.perf_counter() - begin
+            latencies.append(time.perf_counter() - begin)
+            first_tokens.append(first or latencies[-1])
+        extra["first_token"] = percentiles(first_tokens)
+        ops = len(latencies)
+    elif name == "batch":
+        texts = make_texts(int(400 * scale), seed=4, words=(1, 4))
+        for _ in range(3):
+            chunk = texts[:]
+            seconds, results = timed(translator.translate_batch, chunk, "Russian", "ru")
+            latencies.append(seconds)
+            errors += sum(isinstance(result, translator.ErrorText) for result in results)
+            texts = [t + " again" for t in texts]  # новые строки, чтобы не попадать в кэш
+        ops = len(chunk) * len(latencies)
+        extra["strings_per_call"] = len(chunk)
+    elif name == "document":
+        paragraphs = make_texts(int(400 * scale), seed=5, words=(20, 40))
+        document = "\n\n".join(paragraphs)
+        seconds, _ = timed(translator.translate_document, document, "Russian", "ru")
+        latencies.append(seconds)
+        extra["chars"] = len(document)
+        ops = 1
+    elif name == "detect":
+        texts = make_texts(int(150 * scale), seed=6) + ["ok", "da", "Hola amigo", "Привет, как дела?"] * 10
+        for text in texts:
+            seconds, _ = timed(translator.detect_language, text)
+            latencies.append(seconds)
+        ops = len(texts)
+    elif name == "gui_worker":
+        os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+        from PyQt5.QtWidgets import QApplication
+        app = QApplication.instance() or QApplication([])
+        import gui
+        for text in make_texts(int(40 * scale), seed=7):
+            worker = gui.TranslateWorker(text, "Russian", "ru", stream=True)
+            seconds, _ = timed(worker.run)
+            latencies.append(seconds)
+        app.processEvents()
+        ops = len(latencies)
+    else:
+        raise SystemExit(f"Неизвестный сценарий: {name}")
+
+    wall = time.perf_counter() - started
+    backend_requests = server.requests + (fake_google.requests if fake_google else 0)
+    result = {
+        "scenario": name,
+        "ops": ops,
+        "errors": errors,
+        "throughput_ops_s": ops / wall if wall else 0.0,
+        "requests": backend_requests,
+        "requests_per_op": backend_requests / ops if ops else 0.0,
+        "statuses": server.statuses,
+        "models": server.models,
+        "prompt_chars_per_request": server.prompt_chars / server.requests if server.requests else 0.0,
+        "max_rss_mb": max_rss_mb(),
+        **percentiles(latencies),
+        **extra,
+    }
+    server.stop()
+    print("RESULT " + json.dumps(result), flush=True)
+
+
+# --- родительский процесс ---
+
+def spawn(scenario, args):
+    command = [
+        sys.executable, os.path.abspath(__file__), "--child", "--scenario", scenario,
+        "--latency", str(args.latency), "--jitter", str(args.jitter), "--threads", str(args.threads),
+        "--error-rate", str(args.error_rate), "--rate-limit-rate", str(args.rate_limit_rate),
+    ]
+    if args.quick:
+        command.append("--quick")
+    process = subprocess.run(command, capture_output=True, text=True, timeout=args.timeout)
+    line = next((line for line in process.stdout.splitlines() if line.startswith("RESULT ")), None)
+    if line is None:
+        return {"scenario": scenario, "failed": (process.stderr or process.stdout)[-1500:]}
+    return json.loads(line[len("RESULT "):])
+
+
+def print_table(results):
+    header = f"{'scenario':<11} {'ops':>5} {'err':>4} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'ops/s':>8} {'req/op':>7} {'RSS MB':>7}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        if "failed" in r:
+            print(f"{r['scenario']:<11} FAILED: {r['failed'].strip().splitlines()[-1] if r['failed'].strip() else '?'}")
+            continue
+        rss = f"{r['max_rss_mb']:.0f}" if r.get("max_rss_mb") else "-"
+        print(f"{r['scenario']:<11} {r['ops']:>5} {r['errors']:>4} {r.get('p50_ms', 0):>8.1f} {r.get('p95_ms', 0):>8.1f} "
+              f"{r.get('p99_ms', 0):>8.1f} {r['throughput_ops_s']:>8.1f} {r['requests_per_op']:>7.2f} {rss:>7}")
+        if "first_token" in r:
+            print(f"{'':<11} first token p50 {r['first_token']['p50_ms']:.1f} ms, p95 {r['first_token']['p95_ms']:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", action="append", choices=SCENARIOS, help="можно указать несколько раз")
+    parser.add_argument("--latency", type=float, default=0.05, help="задержка ответа сервера, с")
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="доля ответов 500")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="доля ответов 429")
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--quick", action="store_true", help="уменьшенные объёмы для CI")
+    parser.add_argument("--json", help="сохранить результаты в файл")
+    parser.add_argument("--timeout", type=float, default=600)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        args.scenario = args.scenario[0]
+        run_scenario(args)
+        return
+
+    results = []
+    for scenario in args.scenario or SCENARIOS:
+        results.append(spawn(scenario, args))
+        print(f"  {scenario}: done", file=sys.stderr)
+    print_table(results)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if any("failed" in r for r in results):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
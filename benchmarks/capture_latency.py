@@ -0,0 +1,75 @@
+"""
+Задержка "горячая клавиша → текст" на фейковом буфере обмена: событийный
+захват SelectionCapture против прежней фиксированной паузы 0.1 с.
+Работает на любой платформе:
+
+    python benchmarks/capture_latency.py --runs 20
+"""
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from clipboard_capture import FakeClipboardBackend, SelectionCapture
+
+# Сколько "приложению" нужно, чтобы положить выделение в буфер
+COPY_DELAYS = [0.005, 0.03, 0.08, 0.15, 0.3]
+LEGACY_SLEEP = 0.1
+
+
+def legacy_capture(backend):
+    # Как было в HotkeyHandler.copy_selected_text: Ctrl+C и фиксированная пауза
+    backend.send_copy()
+    time.sleep(LEGACY_SLEEP)
+    return backend.get_text()
+
+
+def measure(copy_delay, runs, legacy):
+    latencies, correct = [], 0
+    for i in range(runs):
+        selection = f"selected text {i}"
+        backend = FakeClipboardBackend(selection=selection, copy_delay=copy_delay, text="old clipboard")
+        started = time.perf_counter()
+        if legacy:
+            text = legacy_capture(backend)
+        else:
+            # Через capture_async, как из хука клавиатуры
+            done = threading.Event()
+            result = []
+            SelectionCapture(backend).capture_async(lambda t: (result.append(t), done.set()))
+            done.wait()
+            text = result[0]
+        latencies.append(time.perf_counter() - started)
+        correct += text == selection
+        if not legacy and backend.get_text() != "old clipboard":
+            print("  ! буфер обмена не восстановлен")
+        time.sleep(max(0.0, copy_delay - latencies[-1]) + 0.01)  # дать фейку "доиграть"
+    return latencies, correct
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'copy delay':>10}  {'mode':<8} {'p50 ms':>8} {'max ms':>8}  correct")
+    for copy_delay in COPY_DELAYS:
+        for legacy in (True, False):
+            latencies, correct = measure(copy_delay, args.runs, legacy)
+            print(f"{copy_delay * 1000:8.0f}ms  {'sleep' if legacy else 'event':<8} "
+                  f"{statistics.median(latencies) * 1000:8.1f} {max(latencies) * 1000:8.1f}  "
+                  f"{correct}/{args.runs}")
+
+    # Ничего не выделено: буфер не меняется, ждём до таймаута и не отдаём старый текст
+    backend = FakeClipboardBackend(selection=None, text="old clipboard")
+    started = time.perf_counter()
+    text = SelectionCapture(backend).capture()
+    print(f"\nNo selection: {(time.perf_counter() - started) * 1000:.0f} ms, returned {text!r}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""
+Локальные заменители бэкендов для бенчмарков: OpenAI-совместимый сервер
+(/chat/completions) и фейковый клиент googletrans. Задержка, джиттер,
+стриминг, ошибки и 429 настраиваются; requests_per_minute включает настоящий
+лимит со скользящим окном и заголовками x-ratelimit-*, как у OpenAI;
+truncate_at обрезает ответ с finish_reason "length", как при упоре в max_tokens.
+"""
+import json
+import random
+import re
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class MockOpenAIServer:
+    def __init__(self, latency=0.05, jitter=0.02, error_rate=0.0, rate_limit_rate=0.0,
+                 retry_after=0.1, stream_chunk=8, port=0, seed=0, requests_per_minute=None, truncate_at=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.stream_chunk = stream_chunk
+        self.requests_per_minute = requests_per_minute
+        self.truncate_at = truncate_at
+        self._accepted = deque()
+        self.requests = 0
+        self.statuses = {}
+        self.models = {}
+        self.prompt_chars = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}/v1"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="mock-openai", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def reset_counters(self):
+        with self._lock:
+            self.requests = 0
+            self.statuses = {}
+            self.models = {}
+            self.prompt_chars = 0
+
+    def _next_outcome(self, body):
+        with self._lock:
+            self.requests += 1
+            self.models[body.get("model")] = self.models.get(body.get("model"), 0) + 1
+            self.prompt_chars += sum(len(message["content"]) for message in body["messages"])
+            roll = self._random.random()
+            delay = max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+            headers = {}
+            if self.requests_per_minute:
+                now = time.monotonic()
+                while self._accepted and now - self._accepted[0] >= 60:
+                    self._accepted.popleft()
+                if len(self._accepted) >= self.requests_per_minute:
+                    retry_after = 60 - (now - self._accepted[0])
+                    return 429, delay, {"Retry-After": f"{retry_after:.3f}",
+                                        "x-ratelimit-limit-requests": str(self.requests_per_minute),
+                                        "x-ratelimit-remaining-requests": "0"}
+                self._accepted.append(now)
+                headers = {"x-ratelimit-limit-requests": str(self.requests_per_minute),
+                           "x-ratelimit-remaining-requests": str(self.requests_per_minute - len(self._accepted))}
+        if roll < self.rate_limit_rate:
+            return 429, delay, {"Retry-After": str(self.retry_after)}
+        if roll < self.rate_limit_rate + self.error_rate:
+            return 500, delay, headers
+        return 200, delay, headers
+
+    def _count(self, status):
+        with self._lock:
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Иначе Nagle + delayed ACK добавляют ~40 мс к каждому ответу
+            disable_nagle_algorithm = True
+
+            def log_message(self, *args):
+                pass
+
+            def do_HEAD(self):
+                self.send_response(200)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                status, delay, headers = server._next_outcome(body)
+                time.sleep(delay)
+                server._count(status)
+                if status != 200:
+                    data = json.dumps({"error": {"message": "injected", "code": status}}).encode()
+                    self.send_response(status)
+                    for name, value in headers.items():
+                        self.send_header(name, value)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                    return
+                content = reply_for(body["messages"])
+                finish_reason = "stop"
+                if server.truncate_at is not None and len(content) > server.truncate_at:
+                    content, finish_reason = content[:server.truncate_at], "length"
+                if body.get("stream"):
+                    self._stream(content, headers, finish_reason)
+                    return
+                data = json.dumps({"choices": [{"message": {"content": content}, "finish_reason": finish_reason}]},
+                                  ensure_ascii=False).encode()
+                self.send_response(200)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _stream(self, content, headers, finish_reason="stop"):
+                self.send_response(200)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                step = server.stream_chunk
+                pieces = [content[i:i + step] for i in range(0, len(content), step)] + [finish_reason, None]
+                for i, piece in enumerate(pieces):
+                    if piece is None:
+                        event = "data: [DONE]\n\n"
+                    elif i == len(pieces) - 2:
+                        # Последний чанк — пустая дельта с причиной остановки
+                        event = "data: " + json.dumps({"choices": [{"delta": {}, "finish_reason": piece}]}) + "\n\n"
+                    else:
+                        event = "data: " + json.dumps({"choices": [{"delta": {"content": piece}}]}) + "\n\n"
+                    data = event.encode()
+                    self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                    self.wfile.flush()
+                self.wfile.write(b"0\r\n\r\n")
+
+        return Handler
+
+
+_ARRAY_RE = re.compile(r"(\[.*\])\s*$", re.S)
+_CODES_RE = re.compile(r'"([\w-]+)" \(')
+
+
+def reply_for(messages):
+    # Детерминированный "перевод": префикс [tr] к каждому исходному сегменту
+    system = messages[0]["content"]
+    prompt = messages[-1]["content"]
+    if "language detector" in system:
+        return "English"
+    if "JSON array" in system:
+        match = _ARRAY_RE.search(prompt)
+        items = json.loads(match.group(1)) if match else []
+        return json.dumps([f"[tr] {item}" for item in items], ensure_ascii=False)
+    text = prompt.rsplit("Text to translate:", 1)[-1].strip()
+    if "JSON object" in system:
+        return json.dumps({code: f"[tr:{code}] {text}" for code in _CODES_RE.findall(prompt)}, ensure_ascii=False)
+    return f"[tr] {text}"
+
+
+class FakeGoogleResult:
+    def __init__(self, text, src="en"):
+        self.text = text
+        self.src = src
+        self.lang = src
+
+
+class FakeGoogleTranslator:
+    """Заменитель googletrans.Translator с теми же методами translate/detect."""
+
+    def __init__(self, latency=0.03, jitter=0.01, error_rate=0.0, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.requests = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def _call(self):
+        with self._lock:
+            self.requests += 1
+            roll = self._random.random()
+            delay = max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+        time.sleep(delay)
+        if roll < self.error_rate:
+            raise ConnectionError("injected googletrans failure")
+
+    def translate(self, text, dest="en", src="auto"):
+        self._call()
+        return FakeGoogleResult("\n".join(f"[g:{dest}] {line}" for line in text.split("\n")))
+
+    def detect(self, text):
+        self._call()
+        return FakeGoogleResult(text)
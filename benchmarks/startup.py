@@ -0,0 +1,101 @@
+"""
+Бенчмарк холодного старта: время до появления иконки в трее и время
+импорта по модулям (python -X importtime). Запускается без экрана через
+Qt offscreen:
+
+    python benchmarks/startup.py --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Модули, которые не должны загружаться до появления окна
+HEAVY_MODULES = ["numpy", "requests", "googletrans", "httpx", "config", "translator", "keyboard"]
+
+CHILD = """
+import json, sys, time
+started = time.perf_counter()
+sys.path.insert(0, {root!r})
+import main
+app, window = main.create_main_window()
+app.processEvents()
+tray_visible = window.tray_icon.isVisible()
+elapsed = time.perf_counter() - started
+print("STARTUP " + json.dumps({{
+    "time_to_tray": elapsed,
+    "tray_visible": tray_visible,
+    "loaded": [name for name in {heavy!r} if name in sys.modules],
+}}), flush=True)
+"""
+
+
+def run_once():
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen")
+    started = time.perf_counter()
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CHILD.format(root=ROOT, heavy=HEAVY_MODULES)],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    wall = time.perf_counter() - started
+    line = next((line for line in process.stdout.splitlines() if line.startswith("STARTUP ")), None)
+    if line is None:
+        raise RuntimeError(f"Дочерний процесс не дошёл до трея:\n{process.stderr[-2000:]}")
+    result = json.loads(line[len("STARTUP "):])
+    result["wall"] = wall
+    result["imports"] = parse_importtime(process.stderr)
+    return result
+
+
+def parse_importtime(stderr):
+    # Строки вида "import time:      1234 |      5678 |   package.module";
+    # отступ в имени — глубина вложенности, без отступа — импорт верхнего уровня
+    imports = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        imports[name[1:].rstrip()] = (int(self_us), int(cumulative_us))
+    return imports
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="сколько самых медленных модулей показать")
+    args = parser.parse_args()
+
+    # Первый прогон прогревает файловый кэш и .pyc, его не считаем
+    run_once()
+    results = [run_once() for _ in range(args.runs)]
+
+    tray = [r["time_to_tray"] * 1000 for r in results]
+    wall = [r["wall"] * 1000 for r in results]
+    print(f"Runs: {args.runs}")
+    print(f"Time to tray (in process): median {statistics.median(tray):.0f} ms, min {min(tray):.0f} ms")
+    print(f"Process start to tray:     median {statistics.median(wall):.0f} ms, min {min(wall):.0f} ms")
+    print(f"Tray icon visible: {all(r['tray_visible'] for r in results)}")
+    loaded = sorted(set().union(*(r["loaded"] for r in results)))
+    print(f"Heavy modules loaded before tray: {', '.join(loaded) or 'none'}")
+
+    # Время импорта — медиана по прогонам для каждого модуля
+    names = set().union(*(r["imports"] for r in results))
+    cumulative = {
+        name: statistics.median(r["imports"][name][1] for r in results if name in r["imports"])
+        for name in names
+    }
+    total = statistics.median(sum(self_us for self_us, _ in r["imports"].values()) for r in results)
+    print(f"\nTotal import time: {total / 1000:.0f} ms")
+    print("Slowest top-level imports (cumulative, ms):")
+    top_level = [name for name in names if not name.startswith(" ")]
+    for name in sorted(top_level, key=cumulative.get, reverse=True)[:args.top]:
+        print(f"  {cumulative[name] / 1000:8.1f}  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -23,7 +23,6 @@ PyInstaller.__main__.run([
     '--hidden-import=win32con',
     '--hidden-import=win32clipboard',
     '--hidden-import=win32api',
-    '--hidden-import=numpy',
     '--hidden-import=googletrans',
     '--hidden-import=openai',
 ]) 
\ No newline at end of file
@@ -0,0 +1,103 @@
+import itertools
+import threading
+
+
+class TranslationCancelled(Exception):
+    """Запрос отменён или вытеснен более новым."""
+
+
+class CancelToken:
+    """
+    Кооперативная отмена одного запроса на перевод. Слои ниже проверяют
+    cancelled и регистрируют через on_cancel то, что нужно оборвать
+    (например, закрыть HTTP-ответ).
+    """
+
+    _ids = itertools.count(1)
+
+    def __init__(self):
+        self.request_id = next(self._ids)
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = []
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def cancel(self):
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"Ошибка при отмене запроса {self.request_id}: {e}")
+
+    def on_cancel(self, callback):
+        """Регистрирует callback; возвращает функцию для отписки."""
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return lambda: self._remove(callback)
+        callback()
+        return lambda: None
+
+    def _remove(self, callback):
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    def wait(self, timeout):
+        # Прерываемый sleep: True, если запрос отменили
+        return self._event.wait(timeout)
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise TranslationCancelled(f"Request {self.request_id} cancelled")
+
+
+def raise_if_cancelled(cancel_token):
+    if cancel_token is not None:
+        cancel_token.raise_if_cancelled()
+
+
+class RequestTracker:
+    """
+    Следит за последним запросом страницы: новый запрос отменяет старый,
+    а отрисовывать можно только результат текущего.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._current = None
+
+    def start(self):
+        token = CancelToken()
+        with self._lock:
+            previous, self._current = self._current, token
+        if previous is not None:
+            previous.cancel()
+        return token
+
+    def cancel(self):
+        with self._lock:
+            previous, self._current = self._current, None
+        if previous is not None:
+            previous.cancel()
+
+    def finish(self, request_id):
+        with self._lock:
+            if self._current is not None and self._current.request_id == request_id:
+                self._current = None
+
+    @property
+    def current_id(self):
+        current = self._current
+        return current.request_id if current is not None else None
+
+    def is_current(self, request_id):
+        return request_id is not None and request_id == self.current_id
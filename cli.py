@@ -0,0 +1,433 @@
+"""
+Пакетный перевод файлов из командной строки: .txt, .md и .jsonl.
+
+    python cli.py book.md --to ru -o book.ru.md
+    python cli.py requests.jsonl --to ru --fields title,body --concurrency 8
+
+Файл читается потоком, в памяти — только записи "в полёте". Результат
+пишется в исходном порядке по мере готовности, прогресс сохраняется в
+<output>.checkpoint: прерванный запуск той же командой продолжится с места
+остановки. Если запущен демон (main.py --daemon), перевод идёт через него.
+"""
+import argparse
+import json
+import os
+import signal
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from cancellation import CancelToken, TranslationCancelled
+from languages import CODE_TO_NAME, NAME_TO_CODE
+from model_policy import BATCH, latency_budget
+from segmenter import CHUNK_TOKENS, estimate_tokens
+
+GROUP_RECORDS = 20  # записей на один вызов translate_batch
+GROUP_CHARS = 20000
+MAX_RECORD_CHARS = 20000  # абзац длиннее режется по строкам, чтобы не держать в памяти весь файл
+CHECKPOINT_INTERVAL = 2.0  # секунд
+DEFAULT_CONCURRENCY = 4
+MAX_REPORTED_ERRORS = 10
+
+
+class Record:
+    """
+    Запись входного файла: texts — что перевести, render(переводы) —
+    строка для выходного файла.
+    """
+
+    def __init__(self, texts, render):
+        self.texts = texts
+        self.render = render
+
+
+# --- чтение входных форматов ---
+
+def _text_record(block):
+    body = block.strip()
+    if not body:
+        return Record([], lambda translations: block)
+    start = block.index(body)
+    lead, trail = block[:start], block[start + len(body):]
+    return Record([body], lambda translations: lead + translations[0] + trail)
+
+
+def read_text(f, markdown=False):
+    # Запись — абзац вместе с пустыми строками после него. В Markdown блоки
+    # кода (``` и ~~~) не переводятся
+    block, size, fence = [], 0, None
+    for line in f:
+        stripped = line.strip()
+        if markdown and fence is None and stripped[:3] in ("```", "~~~"):
+            if block:
+                yield _text_record("".join(block))
+            block, size, fence = [line], len(line), stripped[:3]
+            continue
+        if fence is not None:
+            block.append(line)
+            if stripped.startswith(fence) and len(block) > 1:
+                yield Record([], lambda translations, code="".join(block): code)
+                block, size, fence = [], 0, None
+            continue
+        if block and stripped and not block[-1].strip():
+            # Пустые строки кончились — начинается следующий абзац
+            yield _text_record("".join(block))
+            block, size = [], 0
+        block.append(line)
+        size += len(line)
+        if size >= MAX_RECORD_CHARS and stripped:
+            yield _text_record("".join(block))
+            block, size = [], 0
+    if block:
+        if fence is not None:
+            yield Record([], lambda translations, code="".join(block): code)
+        else:
+            yield _text_record("".join(block))
+
+
+def read_jsonl(f, fields, keep_source, target_code):
+    for line in f:
+        ending = line[len(line.rstrip("\r\n")):]
+        try:
+            item = json.loads(line)
+        except ValueError:
+            # Пустая или битая строка остаётся как есть
+            yield Record([], lambda translations, line=line: line)
+            continue
+        if not isinstance(item, dict):
+            yield Record([], lambda translations, line=line: line)
+            continue
+        names = [name for name in fields if isinstance(item.get(name), str) and item[name].strip()]
+
+        def render(translations, item=item, names=names, ending=ending):
+            for name, translated in zip(names, translations):
+                item[f"{name}_{target_code}" if keep_source else name] = translated
+            return json.dumps(item, ensure_ascii=False) + (ending or "\n")
+
+        yield Record([item[name] for name in names], render)
+
+
+def read_records(f, fmt, args, target_code):
+    if fmt == "jsonl":
+        return read_jsonl(f, args.fields.split(","), args.keep_source, target_code)
+    return read_text(f, markdown=fmt == "md")
+
+
+def group_records(records):
+    group, chars = [], 0
+    for record in records:
+        group.append(record)
+        chars += sum(len(text) for text in record.texts)
+        if len(group) >= GROUP_RECORDS or chars >= GROUP_CHARS:
+            yield group
+            group, chars = [], 0
+    if group:
+        yield group
+
+
+# --- перевод ---
+
+class Translation:
+    """Переводит группы записей через демон, если он запущен, иначе сам."""
+
+    def __init__(self, target_name, target_code, use_daemon=True):
+        import translator
+        self.translator = translator
+        self.target_name = target_name
+        self.target_code = target_code
+        self.api = translator
+        self.via_daemon = False
+        self.token = CancelToken()
+        self._lock = threading.Lock()
+        if use_daemon:
+            from daemon_client import find_daemon
+            client = find_daemon()
+            if client is not None:
+                self.api, self.via_daemon = client, True
+
+    def translate_group(self, group):
+        """Возвращает (строки для вывода, ошибки [(номер записи в группе, сообщение)])."""
+        from daemon_client import DaemonUnavailable
+        texts = [text for record in group for text in record.texts]
+        owners = [index for index, record in enumerate(group) for _ in record.texts]
+        while True:
+            api = self.api
+            try:
+                translations = self._translate(api, texts)
+                break
+            except DaemonUnavailable as e:
+                with self._lock:
+                    if self.api is api:
+                        print(f"\n⚠️ Демон недоступен ({e}), дальше переводим локально", file=sys.stderr)
+                        self.api, self.via_daemon = self.translator, False
+        errors = []
+        for i, translated in enumerate(translations):
+            if isinstance(translated, self.translator.PartialTranslation):
+                # Из документа с упавшими кусками в файл не пишем ничего — остаётся
+                # оригинал, а запись считается ошибкой
+                errors.append((owners[i], translated.failures[0]))
+                translations[i] = texts[i]
+            elif isinstance(translated, self.translator.ErrorText):
+                # Ошибку в файл не пишем — остаётся оригинал
+                errors.append((owners[i], str(translated)))
+                translations[i] = texts[i]
+        lines, position = [], 0
+        for record in group:
+            count = len(record.texts)
+            lines.append(record.render(translations[position:position + count]))
+            position += count
+        return lines, errors
+
+    def _translate(self, api, texts):
+        # Фоновая работа: интерактивные переводы (в том числе через демон) идут вперёд
+        with latency_budget(BATCH):
+            return self._translate_texts(api, texts)
+
+    def _translate_texts(self, api, texts):
+        results = list(texts)
+        short = [i for i, text in enumerate(texts) if estimate_tokens(text) <= CHUNK_TOKENS]
+        if short:
+            translated = api.translate_batch(
+                [texts[i] for i in short], self.target_name, self.target_code, cancel_token=self.token
+            )
+            for i, result in zip(short, translated):
+                results[i] = result
+        for i, text in enumerate(texts):
+            if estimate_tokens(text) > CHUNK_TOKENS:
+                results[i] = api.translate_document(
+                    text, self.target_name, self.target_code, cancel_token=self.token
+                )
+        return results
+
+
+# --- контрольная точка ---
+
+def input_fingerprint(path, target_code, fmt, fields):
+    stat = os.stat(path)
+    return {
+        "input": os.path.abspath(path),
+        "size": stat.st_size,
+        "mtime": stat.st_mtime,
+        "target": target_code,
+        "format": fmt,
+        "fields": fields,
+    }
+
+
+def load_checkpoint(path, fingerprint):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            checkpoint = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if checkpoint.get("fingerprint") != fingerprint:
+        print("⚠️ Входной файл или параметры изменились — начинаем заново", file=sys.stderr)
+        return None
+    return checkpoint
+
+
+def save_checkpoint(path, checkpoint):
+    # Атомарно: оборванная запись не должна испортить прежнюю точку
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix=".checkpoint-", suffix=".tmp", dir=directory)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp_path, path)
+
+
+# --- запуск ---
+
+def resolve_target(value):
+    if value in CODE_TO_NAME:
+        return CODE_TO_NAME[value], value
+    code = NAME_TO_CODE.get(value.strip().lower())
+    if code is None:
+        # Язык не из списка — передаём модели название как есть
+        return value, None
+    return CODE_TO_NAME[code], code
+
+
+def detect_format(path, fmt):
+    if fmt:
+        return fmt
+    extension = os.path.splitext(path)[1].lower()
+    return {".jsonl": "jsonl", ".ndjson": "jsonl", ".md": "md", ".markdown": "md"}.get(extension, "txt")
+
+
+def default_output(path, target_code):
+    root, extension = os.path.splitext(path)
+    return f"{root}.{target_code or 'translated'}{extension}"
+
+
+def run(args):
+    target_name, target_code = resolve_target(args.to)
+    fmt = detect_format(args.input, args.format)
+    output_path = args.output or default_output(args.input, target_code)
+    checkpoint_path = output_path + ".checkpoint"
+    fingerprint = input_fingerprint(args.input, target_code, fmt, args.fields if fmt == "jsonl" else None)
+
+    checkpoint = None if args.restart else load_checkpoint(checkpoint_path, fingerprint)
+    if checkpoint and not _output_covers(output_path, checkpoint["output_bytes"]):
+        print("⚠️ Выходной файл короче контрольной точки — начинаем заново", file=sys.stderr)
+        checkpoint = None
+    stats = {"records": 0, "texts": 0, "chars": 0, "errors": 0}
+    done_records, output_bytes = 0, 0
+    if checkpoint:
+        done_records, output_bytes = checkpoint["records"], checkpoint["output_bytes"]
+        stats.update(checkpoint["stats"])
+        print(f"↻ Продолжаем с записи {done_records} ({output_bytes} байт уже в {output_path})", file=sys.stderr)
+
+    translation = Translation(target_name, target_code, use_daemon=not args.no_daemon)
+    print(f"Перевод {args.input} → {output_path} ({target_name}, {fmt}, "
+          f"{'через демон' if translation.via_daemon else 'локально'}, параллельно: {args.concurrency})",
+          file=sys.stderr)
+
+    error_samples = []
+    started = time.perf_counter()
+    session = {"records": 0, "chars": 0}
+    interrupted = False
+    with open(args.input, "r", encoding="utf-8", newline="") as source, \
+            open(output_path, "r+b" if checkpoint else "wb") as output:
+        # Всё, что записано после последней контрольной точки (в том числе
+        # оборванная запись группы), переписываем
+        output.truncate(output_bytes)
+        output.seek(output_bytes)
+        records = read_records(source, fmt, args, target_code)
+        for _ in range(done_records):
+            next(records, None)
+
+        last_checkpoint = time.monotonic()
+
+        def write_group(group, lines, errors):
+            nonlocal done_records, output_bytes
+            data = "".join(lines).encode("utf-8")
+            output.write(data)
+            output.flush()
+            # Число записей и смещение меняются вместе и только после записи:
+            # контрольная точка не должна указать на середину группы
+            first = done_records
+            done_records += len(group)
+            output_bytes += len(data)
+            chars = sum(len(text) for record in group for text in record.texts)
+            stats["records"] += len(group)
+            stats["texts"] += sum(len(record.texts) for record in group)
+            stats["chars"] += chars
+            stats["errors"] += len(errors)
+            session["records"] += len(group)
+            session["chars"] += chars
+            for index, message in errors:
+                if len(error_samples) < MAX_REPORTED_ERRORS:
+                    error_samples.append(f"запись {first + index + 1}: {message.splitlines()[0][:200]}")
+            if time.monotonic() - last_checkpoint >= CHECKPOINT_INTERVAL:
+                checkpoint_now()
+            if not args.quiet:
+                elapsed = time.perf_counter() - started
+                print(f"\r  {done_records} записей, {session['chars'] / max(elapsed, 1e-9):.0f} симв/с, "
+                      f"ошибок: {stats['errors']}", end="", file=sys.stderr, flush=True)
+
+        def checkpoint_now():
+            nonlocal last_checkpoint
+            output.flush()
+            os.fsync(output.fileno())
+            save_checkpoint(checkpoint_path, {
+                "fingerprint": fingerprint,
+                "records": done_records,
+                "output_bytes": output_bytes,
+                "stats": stats,
+            })
+            last_checkpoint = time.monotonic()
+
+        def group_result(group, future):
+            # Упавшая группа не останавливает перевод: её записи остаются
+            # в оригинале и считаются ошибками
+            try:
+                return (group, *future.result())
+            except (KeyboardInterrupt, TranslationCancelled):
+                raise
+            except Exception as e:
+                return (group, *failed_group(group, e))
+
+        # В полёте не больше 2 * concurrency групп: память ограничена,
+        # а запись идёт строго по порядку по мере готовности головы очереди
+        pool = ThreadPoolExecutor(max_workers=args.concurrency, thread_name_prefix="cli-translate")
+        pending = deque()
+        try:
+            for group in group_records(records):
+                pending.append((group, pool.submit(translation.translate_group, group)))
+                while len(pending) >= 2 * args.concurrency:
+                    write_group(*group_result(*pending.popleft()))
+            while pending:
+                write_group(*group_result(*pending.popleft()))
+        except KeyboardInterrupt:
+            interrupted = True
+            # Повторный Ctrl+C не должен оборвать сохранение контрольной точки
+            signal.signal(signal.SIGINT, signal.SIG_IGN)
+            translation.token.cancel()
+        except TranslationCancelled:
+            interrupted = True
+        finally:
+            pool.shutdown(wait=not interrupted, cancel_futures=True)
+            checkpoint_now()
+
+    elapsed = time.perf_counter() - started
+    if not args.quiet:
+        print(file=sys.stderr)
+    if interrupted:
+        print(f"⏸ Прервано на записи {done_records}. Повторите ту же команду, чтобы продолжить.", file=sys.stderr)
+        return 130
+    os.remove(checkpoint_path)
+    report(stats, session, elapsed, error_samples, translation)
+    return 1 if stats["errors"] else 0
+
+
+def failed_group(group, error):
+    message = f"[Error] {error}"
+    lines = [record.render(record.texts) for record in group]
+    return lines, [(index, message) for index, record in enumerate(group) if record.texts]
+
+
+def _output_covers(path, size):
+    try:
+        return os.path.getsize(path) >= size
+    except OSError:
+        return False
+
+
+def report(stats, session, elapsed, error_samples, translation):
+    print(f"Готово: {stats['records']} записей, {stats['texts']} текстов, {stats['chars']} символов", file=sys.stderr)
+    print(f"  за этот запуск: {session['records']} записей за {elapsed:.1f} с — "
+          f"{session['records'] / max(elapsed, 1e-9):.1f} записей/с, "
+          f"{session['chars'] / max(elapsed, 1e-9):.0f} симв/с", file=sys.stderr)
+    if not translation.via_daemon:
+        engine = translation.translator.get_engine_stats()
+        cache = translation.translator.get_cache_stats()
+        print(f"  запросов к бэкендам: {engine['calls']}, объединено: {engine['coalesced']}, "
+              f"кэш: {cache['hits']} попаданий / {cache['misses']} промахов", file=sys.stderr)
+    print(f"  ошибок: {stats['errors']}", file=sys.stderr)
+    for sample in error_samples:
+        print(f"    {sample}", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="входной файл .txt, .md или .jsonl")
+    parser.add_argument("--to", required=True, help="целевой язык: код (ru) или название (Russian)")
+    parser.add_argument("-o", "--output", help="выходной файл (по умолчанию <имя>.<код><расширение>)")
+    parser.add_argument("--format", choices=["txt", "md", "jsonl"], help="формат (по умолчанию по расширению)")
+    parser.add_argument("--fields", default="text", help="поля JSONL для перевода, через запятую")
+    parser.add_argument("--keep-source", action="store_true",
+                        help="JSONL: писать перевод в <поле>_<код>, не заменяя оригинал")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="групп записей параллельно")
+    parser.add_argument("--restart", action="store_true", help="игнорировать контрольную точку")
+    parser.add_argument("--no-daemon", action="store_true", help="не использовать запущенный демон")
+    parser.add_argument("-q", "--quiet", action="store_true", help="без строки прогресса")
+    args = parser.parse_args(argv)
+    args.concurrency = max(1, args.concurrency)
+    return run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
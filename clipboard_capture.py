@@ -0,0 +1,231 @@
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from telemetry import span, start_trace
+
+# Захват выделенного текста по горячей клавише: эмулируем Ctrl+C и ждём,
+# пока буфер обмена действительно изменится (по номеру последовательности),
+# вместо фиксированной паузы. После чтения прежнее содержимое буфера
+# возвращается на место. Платформенные детали — в бэкендах.
+
+CAPTURE_TIMEOUT = 0.6
+POLL_INTERVAL = 0.005
+OPEN_RETRIES = 10
+
+
+class ClipboardBackend:
+    """
+    Интерфейс буфера обмена. sequence_number() меняется при каждой записи
+    в буфер; save()/restore() сохраняют и возвращают его содержимое.
+    """
+
+    def sequence_number(self):
+        raise NotImplementedError
+
+    def get_text(self):
+        raise NotImplementedError
+
+    def save(self):
+        raise NotImplementedError
+
+    def restore(self, saved):
+        raise NotImplementedError
+
+    def send_copy(self, hotkey=None):
+        raise NotImplementedError
+
+    def wait_for_change(self, sequence, timeout):
+        # По умолчанию — частый опрос дешёвого счётчика
+        deadline = time.monotonic() + timeout
+        while self.sequence_number() == sequence:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(POLL_INTERVAL)
+        return True
+
+
+class Win32ClipboardBackend(ClipboardBackend):
+    # Форматы-дескрипторы GDI через pywin32 как байты не сохранить
+    _SKIP_FORMATS = {2, 3, 9, 14, 0x80, 0x82, 0x83, 0x8E}
+
+    def __init__(self):
+        import keyboard
+        import win32clipboard
+        import win32con
+        self._keyboard = keyboard
+        self._clipboard = win32clipboard
+        self._text_format = win32con.CF_UNICODETEXT
+
+    def _open(self):
+        # Буфер может быть ненадолго занят другим приложением
+        for attempt in range(OPEN_RETRIES):
+            try:
+                self._clipboard.OpenClipboard()
+                return
+            except Exception:
+                if attempt == OPEN_RETRIES - 1:
+                    raise
+                time.sleep(POLL_INTERVAL)
+
+    def sequence_number(self):
+        return self._clipboard.GetClipboardSequenceNumber()
+
+    def get_text(self):
+        self._open()
+        try:
+            if self._clipboard.IsClipboardFormatAvailable(self._text_format):
+                return self._clipboard.GetClipboardData(self._text_format)
+            return ""
+        finally:
+            self._clipboard.CloseClipboard()
+
+    def save(self):
+        saved = []
+        self._open()
+        try:
+            fmt = self._clipboard.EnumClipboardFormats(0)
+            while fmt:
+                if fmt not in self._SKIP_FORMATS:
+                    try:
+                        saved.append((fmt, self._clipboard.GetClipboardData(fmt)))
+                    except Exception:
+                        pass
+                fmt = self._clipboard.EnumClipboardFormats(fmt)
+        finally:
+            self._clipboard.CloseClipboard()
+        return saved
+
+    def restore(self, saved):
+        self._open()
+        try:
+            self._clipboard.EmptyClipboard()
+            for fmt, data in saved:
+                try:
+                    self._clipboard.SetClipboardData(fmt, data)
+                except Exception:
+                    pass
+        finally:
+            self._clipboard.CloseClipboard()
+
+    def send_copy(self, hotkey=None):
+        # Отпускаем клавиши горячей клавиши, иначе приложение получит Ctrl+Shift+C
+        if hotkey:
+            self._keyboard.release(hotkey)
+        self._keyboard.send("ctrl+c")
+
+
+class FakeClipboardBackend(ClipboardBackend):
+    """
+    Буфер обмена в памяти для тестов и бенчмарков: send_copy() "копирует"
+    selection через copy_delay секунд, как это сделало бы приложение.
+    """
+
+    def __init__(self, selection="", copy_delay=0.0, text=""):
+        self.selection = selection
+        self.copy_delay = copy_delay
+        self.copies = 0
+        self._text = text
+        self._sequence = 0
+        self._changed = threading.Condition()
+
+    def sequence_number(self):
+        with self._changed:
+            return self._sequence
+
+    def set_text(self, text):
+        with self._changed:
+            self._text = text
+            self._sequence += 1
+            self._changed.notify_all()
+
+    def get_text(self):
+        with self._changed:
+            return self._text
+
+    def save(self):
+        return self.get_text()
+
+    def restore(self, saved):
+        self.set_text(saved)
+
+    def send_copy(self, hotkey=None):
+        self.copies += 1
+        if self.selection is None:
+            return  # Выделения нет — приложение буфер не трогает
+        if self.copy_delay:
+            timer = threading.Timer(self.copy_delay, self.set_text, (self.selection,))
+            timer.daemon = True
+            timer.start()
+        else:
+            self.set_text(self.selection)
+
+    def wait_for_change(self, sequence, timeout):
+        # Настоящее уведомление об изменении вместо опроса
+        with self._changed:
+            return self._changed.wait_for(lambda: self._sequence != sequence, timeout)
+
+
+def create_backend():
+    if sys.platform == "win32":
+        return Win32ClipboardBackend()
+    raise NotImplementedError(f"Захват выделения не поддерживается на {sys.platform}")
+
+
+class SelectionCapture:
+    def __init__(self, backend=None, timeout=CAPTURE_TIMEOUT, restore=True):
+        self.backend = backend or create_backend()
+        self.timeout = timeout
+        self.restore = restore
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="selection-capture")
+        self._busy = threading.Lock()
+
+    def capture(self, hotkey=None):
+        """
+        Копирует выделение и возвращает его текст. Если буфер не изменился
+        за timeout (ничего не выделено), возвращает "" — а не старый текст.
+        """
+        backend = self.backend
+        with span("capture") as capture_span:
+            sequence = backend.sequence_number()
+            saved = backend.save() if self.restore else None
+            try:
+                backend.send_copy(hotkey)
+                if not backend.wait_for_change(sequence, self.timeout):
+                    capture_span.set(error="no selection")
+                    return ""
+                text = backend.get_text() or ""
+                capture_span.set(chars=len(text))
+                return text
+            finally:
+                # Буфер пользователя возвращаем, даже если копирование упало
+                if self.restore and backend.sequence_number() != sequence:
+                    backend.restore(saved)
+
+    def capture_async(self, callback, hotkey=None):
+        """
+        Запускает capture() в отдельном потоке и сразу возвращается, не
+        задерживая поток хука клавиатуры. Повторные нажатия, пока захват
+        идёт, игнорируются. callback(text) вызывается из потока захвата.
+        """
+        if not self._busy.acquire(blocking=False):
+            return False
+
+        trace = start_trace("hotkey")
+
+        def run():
+            error = None
+            try:
+                with trace.activate():
+                    text = self.capture(hotkey)
+            except Exception as e:
+                print(f"Ошибка при копировании текста: {e}")
+                text, error = "", str(e)
+            finally:
+                self._busy.release()
+            trace.finish(error)
+            callback(text)
+
+        self._executor.submit(run)
+        return True
@@ -0,0 +1,235 @@
+import json
+import os
+import secrets
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import translator
+from daemon_client import DAEMON_FILE
+from model_policy import BATCH, INTERACTIVE, SPECULATIVE, latency_budget
+from telemetry import get_telemetry, start_trace
+
+# Фоновый режим без GUI (python main.py --daemon): один прогретый движок
+# перевода — общий кэш, пул соединений и лимит параллельных запросов — на
+# все приложения и скрипты машины. HTTP только на loopback; адрес и токен
+# доступа пишутся в DAEMON_FILE, откуда их берёт daemon_client. Токен нужен,
+# чтобы чужая веб-страница не могла слать запросы на localhost.
+
+DAEMON_HOST = "127.0.0.1"
+DAEMON_PORT = 8766
+MAX_BODY_BYTES = 10 * 1024 * 1024
+MAX_DOCUMENT_WORKERS = 16
+
+
+class DaemonHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    # --- маршруты ---
+
+    def do_GET(self):
+        if not self._authorized():
+            return
+        if self.path == "/health":
+            self._send_json({
+                "status": "ok",
+                "pid": os.getpid(),
+                "engine": translator.get_engine_stats(),
+                "cache": translator.get_cache_stats(),
+                "rate_limit": translator.get_rate_limit_stats(),
+            })
+        elif self.path == "/metrics":
+            self._send(200, get_telemetry().to_prometheus().encode(), "text/plain; version=0.0.4")
+        else:
+            self._send_json({"error": f"Unknown path {self.path}"}, 404)
+
+    def do_POST(self):
+        if not self._authorized():
+            return
+        routes = {
+            "/translate": self.translate,
+            "/translate/batch": self.translate_batch,
+            "/translate/stream": self.translate_stream,
+            "/translate/document": self.translate_document,
+        }
+        route = routes.get(self.path)
+        if route is None:
+            self._send_json({"error": f"Unknown path {self.path}"}, 404)
+            self.close_connection = True
+            return
+        body = self._read_json()
+        if body is None:
+            return
+        budget = body.get("budget")
+        if budget not in (INTERACTIVE, BATCH, SPECULATIVE):
+            budget = INTERACTIVE
+        trace = start_trace("daemon", path=self.path, budget=budget)
+        self._streaming = False
+        try:
+            with trace.activate(), latency_budget(budget):
+                route(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # Клиент ушёл, не дождавшись ответа
+            trace.finish("client disconnected")
+        except Exception as e:
+            trace.finish(str(e))
+            if self._streaming:
+                # Заголовки уже ушли — остаётся оборвать соединение
+                self.close_connection = True
+            elif isinstance(e, (KeyError, TypeError)):
+                self._send_json({"error": f"Bad request: {e}"}, 400)
+            else:
+                self._send_json({"error": str(e)}, 500)
+        else:
+            trace.finish()
+
+    def translate(self, body):
+        result = translator.translate_text(body["text"], *self._target(body))
+        self._send_json(_result(result))
+
+    def translate_batch(self, body):
+        results = translator.translate_batch(body["texts"], *self._target(body))
+        self._send_json({
+            "translations": [str(result) for result in results],
+            "errors": [i for i, result in enumerate(results) if isinstance(result, translator.ErrorText)],
+        })
+
+    def translate_stream(self, body):
+        # NDJSON по частям: {"piece": ...} на каждый фрагмент, затем {"done": true}
+        self._start_lines()
+        for piece in translator.translate_text_stream(body["text"], *self._target(body)):
+            self._write_line({"piece": str(piece), "error": isinstance(piece, translator.ErrorText)})
+        self._write_line({"done": True})
+        self._end_lines()
+
+    def translate_document(self, body):
+        # Прогресс строками {"progress": [готово, всего]}, в конце — сам перевод
+        self._start_lines()
+        translated = translator.translate_document(
+            body["text"], *self._target(body),
+            max_workers=min(int(body.get("max_workers") or translator.DOCUMENT_WORKERS), MAX_DOCUMENT_WORKERS),
+            on_progress=lambda done, total: self._write_line({"progress": [done, total]}),
+        )
+        self._write_line(_result(translated))
+        self._end_lines()
+
+    # --- служебное ---
+
+    def _authorized(self):
+        expected = f"Bearer {self.server.token}"
+        if secrets.compare_digest(self.headers.get("Authorization", ""), expected):
+            return True
+        self._send_json({"error": "Unauthorized"}, 401)
+        self.close_connection = True  # Тело запроса не прочитано
+        return False
+
+    def _target(self, body):
+        return body["target"], body.get("target_code")
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_BODY_BYTES:
+            self._send_json({"error": "Request too large"}, 413)
+            self.close_connection = True
+            return None
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(body, dict) or "target" not in body:
+                raise ValueError("target is required")
+        except ValueError as e:
+            self._send_json({"error": f"Bad request: {e}"}, 400)
+            return None
+        return body
+
+    def _send(self, status, data, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_json(self, value, status=200):
+        self._send(status, json.dumps(value, ensure_ascii=False).encode("utf-8"), "application/json")
+
+    def _start_lines(self):
+        self._streaming = True
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def _write_line(self, value):
+        data = (json.dumps(value, ensure_ascii=False) + "\n").encode("utf-8")
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def _end_lines(self):
+        self.wfile.write(b"0\r\n\r\n")
+
+
+def _result(result):
+    data = {"translation": str(result), "error": isinstance(result, translator.ErrorText)}
+    if isinstance(result, translator.PartialTranslation):
+        data["failures"] = result.failures
+    return data
+
+
+class TranslationDaemon:
+    def __init__(self, host=DAEMON_HOST, port=DAEMON_PORT, info_path=DAEMON_FILE):
+        self.info_path = info_path
+        self.server = ThreadingHTTPServer((host, port), DaemonHandler)
+        self.server.daemon_threads = True
+        self.server.token = secrets.token_urlsafe(24)
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def write_info(self):
+        # Атомарно, как settings.json: клиент не прочитает полузаписанный файл
+        info = json.dumps({"url": self.url, "token": self.server.token, "pid": os.getpid()})
+        directory = os.path.dirname(os.path.abspath(self.info_path))
+        fd, tmp_path = tempfile.mkstemp(prefix=".daemon-", suffix=".tmp", dir=directory)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(info)
+        os.replace(tmp_path, self.info_path)
+
+    def remove_info(self):
+        try:
+            with open(self.info_path, "r", encoding="utf-8") as f:
+                if json.load(f).get("pid") != os.getpid():
+                    return  # Файл уже принадлежит другому экземпляру
+            os.remove(self.info_path)
+        except (OSError, ValueError):
+            pass
+
+    def start(self):
+        self.write_info()
+        self._thread = threading.Thread(target=self.server.serve_forever, name="translation-daemon", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.remove_info()
+
+
+def run_daemon(host=DAEMON_HOST, port=DAEMON_PORT):
+    daemon = TranslationDaemon(host, port)
+    translator.prewarm_connections()
+    daemon.write_info()
+    print(f"🟢 Демон перевода слушает {daemon.url} (Ctrl+C — остановить)")
+    try:
+        daemon.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        daemon.server.server_close()
+        daemon.remove_info()
@@ -0,0 +1,185 @@
+import json
+import threading
+import time
+
+import requests
+
+from cancellation import raise_if_cancelled
+from http_client import CONNECT_TIMEOUT, get_session, post_json
+from model_policy import current_budget
+
+# Тонкий клиент демона перевода (daemon.py). Функции повторяют translator:
+# строка перевода или ErrorText. Если демон недоступен, бросается
+# DaemonUnavailable — вызывающий переводит сам, локально. Демон слушает
+# loopback, поэтому запрос один, без повторов: пропавший демон должен
+# сразу уступить локальному переводу.
+
+DAEMON_FILE = "daemon.json"
+HEALTH_TTL = 10  # секунд между проверками, что демон жив
+HEALTH_TIMEOUT = 0.5
+
+
+class DaemonUnavailable(Exception):
+    """Демон не запущен или перестал отвечать."""
+
+
+class DaemonError(Exception):
+    """Демон жив, но ответил ошибкой; локально переводить такой запрос незачем."""
+
+
+class DaemonClient:
+    def __init__(self, url, token):
+        self.url = url
+        self.headers = {"Authorization": f"Bearer {token}"}
+
+    def health(self, timeout=HEALTH_TIMEOUT):
+        try:
+            response = get_session(self.url).get(f"{self.url}/health", headers=self.headers, timeout=timeout)
+        except requests.RequestException as e:
+            raise DaemonUnavailable(str(e))
+        if response.status_code != 200:
+            raise DaemonUnavailable(f"HTTP {response.status_code}")
+        return response.json()
+
+    def translate_text(self, text, target_language, target_language_code=None, cancel_token=None):
+        try:
+            response = self._post("/translate", _body(text, target_language, target_language_code), cancel_token)
+        except DaemonError as e:
+            return _error(e)
+        return _translation(response.json())
+
+    def translate_batch(self, texts, target_language, target_language_code=None, cancel_token=None):
+        body = {"texts": list(texts), "target": target_language, "target_code": target_language_code}
+        try:
+            data = self._post("/translate/batch", body, cancel_token).json()
+        except DaemonError as e:
+            return [_error(e)] * len(texts)
+        errors = set(data["errors"])
+        return [
+            _translation({"translation": item, "error": i in errors}) for i, item in enumerate(data["translations"])
+        ]
+
+    def translate_text_stream(self, text, target_language, target_language_code=None, cancel_token=None):
+        try:
+            for line in self._lines("/translate/stream", _body(text, target_language, target_language_code), cancel_token):
+                if line.get("done"):
+                    return
+                yield _translation({"translation": line["piece"], "error": line["error"]})
+        except DaemonError as e:
+            yield _error(e)
+            return
+        raise DaemonUnavailable("Stream ended unexpectedly")
+
+    def translate_document(self, text, target_language, target_language_code=None, max_workers=None,
+                           on_progress=None, cancel_token=None):
+        body = _body(text, target_language, target_language_code)
+        if max_workers:
+            body["max_workers"] = max_workers
+        try:
+            for line in self._lines("/translate/document", body, cancel_token):
+                if "progress" in line:
+                    if on_progress:
+                        on_progress(*line["progress"])
+                else:
+                    return _translation(line)
+        except DaemonError as e:
+            return _error(e)
+        raise DaemonUnavailable("Stream ended unexpectedly")
+
+    def _post(self, path, body, cancel_token, stream=False):
+        # Режим (интерактивный или фоновый) определяет приоритет запроса в демоне
+        body = dict(body, budget=current_budget())
+        try:
+            response = post_json(
+                self.url, path, self.headers, body, stream=stream, cancel_token=cancel_token, retries=0
+            )
+        except (requests.ConnectionError, requests.Timeout) as e:
+            raise DaemonUnavailable(str(e))
+        if response.status_code != 200:
+            error = DaemonError(f"[Daemon error: {response.status_code}] {_error_message(response)}")
+            response.close()
+            raise error
+        return response
+
+    def _lines(self, path, body, cancel_token):
+        response = self._post(path, body, cancel_token, stream=True)
+        # Как и у OpenAI-стрима: отмена закрывает соединение
+        unregister = cancel_token.on_cancel(response.close) if cancel_token is not None else None
+        try:
+            for line in response.iter_lines(decode_unicode=True):
+                raise_if_cancelled(cancel_token)
+                if line:
+                    yield json.loads(line)
+        except requests.RequestException as e:
+            raise_if_cancelled(cancel_token)
+            raise DaemonUnavailable(str(e))
+        except AttributeError:
+            # Ответ закрыли из другого потока посреди чтения
+            raise_if_cancelled(cancel_token)
+            raise
+        finally:
+            if unregister:
+                unregister()
+            response.close()
+        raise_if_cancelled(cancel_token)
+
+
+def _body(text, target_language, target_language_code):
+    return {"text": text, "target": target_language, "target_code": target_language_code}
+
+
+def _error_message(response):
+    try:
+        return response.json()["error"]
+    except (ValueError, KeyError, TypeError):
+        return response.text[:200]
+
+
+def _error(error):
+    from translator import ErrorText
+    return ErrorText(error)
+
+
+def _translation(data):
+    if data.get("failures"):
+        from translator import PartialTranslation
+        return PartialTranslation(data["translation"], data["failures"])
+    if data.get("error"):
+        from translator import ErrorText
+        return ErrorText(data["translation"])
+    return data["translation"]
+
+
+_client = None
+_checked_at = None
+_client_lock = threading.Lock()
+
+
+def find_daemon(info_path=DAEMON_FILE):
+    """
+    Клиент запущенного демона или None. Результат проверки живости
+    запоминается на HEALTH_TTL секунд, чтобы не платить за неё каждый запрос.
+    """
+    global _client, _checked_at
+    with _client_lock:
+        if _checked_at is not None and time.monotonic() - _checked_at < HEALTH_TTL:
+            return _client
+        _client = None
+        try:
+            with open(info_path, "r", encoding="utf-8") as f:
+                info = json.load(f)
+            client = DaemonClient(info["url"], info["token"])
+            client.health(timeout=min(HEALTH_TIMEOUT, CONNECT_TIMEOUT))
+            _client = client
+        except (OSError, ValueError, KeyError, DaemonUnavailable):
+            pass
+        _checked_at = time.monotonic()
+        return _client
+
+
+def forget_daemon():
+    # После DaemonUnavailable: следующий find_daemon() проверит заново
+    global _client, _checked_at
+    with _client_lock:
+        _client = None
+        _checked_at = None
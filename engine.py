@@ -0,0 +1,198 @@
+import asyncio
+import concurrent.futures
+import contextvars
+import functools
+import heapq
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from cancellation import CancelToken, TranslationCancelled
+from model_policy import INTERACTIVE, current_budget
+
+# Ядро перевода: один event loop в фоновом потоке, глобальный семафор на
+# число одновременных запросов и объединение одинаковых запросов "в полёте".
+# Блокирующие вызовы бэкендов выполняются в пуле размером с лимит
+# параллелизма, поэтому ожидающие запросы потоков не занимают.
+# Очередь на вход приоритетная: интерактивные запросы (горячая клавиша, GUI)
+# проходят раньше фоновых (документы, пакетная обработка), а часть мест
+# фоновым не достаётся вовсе.
+# Локальная работа (кэш, память переводов, детектор языка) тоже блокирует,
+# но идёт в отдельном пуле: попадание в кэш не ждёт сетевых запросов.
+
+MAX_CONCURRENCY = 8
+INTERACTIVE_RESERVED = 2
+LOCAL_WORKERS = 4
+
+
+class PrioritySlots:
+    """
+    Семафор event loop'а с приоритетами: 0 — интерактивный запрос, 1 — фоновый.
+    Фоновые занимают не больше limit - reserved мест.
+    """
+
+    def __init__(self, limit, reserved=0):
+        self.limit = limit
+        self.reserved = min(reserved, limit - 1)
+        self.active = 0
+        self._waiting = []
+        self._seq = itertools.count()
+
+    def _fits(self, priority):
+        return self.active < (self.limit if priority == 0 else self.limit - self.reserved)
+
+    async def acquire(self, priority):
+        # Через очередь даже при свободном месте: интерактивный запрос не должен
+        # ждать за фоновым, которому не досталось место вне резерва
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiting, (priority, next(self._seq), future))
+        self._wake()
+        if future.done():
+            return
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # Место уже выдали, но ждавший ушёл — отдаём дальше
+                self.release()
+            raise
+
+    def release(self):
+        self.active -= 1
+        self._wake()
+
+    def _wake(self):
+        while self._waiting:
+            priority, _, future = self._waiting[0]
+            if future.done():
+                heapq.heappop(self._waiting)  # Отменён, пока ждал
+                continue
+            if not self._fits(priority):
+                break
+            heapq.heappop(self._waiting)
+            self.active += 1
+            future.set_result(None)
+
+    def waiting(self):
+        return sum(1 for *_, future in self._waiting if not future.done())
+
+
+class TranslationEngine:
+    def __init__(self, max_concurrency=MAX_CONCURRENCY):
+        self.max_concurrency = max_concurrency
+        self.calls = 0
+        self.coalesced = 0
+        self._inflight = {}
+        self._waiters = {}
+        self._loop = asyncio.new_event_loop()
+        self._loop.set_default_executor(
+            ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="translation-engine")
+        )
+        self._local = ThreadPoolExecutor(max_workers=LOCAL_WORKERS, thread_name_prefix="translation-local")
+        self._slots = PrioritySlots(max_concurrency, INTERACTIVE_RESERVED)
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run_loop, name="translation-engine-loop", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        self._ready.set()
+        self._loop.run_forever()
+
+    async def run(self, key, func, *args):
+        """
+        Выполняет блокирующую func(*args, cancel_token=...) с учётом
+        глобального лимита. Вызовы с одинаковым key, пока первый не
+        завершился, получают его результат вместо нового сетевого запроса.
+        key=None — без объединения. Сам вызов отменяется (через cancel_token),
+        только когда отменены все, кто его ждёт.
+        """
+        entry = self._inflight.get(key) if key is not None else None
+        if entry is None:
+            token = CancelToken()
+            task = self._loop.create_task(self._execute(func, args, token))
+            entry = (task, token)
+            if key is not None:
+                self._inflight[key] = entry
+                task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.coalesced += 1
+        task, token = entry
+        self._waiters[token] = self._waiters.get(token, 0) + 1
+        try:
+            # shield: отмена одного ожидающего не должна отменять общий запрос
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if self._waiters.get(token) == 1 and not task.done():
+                token.cancel()
+                task.cancel()
+            raise
+        finally:
+            self._waiters[token] -= 1
+            if not self._waiters[token]:
+                del self._waiters[token]
+
+    async def _execute(self, func, args, token):
+        # Приоритет — по режиму model_policy вызывающего (контекст задачи — его копия)
+        await self._slots.acquire(0 if current_budget() == INTERACTIVE else 1)
+        try:
+            token.raise_if_cancelled()
+            self.calls += 1
+            # Контекст (текущий trace телеметрии) переносим в поток пула
+            call = functools.partial(contextvars.copy_context().run, func, *args, cancel_token=token)
+            return await self._loop.run_in_executor(None, call)
+        finally:
+            self._slots.release()
+
+    async def run_local(self, func, *args):
+        """Выполняет быструю блокирующую func(*args) вне потока event loop."""
+        call = functools.partial(contextvars.copy_context().run, func, *args)
+        return await self._loop.run_in_executor(self._local, call)
+
+    def submit(self, coroutine):
+        """Запускает корутину на loop движка, не дожидаясь её; возвращает concurrent.futures.Future."""
+        if threading.current_thread() is self._thread:
+            coroutine.close()
+            raise RuntimeError("Из потока event loop движка корутину нужно ждать через await")
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop)
+
+    def run_sync(self, coroutine, cancel_token=None):
+        """
+        Синхронный фасад: выполняет корутину на loop движка и ждёт результат.
+        При отмене cancel_token возвращается сразу с TranslationCancelled.
+        """
+        future = self.submit(coroutine)
+        unregister = cancel_token.on_cancel(future.cancel) if cancel_token is not None else None
+        try:
+            return future.result()
+        except concurrent.futures.CancelledError:
+            raise TranslationCancelled(
+                f"Request {cancel_token.request_id if cancel_token else '?'} cancelled"
+            )
+        finally:
+            if unregister:
+                unregister()
+
+    def stats(self):
+        return {
+            "max_concurrency": self.max_concurrency,
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._inflight),
+            "active": self._slots.active,
+            "queued": self._slots.waiting(),
+        }
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_engine():
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = TranslationEngine()
+    return _engine
@@ -1,62 +1,62 @@
 import keyboard
-import time
 from PyQt5.QtCore import QTimer, QObject, pyqtSignal
-import win32gui
-import win32con
-import win32clipboard
-import win32api
 
 from PyQt5.QtWidgets import QApplication
-from gui import TranslatorGUI  # Импортируйте ваш GUI
-
-# Список для хранения ссылок на окна, чтобы сборщик мусора их не закрыл
-translator_windows = []
+from clipboard_capture import SelectionCapture
+from settings import get_settings
+from speculation import ClipboardSpeculator
 
 class HotkeyHandler(QObject):
     text_copied = pyqtSignal(str)
 
-    def __init__(self):
+    def __init__(self, capture=None):
         super().__init__()
         self.current_hotkey = None
+        self.hotkey = None
+        self.capture = capture or SelectionCapture()
+        # Упреждающий перевод скопированного текста — по настройке, выключен по умолчанию
+        self.speculator = ClipboardSpeculator(self.capture.backend)
+        self.settings = get_settings()
+        self.settings.subscribe(self.on_setting_changed)
+        self.update_speculation()
         self.setup_hotkey()
 
-    def copy_selected_text(self):
-        try:
-            # Сохраняем текущее состояние клавиш
-            keyboard.release('ctrl+shift+t')
-            
-            # Эмулируем Ctrl+C
-            keyboard.press('ctrl')
-            keyboard.press('c')
-            keyboard.release('c')
-            keyboard.release('ctrl')
-            
-            time.sleep(0.1)  # Даем время на копирование
+    def on_setting_changed(self, key, value):
+        if key == "speculative_translation":
+            self.update_speculation()
 
-            # Получаем текст из буфера обмена
-            win32clipboard.OpenClipboard()
-            text = win32clipboard.GetClipboardData(win32con.CF_UNICODETEXT) if win32clipboard.IsClipboardFormatAvailable(win32con.CF_UNICODETEXT) else ""
-            win32clipboard.CloseClipboard()
+    def update_speculation(self):
+        if self.settings.get("speculative_translation", False):
+            self.speculator.start()
+        else:
+            self.speculator.stop()
 
-            return text
+    def copy_selected_text(self):
+        # Синхронный вариант: ждёт, пока буфер обмена реально изменится
+        try:
+            return self.capture.capture(self.hotkey)
         except Exception as e:
             print(f"Ошибка при копировании текста: {e}")
             return ""
 
+    def on_text_captured(self, text):
+        # Вызывается из потока захвата; сигнал доставится в поток GUI
+        print(f"📋 Скопировано: '{text}'")
+        if text.strip():
+            self.text_copied.emit(text)
+        else:
+            print("⚠️ Нет выделенного текста")
+
     def setup_hotkey(self, hotkey=None):
         if hotkey is None:
-            from settings import load_settings
-            hotkey = load_settings().get("hotkey", "ctrl+shift+t")
+            hotkey = self.settings.get("hotkey", "ctrl+shift+t")
         if self.current_hotkey:
             keyboard.remove_hotkey(self.current_hotkey)
         def on_hotkey():
             print("🔥 Горячая клавиша сработала")
-            text = self.copy_selected_text()
-            print(f"📋 Скопировано: '{text}'")
-            if text.strip():
-                self.text_copied.emit(text)
-            else:
-                print("⚠️ Нет выделенного текста")
+            # Поток хука не блокируем: захват идёт в своём потоке
+            self.capture.capture_async(self.on_text_captured, hotkey)
+        self.hotkey = hotkey
         self.current_hotkey = keyboard.add_hotkey(hotkey, on_hotkey, suppress=True)
         print(f"🟢 Глобальный переводчик активен. Нажмите {hotkey.upper()} для копирования выделенного текста.")
 
@@ -68,10 +68,15 @@ def start_hotkey_listener():
     return handler
 
 def show_translator_window(text):
-    from gui import TranslatorGUI
     """
-    Создает и показывает окно перевода в главном потоке.
+    Показывает перевод text во всплывающем окне у курсора (в главном потоке).
+    Окна берутся из ограниченного пула и переиспользуются.
     """
-    window = TranslatorGUI(input_text=text)
-    window.show()
-    translator_windows.append(window)
+    from gui import get_popup_pool
+    return get_popup_pool().show_translation(text)
+
+
+def prewarm_popup():
+    # Собираем окно заранее, пока пользователь не нажал горячую клавишу
+    from gui import get_popup_pool
+    get_popup_pool().prewarm()
@@ -1,15 +1,28 @@
 import sys
 import os
+import math
+import time
+from collections import deque
+from functools import partial
 from PyQt5.QtWidgets import (
     QWidget, QLabel, QTextEdit, QComboBox, QPushButton, QVBoxLayout,
     QSystemTrayIcon, QMenu, QAction, QMessageBox, QApplication, QHBoxLayout,
-    QFrame, QSizePolicy, QStackedWidget, QListWidget, QListWidgetItem, QInputDialog, QDialog
+    QFrame, QSizePolicy, QStackedWidget, QListWidget, QListWidgetItem, QInputDialog, QDialog,
+    QScrollArea, QGridLayout, QCheckBox, QTableView, QLineEdit, QHeaderView, QAbstractItemView,
+    QTableWidget, QTableWidgetItem, QPlainTextEdit, QFileDialog, QSplitter
 )
-from PyQt5.QtGui import QIcon, QFont, QPalette, QColor, QPainter, QPen, QKeySequence
-from PyQt5.QtCore import Qt, QTimer, QRect, QRunnable, QThreadPool, pyqtSignal, QObject, QPoint
-from settings import load_settings, save_settings
-from translator import translate_text
-import numpy as np
+from PyQt5.QtGui import QIcon, QFont, QPalette, QColor, QPainter, QPen, QKeySequence, QTextCursor, QCursor
+from PyQt5.QtCore import (
+    Qt, QTimer, QRect, QRunnable, QThreadPool, pyqtSignal, QObject, QPoint, QAbstractTableModel,
+    QModelIndex, QEvent
+)
+from settings import get_settings
+from history_store import get_history_store, PAGE_SIZE
+from languages import LANGUAGES
+from cancellation import RequestTracker, TranslationCancelled
+from telemetry import TELEMETRY_FILE, format_timeline, get_telemetry, start_trace
+# translator (requests, googletrans, config) импортируется при первом переводе,
+# чтобы не задерживать появление окна и иконки в трее
 
 def resource_path(relative_path):
     """ Get absolute path to resource, works for dev and for PyInstaller """
@@ -21,33 +34,19 @@ def resource_path(relative_path):
 
     return os.path.join(base_path, relative_path)
 
-LANGUAGES = [
-    ("English", "en"),
-    ("Russian", "ru"),
-    ("Spanish", "es"),
-    ("Chinese", "zh"),
-    ("Hindi", "hi"),
-    ("Arabic", "ar"),
-    ("Portuguese", "pt"),
-    ("Bengali", "bn"),
-    ("Japanese", "ja"),
-    ("Kazakh", "kk"),
-    ("Kyrgyz", "ky"),
-    ("Uzbek", "uz"),
-    ("German", "de"),
-    ("French", "fr"),
-    ("Italian", "it"),
-    ("Turkish", "tr"),
-    ("Korean", "ko"),
-    ("Vietnamese", "vi"),
-    ("Polish", "pl"),
-    ("Dutch", "nl"),
-    ("Ukrainian", "uk"),
-    ("Persian", "fa"),
-    ("Indonesian", "id"),
-]
+def circle_offsets(count, radius):
+    return [
+        (radius * math.cos(i * 2 * math.pi / count), radius * math.sin(i * 2 * math.pi / count))
+        for i in range(count)
+    ]
 
 class LoadingSpinner(QWidget):
+    DOTS = 8
+    RADIUS = 12
+    DOT_RADIUS = 3
+    # Смещения точек от центра считаются один раз, а не в каждом paintEvent
+    OFFSETS = circle_offsets(DOTS, RADIUS)
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setFixedSize(32, 32)
@@ -64,17 +63,15 @@ class LoadingSpinner(QWidget):
         painter = QPainter(self)
         painter.setRenderHint(QPainter.Antialiasing)
         center = self.rect().center()
-        radius = 12
-        dot_radius = 3
+        dot_radius = self.DOT_RADIUS
         color = QColor("#2196F3")
-        for i in range(8):
+        painter.setPen(Qt.NoPen)
+        for i, (dx, dy) in enumerate(self.OFFSETS):
             alpha = 150 + 105 * ((i + self.angle) % 8) // 7  # плавная прозрачность
             color.setAlpha(alpha)
             painter.setBrush(color)
-            painter.setPen(Qt.NoPen)
-            angle_rad = (i * 45) * 3.14159 / 180
-            x = center.x() + radius * float(np.cos(angle_rad))
-            y = center.y() + radius * float(np.sin(angle_rad))
+            x = center.x() + dx
+            y = center.y() + dy
             painter.drawEllipse(int(x - dot_radius), int(y - dot_radius), dot_radius * 2, dot_radius * 2)
 
     def start(self):
@@ -125,11 +122,13 @@ class ModernComboBox(QComboBox):
             }
         """)
 
-class ModernTextEdit(QTextEdit):
+class ModernTextEdit(QPlainTextEdit):
+    # QPlainTextEdit, а не QTextEdit: раскладывает только видимые абзацы и не
+    # разбирает текст как HTML, поэтому мегабайтные тексты не вешают окно
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setStyleSheet("""
-            QTextEdit {
+            QPlainTextEdit {
                 border: 1px solid #BDBDBD;
                 border-radius: 8px;
                 padding: 12px;
@@ -138,6 +137,120 @@ class ModernTextEdit(QTextEdit):
             }
         """)
 
+class ChunkedTextWriter(QObject):
+    """
+    Вывод большого текста в текстовое поле порциями через QTextCursor. За
+    один тик event loop вставляется не дольше TICK_BUDGET_MS, остальное — в
+    следующих тиках, так что окно продолжает перерисовываться. Мелкие
+    фрагменты стрима склеиваются в одну вставку за тик.
+    """
+    CHUNK_CHARS = 16384
+    TICK_BUDGET_MS = 8
+    drained = pyqtSignal()
+
+    def __init__(self, edit):
+        super().__init__(edit)
+        self.edit = edit
+        # Стек отмены для поля только для чтения не нужен, а память он съел бы
+        self.edit.setUndoRedoEnabled(False)
+        self.pending = deque()
+        self.timer = QTimer(self)
+        self.timer.setInterval(0)
+        self.timer.timeout.connect(self.flush)
+
+    def busy(self):
+        return bool(self.pending)
+
+    def clear(self):
+        self.pending.clear()
+        self.timer.stop()
+        self.edit.clear()
+
+    def set_text(self, text):
+        self.clear()
+        self.append(text)
+        if not text:
+            self.drained.emit()
+
+    def append(self, text):
+        if text:
+            self.pending.append(text)
+            if not self.timer.isActive():
+                self.timer.start()
+
+    def flush(self):
+        deadline = time.perf_counter() + self.TICK_BUDGET_MS / 1000
+        cursor = QTextCursor(self.edit.document())
+        cursor.movePosition(QTextCursor.End)
+        while self.pending and time.perf_counter() < deadline:
+            cursor.insertText(self.next_chunk())
+        if not self.pending:
+            self.timer.stop()
+            self.drained.emit()
+
+    def flush_all(self):
+        if self.pending:
+            cursor = QTextCursor(self.edit.document())
+            cursor.movePosition(QTextCursor.End)
+            while self.pending:
+                cursor.insertText(self.next_chunk())
+            self.timer.stop()
+            self.drained.emit()
+
+    def next_chunk(self):
+        parts, size = [], 0
+        while self.pending and size < self.CHUNK_CHARS:
+            piece = self.pending.popleft()
+            if size + len(piece) > self.CHUNK_CHARS:
+                # Режем по переводу строки, чтобы не разрывать абзац посередине
+                limit = self.CHUNK_CHARS - size
+                cut = piece.rfind("\n", 0, limit) + 1 or limit
+                self.pending.appendleft(piece[cut:])
+                piece = piece[:cut]
+            parts.append(piece)
+            size += len(piece)
+        return "".join(parts)
+
+
+class SideBySideView(QSplitter):
+    """
+    Оригинал и перевод рядом, с синхронной прокруткой. Оба поля —
+    QPlainTextEdit, поэтому раскладывается только видимая часть текста.
+    """
+
+    def __init__(self, output, parent=None):
+        super().__init__(Qt.Horizontal, parent)
+        self.source = ModernTextEdit()
+        self.source.setReadOnly(True)
+        self.source.setMinimumHeight(120)
+        self.source_writer = ChunkedTextWriter(self.source)
+        self.output = output
+        self.addWidget(self.source)
+        self.addWidget(output)
+        self.source.hide()
+        self._syncing = False
+        for edit, other in ((self.source, output), (output, self.source)):
+            edit.verticalScrollBar().valueChanged.connect(partial(self.sync_scroll, edit, other))
+
+    def set_source(self, text):
+        self.source_writer.set_text(text)
+
+    def set_side_by_side(self, enabled):
+        self.source.setVisible(enabled)
+
+    def sync_scroll(self, edit, other, value):
+        if self._syncing or not self.source.isVisible():
+            return
+        # Переводы обычно сохраняют число абзацев, так что хватает пропорции
+        maximum = edit.verticalScrollBar().maximum()
+        target = other.verticalScrollBar()
+        self._syncing = True
+        try:
+            target.setValue(round(value / maximum * target.maximum()) if maximum else 0)
+        finally:
+            self._syncing = False
+
+
 class Sidebar(QFrame):
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -172,6 +285,8 @@ class Sidebar(QFrame):
         self.list.setFrameShape(QFrame.NoFrame)
         self.list.setSpacing(4)
         self.list.addItem(QListWidgetItem(QIcon(resource_path("icon.png")), "Translate"))
+        self.list.addItem(QListWidgetItem(QIcon(resource_path("icon.png")), "Multi"))
+        self.list.addItem(QListWidgetItem(QIcon(resource_path("icon.png")), "History"))
         self.list.addItem(QListWidgetItem(QIcon(resource_path("icon.png")), "Settings"))
         self.list.setCurrentRow(0)
         layout.addWidget(self.list)
@@ -199,28 +314,182 @@ class HotkeyCaptureDialog(QDialog):
 class TranslateWorkerSignals(QObject):
     finished = pyqtSignal(str)
     error = pyqtSignal(str)
+    chunk = pyqtSignal(str)
+    first_token = pyqtSignal(float)
+    progress = pyqtSignal(int, int)
 
 class TranslateWorker(QRunnable):
-    def __init__(self, text, target_lang_name, target_lang_code):
+    def __init__(self, text, target_lang_name, target_lang_code, stream=False, document_workers=4,
+                 cancel_token=None, trace=None, use_daemon=False):
         super().__init__()
         self.text = text
         self.target_lang_name = target_lang_name
         self.target_lang_code = target_lang_code
+        self.stream = stream
+        self.document_workers = document_workers
+        self.cancel_token = cancel_token
+        self.use_daemon = use_daemon
+        self.streamed = False  # часть перевода уже ушла в сигнал chunk
+        # Успешный trace завершает страница после отрисовки, ошибку — сам воркер
+        self.trace = trace or start_trace("translate")
+        self.queued_at = time.perf_counter()
         self.signals = TranslateWorkerSignals()
 
+    def run(self):
+        # Сколько запрос ждал свободного потока в QThreadPool
+        self.trace.add_span("queue", self.queued_at, time.perf_counter())
+        with self.trace.activate():
+            with self.trace.span("worker"):
+                self.translate()
+
+    def translate(self):
+        import translator
+        try:
+            translated = self.translate_with_daemon() if self.use_daemon else None
+            if translated is None:
+                translated = self.translate_with(translator)
+            if isinstance(translated, translator.PartialTranslation):
+                # Документ переведён не целиком: показываем его с пометками об
+                # ошибках, но в историю и память переводов не сохраняем
+                if not (self.cancel_token and self.cancel_token.cancelled):
+                    self.signals.finished.emit(translated)
+                else:
+                    self.trace.finish("cancelled")
+            elif isinstance(translated, translator.ErrorText):
+                # Ошибка (в том числе 429) — не перевод: в поле вывода её не кладём
+                if not (self.cancel_token and self.cancel_token.cancelled):
+                    self.trace.finish(str(translated))
+                    self.signals.error.emit(str(translated))
+                else:
+                    self.trace.finish("cancelled")
+            elif not (self.cancel_token and self.cancel_token.cancelled):
+                self.signals.finished.emit(translated)
+                translator.save_history(self.text, self.target_lang_name, translated)
+            else:
+                self.trace.finish("cancelled")
+        except TranslationCancelled:
+            # Запрос вытеснен более новым — результат никому не нужен
+            self.trace.finish("cancelled")
+        except Exception as e:
+            self.trace.finish(str(e))
+            self.signals.error.emit(str(e))
+
+    def translate_with_daemon(self):
+        # Запущен демон (main.py --daemon) — переводит он, с общим кэшем и
+        # прогретыми соединениями. Если он пропал, переводим сами
+        from daemon_client import DaemonUnavailable, find_daemon, forget_daemon
+        client = find_daemon()
+        if client is None:
+            return None
+        try:
+            return self.translate_with(client)
+        except DaemonUnavailable as e:
+            forget_daemon()
+            if self.streamed:
+                # Начало перевода уже показано — локальный перевод его бы задублировал
+                from translator import ErrorText
+                return ErrorText(f"[Error] Translation daemon stopped mid-stream: {e}")
+            print(f"Демон перевода недоступен, переводим локально: {e}")
+            return None
+
+    def translate_with(self, api):
+        # api — модуль translator или daemon_client.DaemonClient с теми же функциями
+        from translator import is_large_document
+        if is_large_document(self.text):
+            # Большой документ — по кускам параллельно
+            return api.translate_document(
+                self.text, self.target_lang_name, self.target_lang_code, max_workers=self.document_workers,
+                on_progress=self.signals.progress.emit, cancel_token=self.cancel_token,
+            )
+        if self.stream:
+            return self.run_stream(api)
+        return api.translate_text(
+            self.text, self.target_lang_name, self.target_lang_code, cancel_token=self.cancel_token
+        )
+
+    def run_stream(self, api):
+        from translator import ErrorText
+        started = time.perf_counter()
+        parts = []
+        for piece in api.translate_text_stream(
+                self.text, self.target_lang_name, self.target_lang_code, cancel_token=self.cancel_token):
+            if isinstance(piece, ErrorText):
+                # Уже показанная часть перевода остаётся, ошибка уходит в сигнал error
+                return piece
+            if not parts:
+                now = time.perf_counter()
+                self.trace.add_span("first_token", started, now)
+                self.signals.first_token.emit(now - started)
+            parts.append(piece)
+            self.streamed = True
+            self.signals.chunk.emit(piece)
+        return "".join(parts).strip()
+
+class MultiTranslateWorkerSignals(QObject):
+    result = pyqtSignal(str, str)
+    finished = pyqtSignal()
+    error = pyqtSignal(str)
+
+class MultiTranslateWorker(QRunnable):
+    def __init__(self, text, targets, cancel_token=None):
+        super().__init__()
+        self.text = text
+        self.targets = targets
+        self.cancel_token = cancel_token
+        self.signals = MultiTranslateWorkerSignals()
+
+    def run(self):
+        from translator import translate_multi
+        try:
+            translate_multi(
+                self.text, self.targets, on_result=self.signals.result.emit, cancel_token=self.cancel_token
+            )
+            self.signals.finished.emit()
+        except TranslationCancelled:
+            pass
+        except Exception as e:
+            self.signals.error.emit(str(e))
+
+class LiveTranslateWorkerSignals(QObject):
+    finished = pyqtSignal(str, int, int)
+    error = pyqtSignal(str)
+
+class LiveTranslateWorker(QRunnable):
+    def __init__(self, incremental, text, target_lang_name, target_lang_code, cancel_token=None):
+        super().__init__()
+        self.incremental = incremental
+        self.text = text
+        self.target_lang_name = target_lang_name
+        self.target_lang_code = target_lang_code
+        self.cancel_token = cancel_token
+        self.signals = LiveTranslateWorkerSignals()
+
     def run(self):
         try:
-            translated = translate_text(self.text, self.target_lang_name, self.target_lang_code)
-            self.signals.finished.emit(translated)
+            translated, changed, total = self.incremental.translate(
+                self.text, self.target_lang_name, self.target_lang_code, cancel_token=self.cancel_token
+            )
+            self.signals.finished.emit(translated, changed, total)
+        except TranslationCancelled:
+            pass
         except Exception as e:
             self.signals.error.emit(str(e))
 
 class TranslatorPage(QWidget):
+    LIVE_DEBOUNCE_MS = 700
+
     def __init__(self, parent=None):
         super().__init__(parent)
-        self.settings = load_settings()
+        self.settings = get_settings()
         self.threadpool = QThreadPool()
+        self.requests = RequestTracker()
+        self.incremental = None
+        self.live_timer = QTimer(self)
+        self.live_timer.setSingleShot(True)
+        self.live_timer.setInterval(self.LIVE_DEBOUNCE_MS)
+        self.live_timer.timeout.connect(self.perform_live_translation)
         self.init_ui()
+        self.settings.subscribe(self.on_setting_changed)
 
     def init_ui(self):
         layout = QVBoxLayout(self)
@@ -247,19 +516,35 @@ class TranslatorPage(QWidget):
         lang_layout.addWidget(QLabel("Translate to:"))
         lang_layout.addWidget(self.lang_select)
         lang_layout.addStretch()
+        # Live-режим: перевод обновляется по мере набора текста
+        self.live_checkbox = QCheckBox("Live")
+        self.live_checkbox.setStyleSheet("font-size: 15px;")
+        self.live_checkbox.setChecked(self.settings.get("live_translation", False))
+        self.live_checkbox.toggled.connect(self.toggle_live_translation)
+        lang_layout.addWidget(self.live_checkbox)
+        self.side_by_side_checkbox = QCheckBox("Side by side")
+        self.side_by_side_checkbox.setStyleSheet("font-size: 15px;")
+        self.side_by_side_checkbox.setChecked(self.settings.get("side_by_side", False))
+        self.side_by_side_checkbox.toggled.connect(self.toggle_side_by_side)
+        lang_layout.addWidget(self.side_by_side_checkbox)
         layout.addLayout(lang_layout)
 
         self.text_input = ModernTextEdit()
         self.text_input.setPlaceholderText("Enter text to translate...")
         self.text_input.setMinimumHeight(120)
+        self.text_input.textChanged.connect(self.schedule_live_translation)
+        self.lang_select.currentTextChanged.connect(self.schedule_live_translation)
         layout.addWidget(self.text_input)
 
         button_layout = QHBoxLayout()
         self.translate_button = ModernButton("Translate")
         self.translate_button.clicked.connect(self.perform_translation)
         self.loading_spinner = LoadingSpinner()
+        self.status_label = QLabel()
+        self.status_label.setStyleSheet("font-size: 13px; color: #777;")
         button_layout.addWidget(self.translate_button)
         button_layout.addWidget(self.loading_spinner)
+        button_layout.addWidget(self.status_label)
         button_layout.addStretch()
         self.clear_button = ModernButton("Clear")
         self.clear_button.clicked.connect(self.clear_fields)
@@ -273,7 +558,14 @@ class TranslatorPage(QWidget):
         self.text_output.setReadOnly(True)
         self.text_output.setPlaceholderText("Translation will appear here...")
         self.text_output.setMinimumHeight(120)
-        output_layout.addWidget(self.text_output)
+        # Большой перевод выводится порциями по тикам event loop, а не одним setPlainText
+        self.output_writer = ChunkedTextWriter(self.text_output)
+        self.output_writer.drained.connect(self.on_output_drained)
+        self.pending_render = None
+        self.streamed_request = None
+        self.output_view = SideBySideView(self.text_output)
+        self.output_view.set_side_by_side(self.side_by_side_checkbox.isChecked())
+        output_layout.addWidget(self.output_view)
         self.copy_button = ModernButton("Copy")
         self.copy_button.setStyleSheet(self.copy_button.styleSheet().replace("#2196F3", "#2196F3"))
         self.copy_button.clicked.connect(self.copy_translation)
@@ -281,12 +573,75 @@ class TranslatorPage(QWidget):
         layout.addLayout(output_layout)
 
     def save_language_choice(self, lang):
-        self.settings["last_language"] = lang
-        save_settings(self.settings)
+        self.settings.set("last_language", lang)
+
+    def on_setting_changed(self, key, value):
+        # Язык могли сменить на странице настроек
+        if key == "last_language" and value != self.lang_select.currentText():
+            self.lang_select.setCurrentText(value)
+
+    def toggle_live_translation(self, enabled):
+        self.settings.set("live_translation", enabled)
+        if enabled:
+            self.schedule_live_translation()
+        else:
+            self.live_timer.stop()
+
+    def toggle_side_by_side(self, enabled):
+        self.settings.set("side_by_side", enabled)
+        self.output_view.set_side_by_side(enabled)
+
+    def schedule_live_translation(self, *args):
+        if self.live_checkbox.isChecked():
+            self.live_timer.start()
+
+    def perform_live_translation(self):
+        text = self.text_input.toPlainText()
+        if not text.strip():
+            self.requests.cancel()
+            self.output_writer.clear()
+            self.status_label.clear()
+            return
+        target_lang_name = self.lang_select.currentText()
+        target_lang_code = next(
+            (code for name, code in LANGUAGES if name == target_lang_name),
+            None,
+        )
+        if self.incremental is None:
+            from incremental import IncrementalTranslator
+            self.incremental = IncrementalTranslator()
+        self.loading_spinner.start()
+        self.output_view.set_source(text)
+        token = self.requests.start()
+        worker = LiveTranslateWorker(self.incremental, text, target_lang_name, target_lang_code, cancel_token=token)
+        worker.signals.finished.connect(partial(self.on_live_translation_finished, token.request_id))
+        worker.signals.error.connect(partial(self.on_live_translation_error, token.request_id))
+        self.threadpool.start(worker)
+
+    def on_live_translation_finished(self, request_id, translated, changed, total):
+        if not self.requests.is_current(request_id):
+            return
+        self.requests.finish(request_id)
+        self.output_writer.set_text(translated)
+        self.status_label.setText(f"Live: {changed} / {total} sentences updated")
+        self.reset_translate_button()
+
+    def on_live_translation_error(self, request_id, error):
+        # Живой перевод запускается сам на каждую правку — модальное окно
+        # прерывало бы ввод. Ошибка видна в строке состояния до следующей попытки
+        if not self.requests.is_current(request_id):
+            return
+        self.requests.finish(request_id)
+        self.status_label.setText(f"Live: {error.splitlines()[0] if error else 'translation failed'}")
+        self.reset_translate_button()
 
     def clear_fields(self):
+        self.live_timer.stop()
+        self.requests.cancel()
+        self.reset_translate_button()
         self.text_input.clear()
-        self.text_output.clear()
+        self.output_writer.clear()
+        self.output_view.set_source("")
 
     def perform_translation(self):
         text = self.text_input.toPlainText()
@@ -298,27 +653,89 @@ class TranslatorPage(QWidget):
             (code for name, code in LANGUAGES if name == target_lang_name),
             None,
         )
-        self.translate_button.setEnabled(False)
+        # Кнопка остаётся активной: повторное нажатие вытесняет текущий запрос
         self.translate_button.setText("Translating...")
         self.loading_spinner.start()
-        worker = TranslateWorker(text, target_lang_name, target_lang_code)
-        worker.signals.finished.connect(self.on_translation_finished)
-        worker.signals.error.connect(self.on_translation_error)
+        self.status_label.clear()
+        self.drop_pending_render()
+        self.output_view.set_source(text)
+        stream = self.settings.get("streaming", True)
+        token = self.requests.start()
+        worker = TranslateWorker(
+            text, target_lang_name, target_lang_code, stream=stream,
+            document_workers=self.settings.get("document_workers", 4), cancel_token=token,
+            trace=start_trace("translate", chars=len(text), target=target_lang_code, stream=stream),
+            use_daemon=self.settings.get("use_daemon", True),
+        )
+        # Каждый слот получает id запроса, чтобы отбросить результаты вытесненных
+        worker.signals.finished.connect(partial(self.on_translation_finished, token.request_id, worker.trace))
+        worker.signals.error.connect(partial(self.on_translation_error, token.request_id))
+        worker.signals.progress.connect(partial(self.on_translation_progress, token.request_id))
+        if stream:
+            self.output_writer.clear()
+            worker.signals.chunk.connect(partial(self.on_translation_chunk, token.request_id))
+            worker.signals.first_token.connect(partial(self.on_first_token, token.request_id))
         self.threadpool.start(worker)
 
-    def on_translation_finished(self, translated):
-        self.text_output.setPlainText(translated)
-        self.translate_button.setEnabled(True)
-        self.translate_button.setText("Translate")
-        self.loading_spinner.stop()
+    def on_translation_chunk(self, request_id, piece):
+        if not self.requests.is_current(request_id):
+            return
+        self.streamed_request = request_id
+        self.output_writer.append(piece)
 
-    def on_translation_error(self, error):
+    def on_translation_progress(self, request_id, done, total):
+        if not self.requests.is_current(request_id):
+            return
+        self.status_label.setText(f"Parts: {done} / {total}")
+
+    def on_first_token(self, request_id, seconds):
+        if not self.requests.is_current(request_id):
+            return
+        self.status_label.setText(f"First token: {seconds * 1000:.0f} ms")
+
+    def on_translation_finished(self, request_id, trace, translated):
+        if not self.requests.is_current(request_id):
+            trace.finish("superseded")
+            return
+        self.requests.finish(request_id)
+        self.reset_translate_button()
+        self.drop_pending_render()
+        # trace завершится, когда перевод целиком окажется в поле вывода
+        self.pending_render = (trace, time.perf_counter(), len(translated))
+        if self.streamed_request != request_id:
+            self.output_writer.set_text(translated)
+        elif not self.output_writer.busy():
+            self.on_output_drained()
+
+    def drop_pending_render(self):
+        # Предыдущий перевод ещё дописывался в поле, но его уже сменяет новый
+        if self.pending_render is not None:
+            self.pending_render[0].finish("superseded")
+            self.pending_render = None
+
+    def on_output_drained(self):
+        if self.pending_render is None or self.output_writer.busy():
+            return
+        trace, started, chars = self.pending_render
+        self.pending_render = None
+        trace.add_span("render", started, time.perf_counter(), chars=chars)
+        trace.finish()
+
+    def on_translation_error(self, request_id, error):
+        if not self.requests.is_current(request_id):
+            return
+        self.requests.finish(request_id)
         QMessageBox.warning(self, "Error", f"Translation failed: {error}")
+        self.reset_translate_button()
+
+    def reset_translate_button(self):
         self.translate_button.setEnabled(True)
         self.translate_button.setText("Translate")
         self.loading_spinner.stop()
 
     def copy_translation(self):
+        # Копируем перевод целиком, даже если он ещё дописывается в поле
+        self.output_writer.flush_all()
         text = self.text_output.toPlainText()
         if text.strip():
             QApplication.clipboard().setText(text)
@@ -337,12 +754,390 @@ class TranslatorPage(QWidget):
             """
         )
 
+class MultiTranslatePage(QWidget):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.settings = get_settings()
+        self.threadpool = QThreadPool()
+        self.requests = RequestTracker()
+        self.outputs = {}
+        self.init_ui()
+
+    def init_ui(self):
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(40, 40, 40, 40)
+        layout.setSpacing(25)
+        title = QLabel("Multi-language translation")
+        title.setFont(QFont("Segoe UI", 22, QFont.Bold))
+        title.setStyleSheet("color: #222; margin-bottom: 10px;")
+        layout.addWidget(title)
+
+        top_layout = QHBoxLayout()
+        self.text_input = ModernTextEdit()
+        self.text_input.setPlaceholderText("Enter text to translate...")
+        self.text_input.setMinimumHeight(120)
+        top_layout.addWidget(self.text_input, 3)
+        self.lang_list = QListWidget()
+        self.lang_list.setStyleSheet("QListWidget { background: white; border: 1px solid #BDBDBD; border-radius: 8px; font-size: 14px; }")
+        selected = set(self.settings.get("multi_languages", ["English", "Russian", "Spanish", "German", "French"]))
+        for name, code in LANGUAGES:
+            item = QListWidgetItem(name)
+            item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
+            item.setCheckState(Qt.Checked if name in selected else Qt.Unchecked)
+            self.lang_list.addItem(item)
+        self.lang_list.itemChanged.connect(self.save_selected_languages)
+        top_layout.addWidget(self.lang_list, 1)
+        layout.addLayout(top_layout)
+
+        button_layout = QHBoxLayout()
+        self.translate_button = ModernButton("Translate")
+        self.translate_button.clicked.connect(self.perform_translation)
+        self.loading_spinner = LoadingSpinner()
+        button_layout.addWidget(self.translate_button)
+        button_layout.addWidget(self.loading_spinner)
+        button_layout.addStretch()
+        layout.addLayout(button_layout)
+
+        # Результаты рядом друг с другом, по мере готовности
+        self.results_widget = QWidget()
+        self.results_layout = QGridLayout(self.results_widget)
+        self.results_layout.setSpacing(12)
+        scroll = QScrollArea()
+        scroll.setWidgetResizable(True)
+        scroll.setFrameShape(QFrame.NoFrame)
+        scroll.setWidget(self.results_widget)
+        layout.addWidget(scroll, 1)
+
+    def selected_targets(self):
+        return [
+            LANGUAGES[row] for row in range(self.lang_list.count())
+            if self.lang_list.item(row).checkState() == Qt.Checked
+        ]
+
+    def save_selected_languages(self, item):
+        self.settings.set("multi_languages", [name for name, code in self.selected_targets()])
+
+    def perform_translation(self):
+        text = self.text_input.toPlainText()
+        targets = self.selected_targets()
+        if not text.strip():
+            QMessageBox.warning(self, "Warning", "Please enter text to translate")
+            return
+        if not targets:
+            QMessageBox.warning(self, "Warning", "Please select at least one language")
+            return
+        self.build_outputs(targets)
+        self.translate_button.setText("Translating...")
+        self.loading_spinner.start()
+        token = self.requests.start()
+        worker = MultiTranslateWorker(text, targets, cancel_token=token)
+        worker.signals.result.connect(partial(self.on_result, token.request_id))
+        worker.signals.finished.connect(partial(self.on_translation_finished, token.request_id))
+        worker.signals.error.connect(partial(self.on_translation_error, token.request_id))
+        self.threadpool.start(worker)
+
+    def build_outputs(self, targets):
+        while self.results_layout.count():
+            widget = self.results_layout.takeAt(0).widget()
+            if widget:
+                widget.deleteLater()
+        self.outputs = {}
+        columns = 3 if len(targets) > 4 else 2
+        for i, (name, code) in enumerate(targets):
+            label = QLabel(name)
+            label.setStyleSheet("font-size: 14px; font-weight: bold; color: #444;")
+            output = ModernTextEdit()
+            output.setReadOnly(True)
+            output.setPlaceholderText("Translating...")
+            output.setMinimumHeight(100)
+            row, column = divmod(i, columns)
+            self.results_layout.addWidget(label, row * 2, column)
+            self.results_layout.addWidget(output, row * 2 + 1, column)
+            self.outputs[code] = output
+
+    def on_result(self, request_id, code, translated):
+        if not self.requests.is_current(request_id):
+            return
+        if code in self.outputs:
+            self.outputs[code].setPlainText(translated)
+
+    def on_translation_finished(self, request_id):
+        if not self.requests.is_current(request_id):
+            return
+        self.requests.finish(request_id)
+        self.reset_translate_button()
+
+    def on_translation_error(self, request_id, error):
+        if not self.requests.is_current(request_id):
+            return
+        self.requests.finish(request_id)
+        QMessageBox.warning(self, "Error", f"Translation failed: {error}")
+        self.reset_translate_button()
+
+    def reset_translate_button(self):
+        self.translate_button.setEnabled(True)
+        self.translate_button.setText("Translate")
+        self.loading_spinner.stop()
+
+class HistoryTableModel(QAbstractTableModel):
+    """
+    Модель истории, подгружающая строки страницами по мере прокрутки:
+    открытие не зависит от размера истории.
+    """
+
+    HEADERS = ["Time", "Language", "Source", "Translation"]
+    PREVIEW_CHARS = 200
+
+    def __init__(self, store, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.query = ""
+        self.rows = []
+        self.exhausted = False
+
+    def set_query(self, query):
+        self.beginResetModel()
+        self.query = query
+        self.rows = []
+        self.exhausted = False
+        self.endResetModel()
+
+    def refresh(self):
+        self.set_query(self.query)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        _, created_at, target, source, translation = self.rows[index.row()]
+        if role == Qt.DisplayRole:
+            if index.column() == 0:
+                return time.strftime("%Y-%m-%d %H:%M", time.localtime(created_at))
+            if index.column() == 1:
+                return target
+            text = source if index.column() == 2 else translation
+            # В таблице — одна строка; полный текст в подсказке
+            return " ".join(text[:self.PREVIEW_CHARS].split())
+        if role == Qt.ToolTipRole and index.column() >= 2:
+            return source if index.column() == 2 else translation
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self.exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+        before_id = self.rows[-1][0] if self.rows else None
+        page = self.store.page(self.query, before_id=before_id, limit=PAGE_SIZE)
+        if len(page) < PAGE_SIZE:
+            self.exhausted = True
+        if not page:
+            return
+        self.beginInsertRows(QModelIndex(), len(self.rows), len(self.rows) + len(page) - 1)
+        self.rows.extend(page)
+        self.endInsertRows()
+
+    def entry(self, row):
+        return self.rows[row]
+
+class HistoryPage(QWidget):
+    SEARCH_DEBOUNCE_MS = 300
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.store = get_history_store()
+        self.model = HistoryTableModel(self.store, self)
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(self.SEARCH_DEBOUNCE_MS)
+        self.search_timer.timeout.connect(self.apply_search)
+        self.init_ui()
+
+    def init_ui(self):
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(40, 40, 40, 40)
+        layout.setSpacing(25)
+        title = QLabel("History")
+        title.setFont(QFont("Segoe UI", 22, QFont.Bold))
+        title.setStyleSheet("color: #222; margin-bottom: 10px;")
+        layout.addWidget(title)
+
+        search_layout = QHBoxLayout()
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("Search history...")
+        self.search_input.setStyleSheet("QLineEdit { border: 1px solid #BDBDBD; border-radius: 8px; padding: 8px; background: white; font-size: 15px; }")
+        self.search_input.textChanged.connect(self.search_timer.start)
+        search_layout.addWidget(self.search_input)
+        self.clear_button = ModernButton("Clear history")
+        self.clear_button.setStyleSheet(self.clear_button.styleSheet().replace("#2196F3", "#F44336"))
+        self.clear_button.clicked.connect(self.clear_history)
+        search_layout.addWidget(self.clear_button)
+        layout.addLayout(search_layout)
+
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.table.setStyleSheet("QTableView { background: white; border: 1px solid #BDBDBD; border-radius: 8px; font-size: 14px; }")
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.setWordWrap(False)
+        self.table.verticalHeader().hide()
+        # Фиксированная высота строк: представлению не нужно измерять каждую
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.table.verticalHeader().setDefaultSectionSize(28)
+        header = self.table.horizontalHeader()
+        header.setSectionResizeMode(0, QHeaderView.ResizeToContents)
+        header.setSectionResizeMode(1, QHeaderView.ResizeToContents)
+        header.setSectionResizeMode(2, QHeaderView.Stretch)
+        header.setSectionResizeMode(3, QHeaderView.Stretch)
+        self.table.doubleClicked.connect(self.copy_entry)
+        layout.addWidget(self.table, 1)
+
+        hint = QLabel("Double-click a row to copy the translation")
+        hint.setStyleSheet("font-size: 13px; color: #555;")
+        layout.addWidget(hint)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        # Новые переводы могли появиться, пока страница была скрыта
+        self.model.refresh()
+
+    def apply_search(self):
+        self.model.set_query(self.search_input.text())
+
+    def copy_entry(self, index):
+        translation = self.model.entry(index.row())[4]
+        QApplication.clipboard().setText(translation)
+
+    def clear_history(self):
+        answer = QMessageBox.question(self, "Clear history", "Delete the whole translation history?")
+        if answer == QMessageBox.Yes:
+            self.store.clear()
+            self.model.refresh()
+
+class DiagnosticsPanel(QWidget):
+    """
+    Время по этапам последних запросов (захват, язык, HTTP, очередь,
+    отрисовка) и скользящие перцентили. Обновляется, только пока виден.
+    """
+    REFRESH_MS = 1000
+    STAGE_COLUMNS = ["Stage", "Count", "Errors", "p50 ms", "p95 ms", "p99 ms"]
+    TIMELINES = 10
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.settings = get_settings()
+        self.telemetry = get_telemetry()
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setInterval(self.REFRESH_MS)
+        self.refresh_timer.timeout.connect(self.refresh)
+        self.init_ui()
+
+    def init_ui(self):
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.setSpacing(10)
+
+        header = QHBoxLayout()
+        title = QLabel("Diagnostics")
+        title.setStyleSheet("font-size: 15px;")
+        self.log_check = QCheckBox(f"Write {TELEMETRY_FILE}")
+        self.log_check.setChecked(self.settings.get("telemetry_log", False))
+        self.log_check.toggled.connect(self.toggle_log)
+        copy_button = QPushButton("Copy metrics")
+        copy_button.setToolTip("Prometheus text format")
+        copy_button.clicked.connect(self.copy_metrics)
+        export_button = QPushButton("Export JSON lines")
+        export_button.clicked.connect(self.export_jsonl)
+        reset_button = QPushButton("Reset")
+        reset_button.clicked.connect(self.reset)
+        header.addWidget(title)
+        header.addStretch()
+        header.addWidget(self.log_check)
+        header.addWidget(copy_button)
+        header.addWidget(export_button)
+        header.addWidget(reset_button)
+        layout.addLayout(header)
+
+        self.stage_table = QTableWidget(0, len(self.STAGE_COLUMNS))
+        self.stage_table.setHorizontalHeaderLabels(self.STAGE_COLUMNS)
+        self.stage_table.verticalHeader().setVisible(False)
+        self.stage_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.stage_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.stage_table.setStyleSheet("font-size: 12px;")
+        layout.addWidget(self.stage_table, 1)
+
+        self.timeline_view = QPlainTextEdit()
+        self.timeline_view.setReadOnly(True)
+        self.timeline_view.setLineWrapMode(QPlainTextEdit.NoWrap)
+        self.timeline_view.setFont(QFont("Consolas", 9))
+        self.timeline_view.setPlaceholderText("No requests yet")
+        layout.addWidget(self.timeline_view, 2)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh()
+        self.refresh_timer.start()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.refresh_timer.stop()
+
+    def refresh(self):
+        stats = self.telemetry.stage_stats()
+        self.stage_table.setRowCount(len(stats))
+        for row, (stage, values) in enumerate(stats.items()):
+            cells = [stage, str(values["count"]), str(values["errors"])] + [
+                "-" if values[key] is None else f"{values[key] * 1000:.1f}" for key in ("p50", "p95", "p99")
+            ]
+            for column, text in enumerate(cells):
+                item = QTableWidgetItem(text)
+                if column:
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.stage_table.setItem(row, column, item)
+        traces = self.telemetry.recent_traces(self.TIMELINES)
+        text = "\n\n".join(format_timeline(trace) for trace in traces)
+        if text != self.timeline_view.toPlainText():
+            self.timeline_view.setPlainText(text)
+
+    def toggle_log(self, enabled):
+        self.settings.set("telemetry_log", enabled)
+        self.telemetry.set_log_path(TELEMETRY_FILE if enabled else None)
+
+    def copy_metrics(self):
+        QApplication.clipboard().setText(self.telemetry.to_prometheus())
+
+    def export_jsonl(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Export telemetry", "telemetry.jsonl", "JSON lines (*.jsonl)")
+        if not path:
+            return
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(self.telemetry.to_jsonl())
+        except OSError as e:
+            QMessageBox.warning(self, "Error", f"Could not save {path}: {e}")
+
+    def reset(self):
+        self.telemetry.reset()
+        self.refresh()
+
 class SettingsPage(QWidget):
     def __init__(self, parent=None, hotkey_handler=None):
         super().__init__(parent)
-        self.settings = load_settings()
+        self.settings = get_settings()
         self.hotkey_handler = hotkey_handler
         self.init_ui()
+        self.settings.subscribe(self.on_setting_changed)
 
     def init_ui(self):
         layout = QVBoxLayout(self)
@@ -381,23 +1176,295 @@ class SettingsPage(QWidget):
         hotkey_layout.addStretch()
         layout.addLayout(hotkey_layout)
 
-        layout.addStretch()
+        # Упреждающий перевод скопированного текста
+        speculative_layout = QHBoxLayout()
+        self.speculative_check = QCheckBox("Pre-translate copied text")
+        self.speculative_check.setStyleSheet("font-size: 15px;")
+        self.speculative_check.setToolTip(
+            "Translate new clipboard text into the default language in the background, "
+            "so the hotkey shows the result instantly. Uses API quota, capped per day."
+        )
+        self.speculative_check.setChecked(self.settings.get("speculative_translation", False))
+        self.speculative_check.toggled.connect(partial(self.settings.set, "speculative_translation"))
+        self.speculative_stats_label = QLabel()
+        self.speculative_stats_label.setStyleSheet("font-size: 13px; color: #555;")
+        speculative_layout.addWidget(self.speculative_check)
+        speculative_layout.addWidget(self.speculative_stats_label)
+        speculative_layout.addStretch()
+        layout.addLayout(speculative_layout)
+
+        # Кэш переводов
+        cache_layout = QHBoxLayout()
+        cache_label = QLabel("Cache:")
+        cache_label.setStyleSheet("font-size: 15px;")
+        self.cache_stats_label = QLabel()
+        self.cache_stats_label.setStyleSheet("font-size: 13px; color: #555;")
+        cache_layout.addWidget(cache_label)
+        cache_layout.addWidget(self.cache_stats_label)
+        cache_layout.addStretch()
+        layout.addLayout(cache_layout)
+
+        self.diagnostics = DiagnosticsPanel()
+        layout.addWidget(self.diagnostics, 1)
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.update_cache_stats()
+        self.update_speculative_stats()
+
+    def update_speculative_stats(self):
+        speculator = getattr(self.hotkey_handler, "speculator", None)
+        if speculator is None:
+            self.speculative_stats_label.clear()
+            return
+        stats = speculator.stats
+        self.speculative_stats_label.setText(
+            f"today {speculator.spent_today()} / {speculator.budget()} chars — "
+            f"translated: {stats['translated']}, cached: {stats['cached']}, skipped: {stats['skipped']}"
+        )
+
+    def update_cache_stats(self):
+        from translator import get_cache_stats
+        stats = get_cache_stats()
+        self.cache_stats_label.setText(
+            f"{stats['entries']} / {stats['max_entries']} entries, "
+            f"{stats['bytes'] // 1024} KB — hits: {stats['hits']}, misses: {stats['misses']} "
+            f"({stats['hit_rate']:.0%})"
+        )
 
     def save_language(self, lang):
-        self.settings["last_language"] = lang
-        save_settings(self.settings)
+        self.settings.set("last_language", lang)
+
+    def on_setting_changed(self, key, value):
+        if key == "last_language" and value != self.lang_combo.currentText():
+            self.lang_combo.setCurrentText(value)
+        elif key == "hotkey":
+            self.hotkey_display.setText(value)
+        elif key == "speculative_translation" and bool(value) != self.speculative_check.isChecked():
+            self.speculative_check.setChecked(bool(value))
 
     def change_hotkey(self):
         dlg = HotkeyCaptureDialog(self)
         if dlg.exec_() == QDialog.Accepted and dlg.hotkey:
             hotkey = dlg.hotkey
-            self.hotkey_display.setText(hotkey)
-            self.settings["hotkey"] = hotkey
-            save_settings(self.settings)
+            self.settings.set("hotkey", hotkey)
             if self.hotkey_handler:
                 self.hotkey_handler.set_hotkey(hotkey)
             QMessageBox.information(self, "Done", f"Hotkey changed to: {hotkey}")
 
+class TranslationPopup(QWidget):
+    """
+    Лёгкое окно с переводом по горячей клавише: без боковой панели, страниц
+    и своего трея. Создаётся заранее и переиспользуется (см. PopupPool).
+    """
+    WIDTH = 440
+    HEIGHT = 260
+    CURSOR_OFFSET = 16
+    ACTIVATION_GRACE = 0.3  # секунд после показа, пока потеря фокуса окно не прячет
+
+    def __init__(self, threadpool):
+        super().__init__(None, Qt.Tool | Qt.FramelessWindowHint | Qt.WindowStaysOnTopHint)
+        self.settings = get_settings()
+        self.threadpool = threadpool
+        self.requests = RequestTracker()
+        self.pinned = False
+        self.shown_at = 0.0
+        self.pending_render = None
+        self.streamed_request = None
+        self.resize(self.WIDTH, self.HEIGHT)
+        self.setStyleSheet("""
+            TranslationPopup {
+                background: #F5F5F5;
+                border: 1px solid #BDBDBD;
+                font-family: 'Segoe UI', Arial;
+            }
+        """)
+        self.init_ui()
+
+    def init_ui(self):
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(10, 8, 10, 10)
+        layout.setSpacing(6)
+        header = QHBoxLayout()
+        self.source_label = QLabel()
+        self.source_label.setStyleSheet("font-size: 12px; color: #777;")
+        self.source_label.setSizePolicy(QSizePolicy.Ignored, QSizePolicy.Preferred)
+        self.loading_spinner = LoadingSpinner()
+        self.pin_button = QPushButton("📌")
+        self.pin_button.setCheckable(True)
+        self.pin_button.setToolTip("Keep this window open; the next hotkey opens another one")
+        self.pin_button.toggled.connect(self.set_pinned)
+        self.copy_button = QPushButton("Copy")
+        self.copy_button.clicked.connect(self.copy_translation)
+        close_button = QPushButton("✕")
+        close_button.clicked.connect(self.hide)
+        header.addWidget(self.source_label, 1)
+        header.addWidget(self.loading_spinner)
+        for button in (self.pin_button, self.copy_button, close_button):
+            button.setFlat(True)
+            header.addWidget(button)
+        layout.addLayout(header)
+        self.text_output = ModernTextEdit()
+        self.text_output.setReadOnly(True)
+        self.output_writer = ChunkedTextWriter(self.text_output)
+        self.output_writer.drained.connect(self.on_output_drained)
+        layout.addWidget(self.text_output, 1)
+
+    def show_translation(self, text, pos=None):
+        """Показывает окно у курсора и запускает перевод text на last_language."""
+        started = time.perf_counter()
+        self.drop_pending_render()
+        self.output_writer.clear()
+        self.source_label.setText(" ".join(text.split())[:200])
+        self.move_near(pos or QCursor.pos())
+        self.show()
+        self.raise_()
+        self.activateWindow()
+        self.shown_at = time.monotonic()
+        target_lang_name = self.settings.get("last_language", "English")
+        target_lang_code = next((code for name, code in LANGUAGES if name == target_lang_name), None)
+        self.loading_spinner.start()
+        token = self.requests.start()
+        trace = start_trace("translate", chars=len(text), target=target_lang_code, stream=True, popup=True)
+        trace.add_span("show", started, time.perf_counter())
+        worker = TranslateWorker(
+            text, target_lang_name, target_lang_code, stream=True,
+            document_workers=self.settings.get("document_workers", 4), cancel_token=token,
+            trace=trace, use_daemon=self.settings.get("use_daemon", True),
+        )
+        worker.signals.finished.connect(partial(self.on_translation_finished, token.request_id, trace))
+        worker.signals.error.connect(partial(self.on_translation_error, token.request_id))
+        worker.signals.chunk.connect(partial(self.on_translation_chunk, token.request_id))
+        self.threadpool.start(worker)
+
+    def move_near(self, pos):
+        # Правее и ниже курсора, но целиком в пределах экрана
+        screen = QApplication.screenAt(pos) or QApplication.primaryScreen()
+        area = screen.availableGeometry()
+        x = min(pos.x() + self.CURSOR_OFFSET, area.right() - self.width())
+        y = pos.y() + self.CURSOR_OFFSET
+        if y + self.height() > area.bottom():
+            y = pos.y() - self.CURSOR_OFFSET - self.height()
+        self.move(max(area.left(), x), max(area.top(), y))
+
+    def on_translation_chunk(self, request_id, piece):
+        if not self.requests.is_current(request_id):
+            return
+        self.streamed_request = request_id
+        self.output_writer.append(piece)
+
+    def on_translation_finished(self, request_id, trace, translated):
+        if not self.requests.is_current(request_id):
+            trace.finish("superseded")
+            return
+        self.requests.finish(request_id)
+        self.loading_spinner.stop()
+        self.pending_render = (trace, time.perf_counter(), len(translated))
+        if self.streamed_request != request_id:
+            self.output_writer.set_text(translated)
+        elif not self.output_writer.busy():
+            self.on_output_drained()
+
+    def on_translation_error(self, request_id, error):
+        if not self.requests.is_current(request_id):
+            return
+        self.requests.finish(request_id)
+        self.loading_spinner.stop()
+        # Сообщение — в окне, без модального диалога поверх чужого приложения
+        self.output_writer.append(f"\n⚠️ Translation failed: {error}")
+
+    def drop_pending_render(self):
+        if self.pending_render is not None:
+            self.pending_render[0].finish("superseded")
+            self.pending_render = None
+
+    def on_output_drained(self):
+        if self.pending_render is None or self.output_writer.busy():
+            return
+        trace, started, chars = self.pending_render
+        self.pending_render = None
+        trace.add_span("render", started, time.perf_counter(), chars=chars)
+        trace.finish()
+
+    def copy_translation(self):
+        self.output_writer.flush_all()
+        text = self.text_output.toPlainText()
+        if text.strip():
+            QApplication.clipboard().setText(text)
+
+    def set_pinned(self, pinned):
+        self.pinned = pinned
+
+    def keyPressEvent(self, event):
+        if event.key() == Qt.Key_Escape:
+            self.hide()
+        else:
+            super().keyPressEvent(event)
+
+    def changeEvent(self, event):
+        # Непрозакреплённое окно прячется, когда пользователь уходит в другое окно
+        super().changeEvent(event)
+        if (event.type() == QEvent.ActivationChange and not self.isActiveWindow() and not self.pinned
+                and time.monotonic() - self.shown_at > self.ACTIVATION_GRACE):
+            self.hide()
+
+    def hideEvent(self, event):
+        # Перевод, который никто не увидит, отменяем
+        super().hideEvent(event)
+        self.requests.cancel()
+        self.loading_spinner.stop()
+        self.drop_pending_render()
+        self.pin_button.setChecked(False)
+
+
+class PopupPool:
+    """
+    Ограниченный набор заранее созданных TranslationPopup. Следующий перевод
+    занимает незакреплённое окно, новое создаётся, только если все
+    закреплены, а сверх MAX_POPUPS переиспользуется самое давнее.
+    """
+    MAX_POPUPS = 3
+
+    def __init__(self, max_popups=MAX_POPUPS):
+        self.max_popups = max_popups
+        self.threadpool = QThreadPool()
+        self.popups = []
+
+    def prewarm(self):
+        # Первое окно создаём заранее, чтобы горячая клавиша не ждала его сборки
+        if not self.popups:
+            self.popups.append(TranslationPopup(self.threadpool))
+
+    def acquire(self):
+        free = [popup for popup in self.popups if not popup.pinned]
+        if free:
+            # Видимое окно занимаем в первую очередь: перевод заменяет старый на месте
+            return max(free, key=lambda popup: (popup.isVisible(), popup.shown_at))
+        if len(self.popups) < self.max_popups:
+            popup = TranslationPopup(self.threadpool)
+            self.popups.append(popup)
+            return popup
+        popup = min(self.popups, key=lambda popup: popup.shown_at)
+        popup.pin_button.setChecked(False)
+        return popup
+
+    def show_translation(self, text):
+        popup = self.acquire()
+        popup.show_translation(text)
+        return popup
+
+
+_popup_pool = None
+
+
+def get_popup_pool():
+    # Окна Qt живут только в потоке GUI, поэтому замок не нужен
+    global _popup_pool
+    if _popup_pool is None:
+        _popup_pool = PopupPool()
+    return _popup_pool
+
+
 class TranslatorGUI(QWidget):
     def __init__(self, input_text="", hotkey_handler=None):
         super().__init__()
@@ -413,19 +1480,45 @@ class TranslatorGUI(QWidget):
         """)
         self.sidebar = Sidebar()
         self.stack = QStackedWidget()
-        self.translator_page = TranslatorPage()
         self.hotkey_handler = hotkey_handler
-        self.settings_page = SettingsPage(hotkey_handler=self.hotkey_handler)
+        self.translator_page = TranslatorPage()
+        # Остальные страницы строятся при первом открытии; до этого в стеке заглушки
+        self.multi_page = None
+        self.history_page = None
+        self.settings_page = None
+        self.page_factories = {
+            1: ("multi_page", MultiTranslatePage),
+            2: ("history_page", HistoryPage),
+            3: ("settings_page", lambda: SettingsPage(hotkey_handler=self.hotkey_handler)),
+        }
         self.stack.addWidget(self.translator_page)
-        self.stack.addWidget(self.settings_page)
+        for index in sorted(self.page_factories):
+            self.stack.addWidget(QWidget())
         main_layout = QHBoxLayout(self)
         main_layout.setContentsMargins(0, 0, 0, 0)
         main_layout.setSpacing(0)
         main_layout.addWidget(self.sidebar)
         main_layout.addWidget(self.stack)
-        self.sidebar.list.currentRowChanged.connect(self.stack.setCurrentIndex)
+        self.sidebar.list.currentRowChanged.connect(self.show_page)
         self.init_tray_icon()
 
+    def show_page(self, index):
+        factory = self.page_factories.pop(index, None)
+        if factory:
+            attribute, create = factory
+            page = create()
+            setattr(self, attribute, page)
+            placeholder = self.stack.widget(index)
+            self.stack.insertWidget(index, page)
+            self.stack.removeWidget(placeholder)
+            placeholder.deleteLater()
+        self.stack.setCurrentIndex(index)
+
+    def set_hotkey_handler(self, hotkey_handler):
+        self.hotkey_handler = hotkey_handler
+        if self.settings_page is not None:
+            self.settings_page.hotkey_handler = hotkey_handler
+
     def init_tray_icon(self):
         self.tray_icon = QSystemTrayIcon(QIcon(resource_path("icon.png")), parent=self)
         tray_menu = QMenu()
@@ -0,0 +1,204 @@
+import atexit
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+# История переводов в SQLite с полнотекстовым поиском (FTS5). Запись идёт
+# пачками в фоновом потоке, чтобы сохранение не тормозило UI; чтение —
+# страницами по id, поэтому длина истории на скорость не влияет.
+
+HISTORY_FILE = "history.db"
+HISTORY_MAX_ENTRIES = 200000
+HISTORY_RETENTION_DAYS = 365
+FLUSH_INTERVAL = 1.0
+FLUSH_BATCH = 500
+PAGE_SIZE = 200
+
+
+def _fts_query(text):
+    # Каждое слово — префиксный поиск в кавычках, чтобы пользовательский ввод
+    # не разбирался как синтаксис FTS5
+    terms = [term.replace('"', '""') for term in text.split()]
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+class HistoryStore:
+    def __init__(self, path=HISTORY_FILE, max_entries=HISTORY_MAX_ENTRIES,
+                 retention_days=HISTORY_RETENTION_DAYS):
+        self.path = path
+        self.max_entries = max_entries
+        self.retention_days = retention_days
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS history ("
+            " id INTEGER PRIMARY KEY,"
+            " created_at REAL NOT NULL,"
+            " target TEXT NOT NULL,"
+            " source TEXT NOT NULL,"
+            " translation TEXT NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS history_created ON history (created_at)")
+        self.has_fts = self._create_fts()
+        self._conn.commit()
+        self.apply_retention()
+        self._writer = threading.Thread(target=self._write_loop, name="history-writer", daemon=True)
+        self._writer.start()
+
+    def _create_fts(self):
+        try:
+            self._conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS history_fts USING fts5("
+                " source, translation, content='history', content_rowid='id')"
+            )
+        except sqlite3.OperationalError:
+            # SQLite собран без FTS5 — поиск будет через LIKE
+            return False
+        self._conn.execute(
+            "CREATE TRIGGER IF NOT EXISTS history_ai AFTER INSERT ON history BEGIN"
+            " INSERT INTO history_fts (rowid, source, translation)"
+            " VALUES (new.id, new.source, new.translation); END"
+        )
+        self._conn.execute(
+            "CREATE TRIGGER IF NOT EXISTS history_ad AFTER DELETE ON history BEGIN"
+            " INSERT INTO history_fts (history_fts, rowid, source, translation)"
+            " VALUES ('delete', old.id, old.source, old.translation); END"
+        )
+        return True
+
+    def add(self, source, target, translation):
+        """Ставит запись в очередь; в базу она попадёт в течение FLUSH_INTERVAL."""
+        self._queue.put((time.time(), target, source, translation))
+
+    def _write_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            # Собираем всё, что пришло за интервал, и пишем одной транзакцией
+            deadline = time.monotonic() + FLUSH_INTERVAL
+            while len(batch) < FLUSH_BATCH:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            self._write(batch)
+
+    def _write(self, batch):
+        events = [item for item in batch if isinstance(item, threading.Event)]
+        rows = [item for item in batch if not isinstance(item, threading.Event)]
+        if rows:
+            try:
+                with self._lock:
+                    self._conn.executemany(
+                        "INSERT INTO history (created_at, target, source, translation) VALUES (?, ?, ?, ?)",
+                        rows,
+                    )
+                    self._trim_locked()
+                    self._conn.commit()
+            except sqlite3.Error as e:
+                print(f"Не удалось сохранить историю: {e}")
+        for event in events:
+            event.set()
+
+    def flush(self, timeout=5):
+        """Дожидается записи всего, что уже стоит в очереди."""
+        if threading.current_thread() is self._writer:
+            return
+        event = threading.Event()
+        self._queue.put(event)
+        event.wait(timeout)
+
+    def _trim_locked(self):
+        if not self.max_entries:
+            return
+        (max_id,) = self._conn.execute("SELECT COALESCE(MAX(id), 0) FROM history").fetchone()
+        # id растут монотонно, так что граница по id дешевле, чем COUNT(*)
+        self._conn.execute("DELETE FROM history WHERE id <= ?", (max_id - self.max_entries,))
+
+    def apply_retention(self):
+        with self._lock:
+            if self.retention_days:
+                cutoff = time.time() - self.retention_days * 24 * 60 * 60
+                self._conn.execute("DELETE FROM history WHERE created_at < ?", (cutoff,))
+            self._trim_locked()
+            self._conn.commit()
+
+    def _where(self, query, before_id, limit=None):
+        clauses, params = [], []
+        if before_id is not None:
+            clauses.append("id < ?")
+            params.append(before_id)
+        if query and query.strip():
+            if self.has_fts:
+                # Страница выбирается прямо в FTS по убыванию rowid — без
+                # материализации всех совпадений
+                inner = "SELECT rowid FROM history_fts WHERE history_fts MATCH ?"
+                inner_params = [_fts_query(query)]
+                if before_id is not None:
+                    inner += " AND rowid < ?"
+                    inner_params.append(before_id)
+                if limit is not None:
+                    inner += " ORDER BY rowid DESC LIMIT ?"
+                    inner_params.append(limit)
+                clauses.append(f"id IN ({inner})")
+                params += inner_params
+            else:
+                clauses.append("(source LIKE ? OR translation LIKE ?)")
+                params += [f"%{query.strip()}%"] * 2
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+    def page(self, query=None, before_id=None, limit=PAGE_SIZE):
+        """
+        Записи (id, created_at, target, source, translation) от новых к старым.
+        Следующая страница — page(query, before_id=id последней записи).
+        """
+        where, params = self._where(query, before_id, limit)
+        with self._lock:
+            return self._conn.execute(
+                f"SELECT id, created_at, target, source, translation FROM history{where}"
+                " ORDER BY id DESC LIMIT ?",
+                (*params, limit),
+            ).fetchall()
+
+    def count(self, query=None):
+        where, params = self._where(query, None)
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM history{where}", params).fetchone()[0]
+
+    def delete(self, entry_id):
+        with self._lock:
+            self._conn.execute("DELETE FROM history WHERE id = ?", (entry_id,))
+            self._conn.commit()
+
+    def clear(self):
+        self.flush()
+        with self._lock:
+            self._conn.execute("DELETE FROM history")
+            self._conn.commit()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_history_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                try:
+                    _store = HistoryStore()
+                except sqlite3.Error as e:
+                    print(f"Не удалось открыть историю {os.path.abspath(HISTORY_FILE)}: {e}")
+                    _store = HistoryStore(":memory:")
+                # Не теряем последние записи при выходе
+                atexit.register(_store.flush)
+    return _store
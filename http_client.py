@@ -0,0 +1,195 @@
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from cancellation import raise_if_cancelled
+from rate_limit import RateLimiter, retry_after_seconds
+from segmenter import estimate_tokens
+from telemetry import span
+
+# Попробуем импортировать googletrans
+try:
+    from googletrans import Translator as GoogleTranslator
+    HAS_GOOGLETRANS = True
+except ImportError:
+    HAS_GOOGLETRANS = False
+
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 60
+MAX_RETRIES = 3
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 8
+POOL_SIZE = 16
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+_rate_limiters = {}
+_google_translator = None
+_google_lock = threading.Lock()
+
+
+def get_session(base_url):
+    """
+    Одна keep-alive сессия с пулом соединений на каждый base URL.
+    """
+    with _sessions_lock:
+        session = _sessions.get(base_url)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sessions[base_url] = session
+        return session
+
+
+def enable_rate_limit(base_url, requests_per_minute=None, tokens_per_minute=None):
+    """
+    Включает клиентский ограничитель скорости для запросов на base_url.
+    Лимиты можно не задавать — они возьмутся из заголовков x-ratelimit-*.
+    """
+    with _sessions_lock:
+        limiter = _rate_limiters.get(base_url)
+        if limiter is None:
+            limiter = _rate_limiters[base_url] = RateLimiter(requests_per_minute, tokens_per_minute)
+        return limiter
+
+
+def get_rate_limiter(base_url):
+    return _rate_limiters.get(base_url)
+
+
+def request_tokens(payload):
+    # Лимит токенов у OpenAI считает и вход, и заявленный max_tokens ответа
+    messages = payload.get("messages") or []
+    text = "".join(str(message.get("content", "")) for message in messages)
+    return estimate_tokens(text) + int(payload.get("max_tokens") or 0)
+
+
+def get_google_translator():
+    # Клиент googletrans держит собственный httpx-пул, поэтому он общий на процесс
+    global _google_translator
+    if _google_translator is None:
+        with _google_lock:
+            if _google_translator is None:
+                _google_translator = GoogleTranslator(timeout=READ_TIMEOUT)
+    return _google_translator
+
+
+def backoff_delay(attempt):
+    # Экспоненциальная задержка с полным джиттером
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+def _sleep(delay, cancel_token):
+    if cancel_token is None:
+        time.sleep(delay)
+    elif cancel_token.wait(delay):
+        cancel_token.raise_if_cancelled()
+
+
+def post_json(base_url, path, headers, payload, stream=False, timeout=None, cancel_token=None,
+              retries=MAX_RETRIES):
+    """
+    POST с таймаутами и не более чем retries повторами. Возвращает последний
+    ответ (в том числе неуспешный); сетевые ошибки пробрасываются после
+    исчерпания попыток. При отмене cancel_token закрывает ответ и бросает
+    TranslationCancelled. Если для base_url включён ограничитель скорости,
+    каждая попытка сначала ждёт его (может бросить RateLimited).
+    """
+    session = get_session(base_url)
+    timeout = timeout or (CONNECT_TIMEOUT, READ_TIMEOUT)
+    limiter = _rate_limiters.get(base_url)
+    cost = request_tokens(payload) if limiter else 0
+    for attempt in range(retries + 1):
+        raise_if_cancelled(cancel_token)
+        if limiter:
+            limiter.acquire(cost, cancel_token=cancel_token)
+        try:
+            # Для стрима span заканчивается на заголовках ответа (время до первого байта)
+            with span("http", path=path, attempt=attempt, stream=stream) as http_span:
+                # С токеном тело читаем сами, чтобы отмена обрывала загрузку
+                response = session.post(
+                    f"{base_url}{path}", headers=headers, json=payload,
+                    stream=stream or cancel_token is not None, timeout=timeout,
+                )
+                if cancel_token is not None and cancel_token.cancelled:
+                    response.close()
+                    cancel_token.raise_if_cancelled()
+                done = response.status_code not in RETRY_STATUSES or attempt == retries
+                if done and cancel_token is not None and not stream:
+                    _read_body(response, cancel_token)
+                http_span.set(status=response.status_code)
+                if limiter:
+                    limiter.on_response(response.status_code, response.headers)
+                if response.status_code >= 400:
+                    http_span.set(error=f"HTTP {response.status_code}")
+        except (requests.ConnectionError, requests.Timeout):
+            raise_if_cancelled(cancel_token)
+            if attempt == retries:
+                raise
+        else:
+            if done:
+                return response
+            response.close()
+            if response.status_code == 429:
+                # Паузу по Retry-After выдержит limiter.acquire на следующей попытке
+                if not limiter:
+                    _sleep(max(retry_after_seconds(response.headers) or 0, backoff_delay(attempt)), cancel_token)
+                continue
+        _sleep(backoff_delay(attempt), cancel_token)
+
+
+def _read_body(response, cancel_token):
+    unregister = cancel_token.on_cancel(response.close)
+    try:
+        parts = []
+        for part in response.iter_content(chunk_size=16384):
+            cancel_token.raise_if_cancelled()
+            parts.append(part)
+        response._content = b"".join(parts)
+    except (requests.RequestException, AttributeError, ValueError):
+        # Ответ закрыли из другого потока посреди чтения
+        cancel_token.raise_if_cancelled()
+        raise
+    finally:
+        unregister()
+        response.close()
+    cancel_token.raise_if_cancelled()
+
+
+def call_with_retries(func, *args, cancel_token=None, **kwargs):
+    for attempt in range(MAX_RETRIES + 1):
+        raise_if_cancelled(cancel_token)
+        try:
+            return func(*args, **kwargs)
+        except Exception:
+            if attempt == MAX_RETRIES:
+                raise
+        _sleep(backoff_delay(attempt), cancel_token)
+
+
+def prewarm(base_url=None, google=False):
+    """
+    Устанавливает TCP+TLS соединения в фоне, чтобы первый перевод по горячей
+    клавише не платил за холодное рукопожатие.
+    """
+    def run():
+        if base_url:
+            try:
+                get_session(base_url).head(base_url, timeout=(CONNECT_TIMEOUT, CONNECT_TIMEOUT))
+            except requests.RequestException as e:
+                print(f"Не удалось прогреть соединение с {base_url}: {e}")
+        if google and HAS_GOOGLETRANS:
+            try:
+                get_google_translator().detect("hello")
+            except Exception as e:
+                print(f"Не удалось прогреть Google Translate: {e}")
+
+    thread = threading.Thread(target=run, name="http-prewarm", daemon=True)
+    thread.start()
+    return thread
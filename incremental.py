@@ -0,0 +1,50 @@
+import threading
+
+from segmenter import join_chunks, split_segments
+from translator import ErrorText, translate_batch
+
+
+class IncrementalTranslator:
+    """
+    Live-перевод: текст делится на предложения, и на перевод уходят только
+    те, которых не было в прошлом прогоне. Остальные берутся из памяти.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._target = None
+        self._memory = {}
+
+    def reset(self):
+        with self._lock:
+            self._memory = {}
+            self._target = None
+
+    def translate(self, text, target_language, target_language_code=None, cancel_token=None):
+        """
+        Возвращает (перевод, число переведённых заново предложений, всего предложений).
+        """
+        segments = split_segments(text)
+        bodies = [body for _, body, _ in segments]
+        with self._lock:
+            if self._target != (target_language, target_language_code):
+                self._memory = {}
+                self._target = (target_language, target_language_code)
+            memory = dict(self._memory)
+
+        changed = list(dict.fromkeys(body for body in bodies if body and body not in memory))
+        if changed:
+            translated = translate_batch(
+                changed, target_language, target_language_code, cancel_token=cancel_token
+            )
+            memory.update(zip(changed, translated))
+
+        with self._lock:
+            if self._target == (target_language, target_language_code):
+                # Храним только актуальные предложения и не запоминаем ошибки
+                self._memory = {
+                    body: memory[body] for body in bodies
+                    if body in memory and not isinstance(memory[body], ErrorText)
+                }
+        translated_text = join_chunks(segments, [memory.get(body, body) for body in bodies])
+        return translated_text, len(changed), len([body for body in bodies if body])
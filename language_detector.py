@@ -0,0 +1,312 @@
+import re
+from functools import lru_cache
+
+# Локальное определение языка: сначала по письменности (диапазоны Unicode),
+# затем — внутри письменности — по профилям символьных триграмм, частым словам
+# и буквам, характерным только для части языков.
+
+_LATIN = "latin"
+_CYRILLIC = "cyrillic"
+_ARABIC = "arabic"
+_DEVANAGARI = "devanagari"
+_BENGALI = "bengali"
+_HANGUL = "hangul"
+_KANA = "kana"
+_HAN = "han"
+
+_SCRIPT_RANGES = [
+    (0x0041, 0x005A, _LATIN),
+    (0x0061, 0x007A, _LATIN),
+    (0x00C0, 0x024F, _LATIN),
+    (0x02BB, 0x02BC, _LATIN),  # узбекские ʻ и ʼ
+    (0x1E00, 0x1EFF, _LATIN),
+    (0x0400, 0x04FF, _CYRILLIC),
+    (0x0500, 0x052F, _CYRILLIC),
+    (0x0600, 0x06FF, _ARABIC),
+    (0x0750, 0x077F, _ARABIC),
+    (0xFB50, 0xFDFF, _ARABIC),
+    (0xFE70, 0xFEFF, _ARABIC),
+    (0x0900, 0x097F, _DEVANAGARI),
+    (0x0980, 0x09FF, _BENGALI),
+    (0x1100, 0x11FF, _HANGUL),
+    (0x3130, 0x318F, _HANGUL),
+    (0xAC00, 0xD7AF, _HANGUL),
+    (0x3040, 0x30FF, _KANA),
+    (0x31F0, 0x31FF, _KANA),
+    (0x3400, 0x4DBF, _HAN),
+    (0x4E00, 0x9FFF, _HAN),
+    (0xF900, 0xFAFF, _HAN),
+]
+
+# Письменности, однозначно задающие язык
+_SINGLE_SCRIPT_LANGUAGES = {
+    _DEVANAGARI: "hi",
+    _BENGALI: "bn",
+    _HANGUL: "ko",
+}
+
+_VIETNAMESE_TONES = "".join(chr(c) for c in range(0x1EA0, 0x1EFA))
+
+_ALPHABETS = {
+    _LATIN: {
+        "en": "",
+        "es": "ñáéíóúü",
+        "pt": "ãõçâêôáéíóúàü",
+        "de": "äöüß",
+        "fr": "éèêëàâîïôûùçœæÿ",
+        "it": "àèéìòùíóú",
+        "tr": "çğıöşüâîû",
+        "vi": "ăâđêôơưàáãèéìíòóõùúýỳ" + _VIETNAMESE_TONES,
+        "pl": "ąćęłńóśźż",
+        "nl": "éëïöüè",
+        "id": "",
+        "uz": "ʻʼ",
+    },
+    _CYRILLIC: {
+        "ru": "абвгдеёжзийклмнопрстуфхцчшщъыьэюя",
+        "uk": "абвгґдеєжзиіїйклмнопрстуфхцчшщьюя",
+        "kk": "абвгдеёжзийклмнопрстуфхцчшщъыьэюяәғқңөұүһі",
+        "ky": "абвгдеёжзийклмнопрстуфхцчшщъыьэюяңөү",
+        "uz": "абвгдеёжзийклмнопрстуфхцчшъьэюяўқғҳ",
+    },
+    _ARABIC: {
+        "ar": "ابتثجحخدذرزسشصضطظعغفقلمنهوءآأؤإئةيكى",
+        "fa": "ابتثجحخدذرزسشصضطظعغفقلمنهوءآأؤئپچژگکی",
+    },
+}
+
+# Буквы, без которых связный текст на языке почти не встречается: их полное
+# отсутствие в достаточно длинном фрагменте — довод против языка
+_EXPECTED_MARKERS = {
+    _LATIN: {
+        "vi": "ăâđêôơưàáãèéìíòóõùúýỳ" + _VIETNAMESE_TONES,
+        "pl": "ąćęłńóśźż",
+        "tr": "çğıöşü",
+    },
+    _CYRILLIC: {
+        "uk": "іїєґ",
+        "kk": "әғқңөұүһі",
+        "ky": "ңөү",
+        "uz": "ўқғҳ",
+    },
+    _ARABIC: {
+        "ar": "ةيكى",
+        "fa": "پچژگکی",
+    },
+}
+_MARKER_MIN_LETTERS = 12
+
+# Частые слова — из них же строятся профили триграмм
+_COMMON_WORDS = {
+    "en": """the of and to in is you that it he was for on are as with his they at be this
+        have from or one had by word but not what all were we when your can said there use an
+        each which she do how their if will up other about out many then them these so some her
+        would make like him into time has look two more write go see number no way could people
+        my than first been call who its now find long down day did get come made may part over
+        new where just also because only should please thank""",
+    "es": """de la que el en y a los se del las un por con no una su para es al lo como más
+        pero sus le ha me si sin sobre este ya entre cuando todo esta ser son dos también fue
+        había era muy años hasta desde está mi porque qué sólo han yo hay vez puede todos así
+        nos ni parte tiene él uno donde bien tiempo mismo ese ahora cada vida otro después te
+        otros aunque esa eso hace otra durante siempre día tanto ella tres sí dijo sido gran
+        país según menos gracias hola""",
+    "pt": """de a o que e do da em um para é com não uma os no se na por mais as dos como mas
+        foi ao ele das tem à seu sua ou ser quando muito há nos já está eu também só pelo pela
+        até isso ela entre era depois sem mesmo aos ter seus quem nas esse eles estão você
+        tinha foram essa num nem suas meu às minha têm numa pelos elas havia seja qual será
+        nós tenho lhe deles essas esses pelas este fosse dele vocês nosso nossa isto aquilo
+        estou então obrigado olá""",
+    "de": """der die und in den von zu das mit sich des auf für ist im dem nicht ein eine als
+        auch es an werden aus er hat dass sie nach wird bei einer um am sind noch wie einem
+        über einen so zum war haben nur oder aber vor zur bis mehr durch man sein wurde sei
+        ich wir ihr können kann schon wenn hier jetzt gibt sehr immer ganz heute danke bitte""",
+    "fr": """de la le et les des en un du une que est pour qui dans par plus pas au sur ne se
+        ce il sont avec ou mais comme été aux elle nous vous je tu ils leur on cette sa son ses
+        fait faire peut bien aussi très tout tous entre sans sous avoir être était même deux où
+        après ainsi encore moins donc quand alors chez merci bonjour""",
+    "it": """di e il la che in a per è un del non sono le con una si da al gli lo ma come anche
+        dei nel alla più della io ha ci questo mi ho se quando molto tutto perché essere tu lui
+        lei noi voi loro questa quello cosa fare era stato già ancora dove delle degli nella
+        negli sul sulla così bene grazie ciao""",
+    "tr": """ve bir bu da de için ile olarak çok daha en gibi ne var olan ama kadar sonra ben
+        sen o biz siz onlar şey mi mı değil her ya diye olduğu ise göre yok nasıl neden çünkü
+        şimdi iyi büyük yeni zaman gün yıl kendi bunu şu ki sadece hem oldu bana beni benim
+        senin onun teşekkür merhaba""",
+    "vi": """và của là có không được trong cho một những người này với các đã để đến khi từ
+        như về cũng thì tôi bạn anh em chúng ta họ nhưng nhiều đó ra làm năm rất sẽ còn lại
+        theo nào sau vào nếu mà nước việc phải đi biết đây hơn cảm ơn xin chào""",
+    "pl": """i w nie na się z do to że jest o jak co ale po tak za od jego tym czy przez już może
+        są był być tylko jednak które który która ich mnie mi ja ty on ona my wy oni także
+        bardzo gdy kiedy tego jestem będzie można przy więc dla nas też teraz dzień tutaj
+        dlaczego dziękuję cześć""",
+    "nl": """de het een en van in is dat op te zijn voor met die niet aan er om als ook maar bij
+        door hij ze zich uit naar was wordt heeft worden nog dan kan geen al of wat wel hebben
+        ik je we jij zij deze dit tot over meer moet zo onze hun mijn veel nu hier waar heel
+        goed bedankt hallo""",
+    "id": """yang dan di ini itu dengan untuk tidak dari dalam akan pada juga ke saya ada bisa
+        kami kita mereka anda sudah atau oleh karena seperti jika hanya lebih telah bahwa harus
+        dia apa tersebut banyak sangat baru masih belum semua bagi ketika namun sebagai antara
+        tahun orang hari terima kasih""",
+    "uz": """va bu bir u men sen biz siz ular bilan uchun ham edi emas bor yoʻq kerak qanday
+        nima juda katta yangi lekin yoki agar endi keyin oldin hamma har kun yil odam ish
+        boʻlib boʻladi qilish qildi mumkin haqida shu ekan deb rahmat salom
+        ва бу бир у мен сен биз сиз улар билан учун ҳам эди эмас бор йўқ керак қандай нима
+        жуда катта янги лекин ёки агар энди кейин олдин ҳамма ҳар кун йил одам иш бўлиб
+        бўлади қилиш мумкин ҳақида шу экан деб раҳмат салом""",
+    "ru": """и в не на я что он с как а то это по к но все она так его из у же ты за бы от мы о
+        было для вы был да только меня мне еще нет уже когда ли если или ни быть даже вот есть
+        где там кто себя очень сейчас можно потому который которые этот время спасибо привет
+        здравствуйте""",
+    "uk": """і в не на що я він з як а та це по до але все вона так його від у же ти за б ми о
+        було для ви був тільки мене мені ще немає вже коли чи якщо або ні бути навіть ось є де
+        там хто себе дуже зараз можна тому який які цей час їх її дякую привіт""",
+    "kk": """және бұл бір мен сен ол біз сіз олар да де үшін деп емес бар жоқ керек қалай не өте
+        үлкен жаңа бірақ немесе егер енді кейін бұрын барлық әр күн жыл адам жұмыс болып
+        болады қазақ қазір осы сол мұнда ғана рақмет сәлем""",
+    "ky": """жана бул бир мен сен ал биз силер алар да де үчүн деп эмес бар жок керек кантип
+        эмне абдан чоң жаңы бирок же эгер эми кийин мурун бардык ар күн жыл адам иш болуп
+        болот кыргыз азыр ушул ошол жерде гана менен рахмат салам""",
+    "ar": """في من على إلى أن هذا التي الذي عن مع هذه كان لا ما هو هي ذلك كل بعد قد بين لم عند
+        أو إن كانت ثم حتى أي نحن أنا أنت هم يكون غير منذ لكن اليوم جدا شكرا مرحبا العربية""",
+    "fa": """و در به از که این را با است آن برای یک هم تا می شود کرد بود شده بر خود ما من تو او
+        آنها نیز اما یا هر دارد باید پس چه کند کنند بسیار خیلی امروز فارسی سلام ممنون چون
+        اگر""",
+}
+
+_WORD_RE = re.compile(r"[^\W\d_]+(?:[ʻʼ'][^\W\d_]+)*")
+
+_WORD_WEIGHT = 2.0
+_LETTER_WEIGHT = 2.0
+
+
+@lru_cache(maxsize=4096)
+def _script_of(ch):
+    cp = ord(ch)
+    for start, end, script in _SCRIPT_RANGES:
+        if start <= cp <= end:
+            return script
+    return None
+
+
+def _trigrams(word):
+    padded = f" {word} "
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+def _build_profiles():
+    profiles = {}
+    words = {}
+    for code, text in _COMMON_WORDS.items():
+        counts = {}
+        vocab = set()
+        for word in _WORD_RE.findall(text.lower()):
+            vocab.add(word)
+            for tri in _trigrams(word):
+                counts[tri] = counts.get(tri, 0) + 1
+        top = max(counts.values())
+        profiles[code] = {tri: count / top for tri, count in counts.items()}
+        words[code] = vocab
+    return profiles, words
+
+
+_PROFILES, _WORDS = _build_profiles()
+
+# Обратные индексы: одна проверка словаря на триграмму/слово вместо одной на язык
+_TRIGRAM_INDEX = {}
+for _code, _profile in _PROFILES.items():
+    for _tri, _weight in _profile.items():
+        _TRIGRAM_INDEX.setdefault(_tri, []).append((_code, _weight))
+_WORD_INDEX = {}
+for _code, _vocab in _WORDS.items():
+    for _word in _vocab:
+        _WORD_INDEX.setdefault(_word, []).append(_code)
+
+_ALPHABET_SETS = {
+    script: {
+        code: set(letters) | (set("abcdefghijklmnopqrstuvwxyz") if script == _LATIN else set())
+        for code, letters in alphabets.items()
+    }
+    for script, alphabets in _ALPHABETS.items()
+}
+
+
+def _script_counts(text):
+    counts = {}
+    for ch in text:
+        if ch.isalpha() or ch in "ʻʼ":
+            script = _script_of(ch)
+            if script:
+                counts[script] = counts.get(script, 0) + 1
+    return counts
+
+
+def _score_candidates(text, script):
+    alphabets = _ALPHABET_SETS[script]
+    scores = dict.fromkeys(alphabets, 0.0)
+    lowered = text.lower()
+
+    for word in _WORD_RE.findall(lowered):
+        if _script_of(word[0]) != script:
+            continue
+        for code in _WORD_INDEX.get(word, ()):
+            if code in scores:
+                scores[code] += _WORD_WEIGHT
+        for tri in _trigrams(word):
+            for code, weight in _TRIGRAM_INDEX.get(tri, ()):
+                if code in scores:
+                    scores[code] += weight
+
+    # Буквы, которые есть не во всех алфавитах письменности
+    for ch in set(lowered):
+        if _script_of(ch) != script:
+            continue
+        owners = [code for code, letters in alphabets.items() if ch in letters]
+        if len(owners) == len(alphabets):
+            continue
+        occurrences = min(lowered.count(ch), 5)
+        for code in scores:
+            if code in owners:
+                scores[code] += _LETTER_WEIGHT * occurrences / len(owners)
+            else:
+                scores[code] -= _LETTER_WEIGHT * occurrences
+
+    letters = sum(1 for ch in lowered if ch.isalpha())
+    if letters >= _MARKER_MIN_LETTERS:
+        present = set(lowered)
+        for code, markers in _EXPECTED_MARKERS.get(script, {}).items():
+            if not present.intersection(markers):
+                scores[code] -= _LETTER_WEIGHT * min(letters / _MARKER_MIN_LETTERS, 3)
+    return scores
+
+
+def detect(text):
+    """
+    Возвращает (ISO-код, уверенность 0..1). Для текста без букв — (None, 0.0).
+    """
+    counts = _script_counts(text)
+    total = sum(counts.values())
+    if not total:
+        return None, 0.0
+
+    # Кандзи + кана — японский, одни иероглифы — китайский
+    if _KANA in counts:
+        counts[_KANA] += counts.pop(_HAN, 0)
+    script, letters = max(counts.items(), key=lambda item: item[1])
+    purity = letters / total
+    if script == _KANA:
+        return "ja", purity
+    if script == _HAN:
+        return "zh", purity
+    if script in _SINGLE_SCRIPT_LANGUAGES:
+        return _SINGLE_SCRIPT_LANGUAGES[script], purity
+
+    scores = _score_candidates(text, script)
+    ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+    best_code, best = ranked[0]
+    second = ranked[1][1]
+    if best <= 0:
+        return best_code, 0.0
+    margin = (best - second) / best
+    # Короткие фрагменты определяются хуже — снижаем уверенность
+    length_factor = min(1.0, letters / 12)
+    return best_code, max(0.0, min(1.0, margin * length_factor * purity))
@@ -0,0 +1,28 @@
+LANGUAGES = [
+    ("English", "en"),
+    ("Russian", "ru"),
+    ("Spanish", "es"),
+    ("Chinese", "zh"),
+    ("Hindi", "hi"),
+    ("Arabic", "ar"),
+    ("Portuguese", "pt"),
+    ("Bengali", "bn"),
+    ("Japanese", "ja"),
+    ("Kazakh", "kk"),
+    ("Kyrgyz", "ky"),
+    ("Uzbek", "uz"),
+    ("German", "de"),
+    ("French", "fr"),
+    ("Italian", "it"),
+    ("Turkish", "tr"),
+    ("Korean", "ko"),
+    ("Vietnamese", "vi"),
+    ("Polish", "pl"),
+    ("Dutch", "nl"),
+    ("Ukrainian", "uk"),
+    ("Persian", "fa"),
+    ("Indonesian", "id"),
+]
+
+CODE_TO_NAME = {code: name for name, code in LANGUAGES}
+NAME_TO_CODE = {name.lower(): code for name, code in LANGUAGES}
@@ -1,24 +1,72 @@
+import argparse
 import sys
-from PyQt5.QtWidgets import QApplication
-from global_hotkey import start_hotkey_listener
-from gui import TranslatorGUI
+import threading
+from settings import get_settings
 
-app = QApplication(sys.argv)
 
-# Создаем основное окно
-main_window = TranslatorGUI()
-main_window.show()
+def create_main_window():
+    # Создаем основное окно; тяжёлые модули (translator, горячие клавиши)
+    # подгружаются уже после появления окна и иконки в трее
+    from PyQt5.QtWidgets import QApplication
+    from gui import TranslatorGUI
+    app = QApplication.instance() or QApplication(sys.argv)
+    main_window = TranslatorGUI()
+    main_window.show()
+    return app, main_window
 
-# Запускаем обработчик горячих клавиш
-hotkey_handler = start_hotkey_listener()
 
-# Подключаем обработчик текста
-def handle_copied_text(text):
-    main_window.stack.setCurrentIndex(0)  # Переключаемся на страницу перевода
-    main_window.translator_page.text_input.setText(text)
-    main_window.show()
-    main_window.activateWindow()
+def prewarm_in_background():
+    # Импорт translator (requests, googletrans) и открытие соединений — в фоне
+    def run():
+        from translator import prewarm_connections
+        prewarm_connections()
+
+    threading.Thread(target=run, name="startup-prewarm", daemon=True).start()
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="AI Translator")
+    parser.add_argument("--daemon", action="store_true", help="run the translation engine without GUI")
+    parser.add_argument("--port", type=int, help="daemon port on 127.0.0.1")
+    # Остальные аргументы (например, -style) достаются Qt
+    return parser.parse_known_args(argv)[0]
+
+
+def main():
+    args = parse_args(sys.argv[1:])
+    if args.daemon:
+        # Без GUI: Qt и горячие клавиши не загружаются вовсе
+        from daemon import DAEMON_PORT, run_daemon
+        run_daemon(port=args.port or DAEMON_PORT)
+        return
+
+    app, main_window = create_main_window()
+
+    # Заранее открываем соединения с бэкендами перевода
+    if get_settings().get("prewarm_connections", True):
+        prewarm_in_background()
+
+    # Запускаем обработчик горячих клавиш
+    from global_hotkey import prewarm_popup, show_translator_window, start_hotkey_listener
+    hotkey_handler = start_hotkey_listener()
+    main_window.set_hotkey_handler(hotkey_handler)
+    prewarm_popup()
+
+    # Подключаем обработчик текста
+    def handle_copied_text(text):
+        if get_settings().get("hotkey_popup", True):
+            # Перевод сразу во всплывающем окне у курсора
+            show_translator_window(text)
+            return
+        main_window.stack.setCurrentIndex(0)  # Переключаемся на страницу перевода
+        main_window.translator_page.text_input.setPlainText(text)
+        main_window.show()
+        main_window.activateWindow()
+
+    hotkey_handler.text_copied.connect(handle_copied_text)
+
+    sys.exit(app.exec_())
 
-hotkey_handler.text_copied.connect(handle_copied_text)
 
-sys.exit(app.exec_())
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+import contextvars
+from contextlib import contextmanager
+
+import config
+from segmenter import estimate_tokens
+
+# Выбор модели OpenAI и лимита длины ответа по размеру запроса. Короткие
+# интерактивные запросы (горячая клавиша, live-перевод) идут в быструю
+# модель, длинные и фоновые (документы, пакетная обработка) — в большую.
+# Обе модели задаются в config; без них используется MODEL_NAME.
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+# Упреждающий перевод буфера обмена: модель — как у интерактивного запроса,
+# результат которого он подменяет, а приоритет — фоновый
+SPECULATIVE = "speculative"
+
+FAST_MODEL = getattr(config, "FAST_MODEL_NAME", config.MODEL_NAME)
+LARGE_MODEL = getattr(config, "LARGE_MODEL_NAME", config.MODEL_NAME)
+
+# До скольких токенов входа хватает быстрой модели. В интерактивном режиме
+# важнее задержка, в пакетном — качество
+FAST_MAX_INPUT_TOKENS = {INTERACTIVE: 600, BATCH: 150, SPECULATIVE: 600}
+
+# Лимит ответа: перевод на кириллицу или CJK занимает в токенах в 2-3 раза
+# больше английского оригинала, плюс запас на короткие тексты
+OUTPUT_RATIO = 3.0
+OUTPUT_MIN_TOKENS = 64
+OUTPUT_MAX_TOKENS = getattr(config, "MAX_OUTPUT_TOKENS", 4096)
+
+_budget = contextvars.ContextVar("latency_budget", default=INTERACTIVE)
+
+
+@contextmanager
+def latency_budget(budget):
+    """
+    Режим для всех запросов внутри блока, в том числе в потоках движка:
+    with latency_budget(BATCH): translate_document(...)
+    """
+    token = _budget.set(budget)
+    try:
+        yield
+    finally:
+        _budget.reset(token)
+
+
+def current_budget():
+    return _budget.get()
+
+
+def output_cap(input_tokens, outputs=1, overhead=0):
+    # outputs — сколько переводов в ответе (несколько языков сразу);
+    # overhead — токены на разметку ответа (JSON)
+    tokens = int(input_tokens * OUTPUT_RATIO) * outputs + OUTPUT_MIN_TOKENS + overhead
+    return min(OUTPUT_MAX_TOKENS, tokens)
+
+
+def choose(text=None, input_tokens=None, outputs=1, overhead=0, budget=None):
+    """
+    Возвращает (модель, max_tokens) для запроса с текстом text (или уже
+    посчитанным числом токенов input_tokens).
+    """
+    if input_tokens is None:
+        input_tokens = estimate_tokens(text)
+    budget = budget or current_budget()
+    limit = FAST_MAX_INPUT_TOKENS.get(budget, FAST_MAX_INPUT_TOKENS[INTERACTIVE])
+    model = FAST_MODEL if input_tokens <= limit else LARGE_MODEL
+    return model, output_cap(input_tokens, outputs, overhead)
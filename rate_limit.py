@@ -0,0 +1,234 @@
+import email.utils
+import heapq
+import itertools
+import re
+import threading
+import time
+from collections import deque
+
+from cancellation import raise_if_cancelled
+from model_policy import INTERACTIVE, current_budget
+
+# Клиентский ограничитель скорости для OpenAI-совместимого API: корзины
+# токенов на запросы и токены в минуту. Лимиты берутся из config или из
+# заголовков x-ratelimit-*, после 429 — пауза по Retry-After и снижение
+# скорости (AIMD). Ожидающие выстраиваются по приоритету: интерактивные
+# запросы проходят раньше фоновых.
+
+MAX_INTERACTIVE_WAIT = 10.0  # секунд; дольше интерактивный запрос не ждёт
+DEFAULT_RETRY_AFTER = 1.0
+MIN_FACTOR = 0.1
+DECREASE_FACTOR = 0.5
+INCREASE_STEP = 0.05
+MIN_REQUESTS_PER_MINUTE = 1
+# На сколько растёт угаданный после 429 лимит запросов с каждым успешным ответом
+ESTIMATE_INCREASE_STEP = 1
+
+PRIORITIES = {INTERACTIVE: 0}  # всё остальное — фоновая работа
+
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+class RateLimited(Exception):
+    """Лимит исчерпан, а ждать дольше допустимого для запроса нельзя."""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Rate limited, retry in {retry_after:.0f} s")
+        self.retry_after = retry_after
+
+
+def parse_duration(value):
+    # "1s", "6m0s", "250ms", "20" — как в x-ratelimit-reset-* у OpenAI
+    if value is None:
+        return None
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION_RE.findall(value)
+    return sum(float(number) * _UNITS[unit] for number, unit in parts) if parts else None
+
+
+def retry_after_seconds(headers, now=None):
+    """Задержка из Retry-After (секунды или HTTP-дата) либо retry-after-ms; None, если заголовков нет."""
+    milliseconds = headers.get("retry-after-ms")
+    if milliseconds:
+        try:
+            return float(milliseconds) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        moment = email.utils.parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, moment - (now or time.time()))
+
+
+class TokenBucket:
+    """Корзина на limit единиц в минуту; limit=None — без ограничения."""
+
+    def __init__(self, limit=None):
+        self.limit = limit
+        self.level = float(limit or 0)
+        self.updated = time.monotonic()
+
+    def refill(self, now, factor=1.0):
+        if self.limit:
+            rate = self.limit * factor / 60.0
+            self.level = min(float(self.limit), self.level + (now - self.updated) * rate)
+        self.updated = now
+
+    def wait_time(self, cost, factor=1.0):
+        if not self.limit:
+            return 0.0
+        # Запрос дороже всей корзины пропускаем при полной корзине, иначе он не пройдёт никогда
+        cost = min(cost, self.limit)
+        if self.level >= cost:
+            return 0.0
+        return (cost - self.level) / (self.limit * factor / 60.0)
+
+    def take(self, cost):
+        if self.limit:
+            self.level -= min(cost, self.limit)
+
+    def sync(self, limit, remaining):
+        # Сервер знает точнее: подстраиваемся под его лимит и остаток. Остаток
+        # из ответа мог устареть, пока шли параллельные запросы, поэтому
+        # поднимать уровень по нему можно только при первом знакомстве с лимитом
+        learned = limit and not self.limit
+        if limit:
+            self.limit = limit
+        if remaining is not None and self.limit:
+            self.level = float(remaining) if learned else min(self.level, float(remaining))
+
+
+class RateLimiter:
+    def __init__(self, requests_per_minute=None, tokens_per_minute=None,
+                 max_interactive_wait=MAX_INTERACTIVE_WAIT):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_interactive_wait = max_interactive_wait
+        self.factor = 1.0
+        self.paused_until = 0.0
+        self.estimated = False  # лимит запросов угадан по 429, а не задан или получен из заголовков
+        self.rate_limited = 0
+        self.throttled = 0
+        self.waited = 0.0
+        self._recent = deque()  # время последних запросов — для оценки лимита после 429
+        self._cond = threading.Condition()
+        self._waiting = []
+        self._seq = itertools.count()
+
+    def acquire(self, cost=0, priority=None, cancel_token=None):
+        """
+        Ждёт, пока лимиты позволят отправить запрос на cost токенов. Первым
+        проходит самый приоритетный из ожидающих. Интерактивный запрос,
+        которому пришлось бы ждать дольше max_interactive_wait, сразу
+        получает RateLimited.
+        """
+        priority = PRIORITIES.get(current_budget(), 1) if priority is None else priority
+        ticket = (priority, next(self._seq))
+        unregister = cancel_token.on_cancel(self._wake) if cancel_token is not None else None
+        started = time.monotonic()
+        throttled = False
+        with self._cond:
+            heapq.heappush(self._waiting, ticket)
+            try:
+                while True:
+                    raise_if_cancelled(cancel_token)
+                    now = time.monotonic()
+                    self.requests.refill(now, self.factor)
+                    self.tokens.refill(now, self.factor)
+                    delay = max(
+                        self.paused_until - now,
+                        self.requests.wait_time(1, self.factor),
+                        self.tokens.wait_time(cost, self.factor),
+                    )
+                    if priority == 0 and delay > self.max_interactive_wait:
+                        raise RateLimited(delay)
+                    if self._waiting[0] == ticket and delay <= 0:
+                        self.requests.take(1)
+                        self.tokens.take(cost)
+                        self._recent.append(now)
+                        while self._recent and now - self._recent[0] > 60:
+                            self._recent.popleft()
+                        return
+                    if delay > 0 and not throttled:
+                        throttled = True
+                        self.throttled += 1
+                    # Не первый в очереди — ждём, пока пройдёт стоящий впереди
+                    self._cond.wait(delay if self._waiting[0] == ticket else None)
+            finally:
+                self._waiting.remove(ticket)
+                heapq.heapify(self._waiting)
+                self.waited += time.monotonic() - started
+                self._cond.notify_all()
+                if unregister:
+                    unregister()
+
+    def _wake(self):
+        with self._cond:
+            self._cond.notify_all()
+
+    def on_response(self, status, headers):
+        """Учитывает заголовки x-ratelimit-* и 429 от сервера."""
+        now = time.monotonic()
+        with self._cond:
+            self.requests.refill(now, self.factor)
+            self.tokens.refill(now, self.factor)
+            requests_limit = _int(headers.get("x-ratelimit-limit-requests"))
+            if requests_limit:
+                self.estimated = False
+            self.requests.sync(requests_limit, _int(headers.get("x-ratelimit-remaining-requests")))
+            self.tokens.sync(_int(headers.get("x-ratelimit-limit-tokens")),
+                             _int(headers.get("x-ratelimit-remaining-tokens")))
+            if status == 429:
+                self.rate_limited += 1
+                delay = retry_after_seconds(headers)
+                if delay is None:
+                    resets = [parse_duration(headers.get(name)) for name in
+                              ("x-ratelimit-reset-requests", "x-ratelimit-reset-tokens")]
+                    delay = max([reset for reset in resets if reset] or [DEFAULT_RETRY_AFTER])
+                self.paused_until = max(self.paused_until, now + delay)
+                if self.requests.limit is None or self.estimated:
+                    # Лимит неизвестен — считаем им текущий темп за минуту
+                    self.requests.limit = max(MIN_REQUESTS_PER_MINUTE, len(self._recent))
+                    self.requests.level = 0.0
+                    self.estimated = True
+                self.factor = max(MIN_FACTOR, self.factor * DECREASE_FACTOR)
+            elif status < 400:
+                self.factor = min(1.0, self.factor + INCREASE_STEP)
+                if self.estimated:
+                    # Угаданный лимит мог быть случайным всплеском у сервера:
+                    # растёт, пока не придёт следующий 429
+                    self.requests.limit += ESTIMATE_INCREASE_STEP
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "requests_per_minute": self.requests.limit,
+                "tokens_per_minute": self.tokens.limit,
+                "factor": self.factor,
+                "paused_for": max(0.0, self.paused_until - time.monotonic()),
+                "waiting": len(self._waiting),
+                "rate_limited": self.rate_limited,
+                "throttled": self.throttled,
+                "waited_seconds": self.waited,
+            }
+
+
+def _int(value):
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
@@ -0,0 +1,235 @@
+import contextvars
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from cancellation import CancelToken, TranslationCancelled, raise_if_cancelled
+
+# Маршрутизатор поверх подключаемых бэкендов: скользящая статистика задержек
+# и ошибок, circuit breaker и "хеджирование" — если основной бэкенд не ответил
+# за своё p95, параллельно запускается следующий и берётся первый ответ.
+
+WINDOW_SIZE = 50
+MIN_SAMPLES = 10
+FAILURE_THRESHOLD = 3
+ERROR_RATE_THRESHOLD = 0.5
+OPEN_SECONDS = 30
+DEFAULT_HEDGE_DELAY = 2.0
+ROUTER_WORKERS = 16
+
+
+class Backend:
+    """
+    Бэкенд перевода. name и model входят в ключ кэша; supports() говорит,
+    может ли бэкенд перевести на данный язык; translate() бросает исключение
+    при ошибке.
+    """
+
+    name = None
+    model = None
+
+    def supports(self, target_language_code):
+        return True
+
+    def translate(self, text, target_language, target_language_code=None, source_language=None,
+                  cancel_token=None):
+        raise NotImplementedError
+
+
+class FunctionBackend(Backend):
+    def __init__(self, name, model, translate, supports=None):
+        self.name = name
+        self.model = model
+        self._translate = translate
+        self._supports = supports
+
+    def supports(self, target_language_code):
+        return self._supports(target_language_code) if self._supports else True
+
+    def translate(self, text, target_language, target_language_code=None, source_language=None,
+                  cancel_token=None):
+        return self._translate(text, target_language, target_language_code, source_language, cancel_token)
+
+
+class BackendStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=WINDOW_SIZE)
+        self._outcomes = deque(maxlen=WINDOW_SIZE)
+        self.consecutive_failures = 0
+        self.opened_at = None
+
+    def record_success(self, latency=None):
+        with self._lock:
+            if latency is not None:
+                self._latencies.append(latency)
+            self._outcomes.append(True)
+            self.consecutive_failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self._outcomes.append(False)
+            self.consecutive_failures += 1
+            if (self.consecutive_failures >= FAILURE_THRESHOLD
+                    or (len(self._outcomes) >= MIN_SAMPLES and self._error_rate() > ERROR_RATE_THRESHOLD)):
+                self.opened_at = time.monotonic()
+
+    def allow_request(self):
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            # Half-open: после паузы снова пропускаем запросы; первая же
+            # ошибка размыкает цепь заново, первый успех — замыкает
+            return time.monotonic() - self.opened_at >= OPEN_SECONDS
+
+    def _error_rate(self):
+        if not self._outcomes:
+            return 0.0
+        return self._outcomes.count(False) / len(self._outcomes)
+
+    def percentile(self, q):
+        with self._lock:
+            latencies = sorted(self._latencies)
+        if not latencies:
+            return None
+        return latencies[min(len(latencies) - 1, int(q * len(latencies)))]
+
+    def hedge_delay(self):
+        with self._lock:
+            enough = len(self._latencies) >= MIN_SAMPLES
+        return self.percentile(0.95) if enough else DEFAULT_HEDGE_DELAY
+
+    def snapshot(self):
+        with self._lock:
+            state = "closed" if self.opened_at is None else "open"
+            samples = len(self._outcomes)
+            error_rate = self._error_rate()
+        return {
+            "state": state,
+            "samples": samples,
+            "error_rate": error_rate,
+            "p50": self.percentile(0.5),
+            "p95": self.percentile(0.95),
+        }
+
+
+class AllBackendsFailed(Exception):
+    pass
+
+
+class Router:
+    def __init__(self, backends=(), hedge=True):
+        self._backends = list(backends)
+        self._stats = {backend.name: BackendStats() for backend in self._backends}
+        self.hedge = hedge
+        self._executor = ThreadPoolExecutor(max_workers=ROUTER_WORKERS, thread_name_prefix="translation-router")
+
+    def register(self, backend, first=False):
+        if first:
+            self._backends.insert(0, backend)
+        else:
+            self._backends.append(backend)
+        self._stats.setdefault(backend.name, BackendStats())
+
+    def get(self, name):
+        return next(backend for backend in self._backends if backend.name == name)
+
+    def backends_for(self, target_language_code):
+        """Бэкенды, умеющие переводить на этот язык, в порядке предпочтения."""
+        return [backend for backend in self._backends if backend.supports(target_language_code)]
+
+    def candidates(self, target_language_code):
+        """Те же бэкенды, но без тех, у которых разомкнут circuit breaker."""
+        supported = self.backends_for(target_language_code)
+        allowed = [backend for backend in supported if self._stats[backend.name].allow_request()]
+        # Если разомкнуто всё — пробуем хотя бы основной, чем сразу отказывать
+        return allowed or supported[:1]
+
+    def translate(self, text, target_language, target_language_code=None, source_language=None,
+                  cancel_token=None, hedge=None):
+        """
+        Возвращает (перевод, имя бэкенда). При ошибке пробует следующий
+        бэкенд; при hedge=True запускает его заранее, если основной не уложился
+        в своё p95.
+        """
+        queue = self.candidates(target_language_code)
+        if not queue:
+            raise AllBackendsFailed("No translation backend available")
+        hedge = self.hedge if hedge is None else hedge
+        pending = {}
+        unregisters = []
+        last_error = None
+        hedged = False
+
+        def launch():
+            backend = queue.pop(0)
+            token = CancelToken()
+            if cancel_token is not None:
+                unregisters.append(cancel_token.on_cancel(token.cancel))
+            future = self._executor.submit(
+                contextvars.copy_context().run, self._call, backend, token, text, target_language, target_language_code, source_language
+            )
+            pending[future] = (backend, token)
+
+        launch()
+        try:
+            while pending:
+                timeout = None
+                if hedge and queue and not hedged and len(pending) == 1:
+                    primary = next(iter(pending.values()))[0]
+                    timeout = self._stats[primary.name].hedge_delay()
+                done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+                raise_if_cancelled(cancel_token)
+                if not done:
+                    hedged = True
+                    launch()
+                    continue
+                for future in done:
+                    backend, _ = pending.pop(future)
+                    try:
+                        result = future.result()
+                    except TranslationCancelled:
+                        raise_if_cancelled(cancel_token)
+                        continue
+                    except Exception as e:
+                        last_error = e
+                        continue
+                    # Проигравший хедж больше не нужен — обрываем его запрос
+                    for _, token in pending.values():
+                        token.cancel()
+                    return result, backend.name
+                if not pending and queue:
+                    launch()
+            raise last_error or AllBackendsFailed("All translation backends failed")
+        finally:
+            for unregister in unregisters:
+                unregister()
+
+    def _call(self, backend, token, text, target_language, target_language_code, source_language):
+        stats = self._stats[backend.name]
+        started = time.perf_counter()
+        try:
+            result = backend.translate(text, target_language, target_language_code, source_language, token)
+        except TranslationCancelled:
+            raise
+        except Exception:
+            stats.record_failure()
+            raise
+        stats.record_success(time.perf_counter() - started)
+        return result
+
+    def record(self, backend_name, latency=None, ok=True):
+        # Для путей, которые ходят в бэкенд сами (стриминг, пакеты). Без
+        # latency учитывается только исход — пакетные запросы не портят p95
+        stats = self._stats.get(backend_name)
+        if stats is None:
+            return
+        if ok:
+            stats.record_success(latency)
+        else:
+            stats.record_failure()
+
+    def stats(self):
+        return {name: stats.snapshot() for name, stats in self._stats.items()}
@@ -0,0 +1,93 @@
+import re
+
+# Разбиение текста на куски под бюджет токенов: по абзацам, затем по
+# предложениям, в крайнем случае — по словам. Пробелы и переводы строк между
+# кусками сохраняются, так что "".join(lead + body + trail) == text.
+
+CHUNK_TOKENS = 800
+
+_PARAGRAPH_RE = re.compile(r"(\n[ \t]*\n\s*)")
+_SENTENCE_RE = re.compile(r"(?<=[.!?…。！？])(\s+)")
+_WORD_RE = re.compile(r"(\s+)")
+
+
+def estimate_tokens(text):
+    # Грубая оценка: ~4 символа ASCII на токен, не-ASCII (кириллица, CJK) дороже
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return int(ascii_chars / 4 + (len(text) - ascii_chars) / 1.5) + 1
+
+
+def _split_keep(regex, text):
+    # ["a", " ", "b"] -> ["a ", "b"]: разделитель приклеивается к предыдущей части
+    parts = regex.split(text)
+    units = []
+    for i in range(0, len(parts), 2):
+        unit = parts[i] + (parts[i + 1] if i + 1 < len(parts) else "")
+        if unit:
+            units.append(unit)
+    return units
+
+
+def _units(text, budget):
+    for paragraph in _split_keep(_PARAGRAPH_RE, text):
+        if estimate_tokens(paragraph) <= budget:
+            yield paragraph
+            continue
+        for sentence in _split_keep(_SENTENCE_RE, paragraph):
+            if estimate_tokens(sentence) <= budget:
+                yield sentence
+                continue
+            yield from _split_keep(_WORD_RE, sentence)
+
+
+def split_chunks(text, budget=CHUNK_TOKENS):
+    """
+    Возвращает список (lead, body, trail): body — то, что уходит на перевод,
+    lead/trail — окружающие пробелы, которые вставляются обратно как есть.
+    """
+    chunks = []
+    current = ""
+    current_tokens = 0
+    for unit in _units(text, budget):
+        tokens = estimate_tokens(unit)
+        if current and current_tokens + tokens > budget:
+            chunks.append(current)
+            current, current_tokens = "", 0
+        current += unit
+        current_tokens += tokens
+    if current:
+        chunks.append(current)
+    return _with_whitespace(chunks)
+
+
+def split_segments(text):
+    """
+    Разбивает текст на отдельные предложения (без упаковки под бюджет) в том
+    же формате (lead, body, trail). Границы стабильны при правках соседних
+    предложений, поэтому подходят для инкрементального перевода.
+    """
+    units = []
+    for paragraph in _split_keep(_PARAGRAPH_RE, text):
+        units.extend(_split_keep(_SENTENCE_RE, paragraph))
+    return _with_whitespace(units)
+
+
+def _with_whitespace(chunks):
+    result = []
+    for chunk in chunks:
+        body = chunk.strip()
+        if not body:
+            # Чистые пробелы приклеиваем к предыдущему куску
+            if result:
+                lead, prev_body, trail = result[-1]
+                result[-1] = (lead, prev_body, trail + chunk)
+            else:
+                result.append((chunk, "", ""))
+            continue
+        start = chunk.index(body)
+        result.append((chunk[:start], body, chunk[start + len(body):]))
+    return result
+
+
+def join_chunks(chunks, bodies):
+    return "".join(lead + body + trail for (lead, _, trail), body in zip(chunks, bodies))
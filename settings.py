@@ -1,18 +1,138 @@
+import atexit
 import json
 import os
+import tempfile
+import threading
 
 SETTINGS_FILE = "settings.json"
+SAVE_DELAY = 0.5  # секунд: частые изменения подряд сливаются в одну запись
 
-def load_settings():
-    if os.path.exists(SETTINGS_FILE):
+
+class Settings:
+    """
+    Общие на процесс настройки: файл читается один раз, изменения сразу
+    видны всем страницам, а на диск пишутся с задержкой и атомарно
+    (временный файл + os.replace). Подписчики вызываются в потоке, который
+    изменил значение.
+    """
+
+    def __init__(self, path=SETTINGS_FILE, save_delay=SAVE_DELAY):
+        self.path = path
+        self.save_delay = save_delay
+        self._lock = threading.RLock()
+        # Запись целиком под своим замком: таймер и atexit не перепишут новое старым
+        self._write_lock = threading.Lock()
+        self._values = self._read()
+        self._subscribers = []
+        self._timer = None
+        self._dirty = False
+
+    def _read(self):
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    values = json.load(f)
+                if isinstance(values, dict):
+                    return values
+            except Exception:
+                # Если файл повреждён — начинаем с пустых настроек
+                pass
+        return {}
+
+    def get(self, key, default=None):
+        with self._lock:
+            return self._values.get(key, default)
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._values)
+
+    def set(self, key, value):
+        self.update({key: value})
+
+    def update(self, values, replace=False):
+        with self._lock:
+            old = self._values
+            new = dict(values) if replace else {**old, **values}
+            changed = {key: new.get(key) for key in set(old) | set(new) if old.get(key) != new.get(key)}
+            if not changed:
+                return
+            self._values = new
+            self._schedule_save()
+            subscribers = list(self._subscribers)
+        for key, value in changed.items():
+            for callback in subscribers:
+                try:
+                    callback(key, value)
+                except Exception as e:
+                    print(f"Ошибка в подписчике настроек ({key}): {e}")
+
+    def subscribe(self, callback):
+        """callback(key, value) на каждое изменение; возвращает функцию отписки."""
+        with self._lock:
+            self._subscribers.append(callback)
+        return lambda: self._unsubscribe(callback)
+
+    def _unsubscribe(self, callback):
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def _schedule_save(self):
+        self._dirty = True
+        if self._timer is None:
+            self._timer = threading.Timer(self.save_delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        with self._write_lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._dirty:
+                return
+            self._dirty = False
+            data = json.dumps(self._values, indent=2, ensure_ascii=False)
+        # Пишем рядом во временный файл и подменяем: при сбое посреди записи
+        # старый settings.json остаётся целым
+        directory = os.path.dirname(os.path.abspath(self.path))
+        tmp_path = None
         try:
-            with open(SETTINGS_FILE, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except Exception:
-            # Если файл повреждён — возвращаем пустой словарь
-            return {}
-    return {}
+            fd, tmp_path = tempfile.mkstemp(prefix=".settings-", suffix=".tmp", dir=directory)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(data)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Не удалось сохранить настройки: {e}")
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            with self._lock:
+                self._dirty = True
+
+
+_settings = None
+_settings_lock = threading.Lock()
+
+
+def get_settings():
+    global _settings
+    if _settings is None:
+        with _settings_lock:
+            if _settings is None:
+                _settings = Settings()
+                atexit.register(_settings.flush)
+    return _settings
+
+
+def load_settings():
+    # Совместимость: копия текущих настроек без чтения файла
+    return get_settings().snapshot()
+
 
 def save_settings(settings):
-    with open(SETTINGS_FILE, "w", encoding="utf-8") as f:
-        json.dump(settings, f, indent=2, ensure_ascii=False)
+    get_settings().update(settings, replace=True)
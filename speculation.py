@@ -0,0 +1,195 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+
+from languages import LANGUAGES
+from model_policy import SPECULATIVE, latency_budget
+from settings import get_settings
+from telemetry import start_trace
+
+# Упреждающий перевод буфера обмена (включается настройкой
+# speculative_translation). Чаще всего по горячей клавише переводят только
+# что скопированный текст, поэтому его можно перевести заранее, в фоне, на
+# last_language — и к нажатию перевод уже лежит в кэше. Чтобы не тратить
+# квоту зря: пауза после изменений буфера, ограничения размера, правила
+# пропуска (ссылки, пути, числа, похожие на пароли строки) и дневной
+# лимит символов.
+
+POLL_INTERVAL = 0.25  # опрос дешёвого счётчика изменений буфера
+DEBOUNCE = 0.5  # буфер должен "успокоиться": захват по горячей клавише меняет его дважды
+MIN_CHARS = 3
+MAX_CHARS = 2000
+DAILY_CHAR_BUDGET = 20000
+ERROR_PAUSE = 60  # секунд без упреждающих запросов после ошибки (например, 429)
+RECENT_TEXTS = 64
+
+IGNORE_PATTERNS = [
+    r"https?://\S+",  # ссылка
+    r"[\w.+-]+@[\w-]+(\.[\w-]+)+",  # e-mail
+    r"([A-Za-z]:[\\/]|\\\\|~?/)\S*",  # путь к файлу
+    r"[\d\s.,:;+\-*/%()=$€£₽]+",  # числа и выражения
+]
+_IGNORE_RE = [re.compile(pattern) for pattern in IGNORE_PATTERNS]
+_LETTER_RE = re.compile(r"[^\W\d_]")
+
+
+def looks_like_secret(text):
+    # Одно "слово" из букв, цифр и знаков вперемешку — пароль, токен, ключ.
+    # Такое не отправляем никуда без явной команды пользователя
+    if re.search(r"\s", text) or not 8 <= len(text) <= 128:
+        return False
+    classes = [bool(re.search(pattern, text)) for pattern in (r"[a-z]", r"[A-Z]", r"\d", r"[^\w]")]
+    return sum(classes) >= 3
+
+
+def ignore_reason(text, extra_patterns=()):
+    """Почему текст не стоит переводить заранее, или None."""
+    stripped = text.strip()
+    if len(stripped) < MIN_CHARS:
+        return "too short"
+    if len(text) > MAX_CHARS:
+        return "too long"
+    if not _LETTER_RE.search(stripped):
+        return "no letters"
+    for pattern in _IGNORE_RE:
+        if pattern.fullmatch(stripped):
+            return "ignored pattern"
+    for pattern in extra_patterns:
+        try:
+            if re.search(pattern, stripped):
+                return "ignored pattern"
+        except re.error:
+            continue
+    if looks_like_secret(stripped):
+        return "looks like a secret"
+    return None
+
+
+class ClipboardSpeculator:
+    """
+    Следит за буфером обмена через ClipboardBackend (clipboard_capture) и
+    переводит новые тексты в фоне. Переводы идут по одному: если буфер
+    меняется быстрее, промежуточные тексты пропускаются.
+    """
+
+    def __init__(self, backend, settings=None, poll_interval=POLL_INTERVAL, debounce=DEBOUNCE):
+        self.backend = backend
+        self.settings = settings or get_settings()
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+        self.stats = {"translated": 0, "cached": 0, "skipped": 0, "over_budget": 0, "errors": 0}
+        self.last_skip = None
+        self._recent = OrderedDict()
+        self._day = date.today()
+        self._spent = 0
+        self._paused_until = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if self.running and not self._stop.is_set():
+            return self
+        # У каждого потока своё событие остановки: старый, если ещё не вышел, не подхватит новый запуск
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._watch, args=(self._stop,), name="clipboard-speculation", daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def budget(self):
+        return self.settings.get("speculative_daily_chars", DAILY_CHAR_BUDGET)
+
+    def spent_today(self):
+        if self._day != date.today():
+            self._day, self._spent = date.today(), 0
+        return self._spent
+
+    def _watch(self, stop):
+        sequence = self._sequence()
+        changed_at = None
+        while not stop.wait(self.poll_interval):
+            current = self._sequence()
+            if current != sequence:
+                sequence, changed_at = current, time.monotonic()
+            elif changed_at is not None and time.monotonic() - changed_at >= self.debounce:
+                changed_at = None
+                try:
+                    self.consider(self.backend.get_text() or "")
+                except Exception as e:
+                    self.stats["errors"] += 1
+                    print(f"Ошибка упреждающего перевода: {e}")
+
+    def _sequence(self):
+        try:
+            return self.backend.sequence_number()
+        except Exception:
+            return None
+
+    def consider(self, text):
+        """Переводит text заранее, если он того стоит. Возвращает результат или None."""
+        # QTextEdit хранит переводы строк как \n — ключ кэша должен совпасть
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+        target_name = self.settings.get("last_language", "English")
+        target_code = next((code for name, code in LANGUAGES if name == target_name), None)
+        key = (text, target_name)
+        if key in self._recent:
+            self._recent.move_to_end(key)
+            return None
+        self._remember(key)
+        reason = ignore_reason(text, self.settings.get("speculative_ignore", []))
+        if reason is None and time.monotonic() < self._paused_until:
+            reason = "paused after error"
+        if reason is not None:
+            return self._skip(reason)
+        import translator
+        if not translator.needs_translation(text, target_name, target_code):
+            self.stats["cached"] += 1
+            return None
+        if self.spent_today() + len(text) > self.budget():
+            return self._skip("daily budget exhausted", "over_budget")
+        self._spent += len(text)
+        trace = start_trace("speculate", chars=len(text), target=target_code)
+        with trace.activate(), latency_budget(SPECULATIVE):
+            translated = self._translate(text, target_name, target_code)
+        if isinstance(translated, translator.ErrorText):
+            self.stats["errors"] += 1
+            self._paused_until = time.monotonic() + ERROR_PAUSE
+            trace.finish(str(translated))
+            return None
+        self.stats["translated"] += 1
+        trace.finish()
+        return translated
+
+    def _translate(self, text, target_name, target_code):
+        # Как TranslateWorker: через демон, если он запущен, — тогда перевод
+        # ляжет в тот же кэш, из которого его возьмёт окно перевода
+        import translator
+        if self.settings.get("use_daemon", True):
+            from daemon_client import DaemonUnavailable, find_daemon, forget_daemon
+            client = find_daemon()
+            if client is not None:
+                try:
+                    return client.translate_text(text, target_name, target_code)
+                except DaemonUnavailable:
+                    forget_daemon()
+        return translator.translate_text(text, target_name, target_code)
+
+    def _remember(self, key):
+        self._recent[key] = True
+        while len(self._recent) > RECENT_TEXTS:
+            self._recent.popitem(last=False)
+
+    def _skip(self, reason, counter="skipped"):
+        self.stats[counter] += 1
+        self.last_skip = reason
+        return None
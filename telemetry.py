@@ -0,0 +1,284 @@
+import contextvars
+import itertools
+import json
+import threading
+import time
+from collections import deque
+
+# Замеры по этапам запроса: захват выделения, определение языка, HTTP,
+# ожидание в пуле потоков, отрисовка. Span — один замер этапа; Trace —
+# цепочка span'ов одного запроса. Текущий trace передаётся через contextvars,
+# поэтому span() внутри translator/http_client попадает в нужный запрос и
+# в потоках движка. Модуль лёгкий: его импортирует GUI при старте.
+
+STAGE_WINDOW = 500  # замеров на этап для скользящих перцентилей
+RECENT_TRACES = 50
+TELEMETRY_FILE = "telemetry.jsonl"
+QUANTILES = (0.5, 0.95, 0.99)
+
+_current_trace = contextvars.ContextVar("trace", default=None)
+
+
+class Trace:
+    _ids = itertools.count(1)
+
+    def __init__(self, name, telemetry, **attrs):
+        self.id = next(self._ids)
+        self.name = name
+        self.attrs = attrs
+        self.started_at = time.time()
+        self.error = None
+        self.duration = None
+        self.spans = []
+        self._started = time.perf_counter()
+        self._telemetry = telemetry
+        self._lock = threading.Lock()
+
+    def add_span(self, stage, started, ended, error=None, **attrs):
+        # started/ended — значения time.perf_counter()
+        duration = ended - started
+        with self._lock:
+            self.spans.append({
+                "stage": stage,
+                "offset": started - self._started,
+                "duration": duration,
+                "thread": threading.current_thread().name,
+                "error": error,
+                **attrs,
+            })
+        self._telemetry.observe(stage, duration, error is not None)
+
+    def span(self, stage, **attrs):
+        return _Span(stage, self, attrs)
+
+    def activate(self):
+        """Делает trace текущим для span() в этом потоке (with trace.activate(): ...)."""
+        return _Activation(self)
+
+    def finish(self, error=None):
+        # Повторный вызов ничего не делает: запрос мог и завершиться, и быть вытеснен
+        with self._lock:
+            if self.duration is not None:
+                return
+            self.duration = time.perf_counter() - self._started
+            self.error = error
+        self._telemetry.observe(f"{self.name}.total", self.duration, error is not None)
+        self._telemetry.add_trace(self)
+
+    def to_dict(self):
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: span["offset"])
+        return {
+            "id": self.id,
+            "name": self.name,
+            "started_at": self.started_at,
+            "duration": self.duration,
+            "error": self.error,
+            **self.attrs,
+            "spans": spans,
+        }
+
+
+class _Span:
+    def __init__(self, stage, trace, attrs):
+        self.stage = stage
+        self.trace = trace
+        self.attrs = attrs
+
+    def set(self, **attrs):
+        # Атрибуты, известные только к концу этапа (статус ответа, error=...)
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        ended = time.perf_counter()
+        error = exc_type.__name__ if exc_type else self.attrs.pop("error", None)
+        if self.trace is not None:
+            self.trace.add_span(self.stage, self._started, ended, error, **self.attrs)
+        else:
+            get_telemetry().observe(self.stage, ended - self._started, error is not None)
+        return False
+
+
+class _Activation:
+    def __init__(self, trace):
+        self.trace = trace
+
+    def __enter__(self):
+        self._token = _current_trace.set(self.trace)
+        return self.trace
+
+    def __exit__(self, exc_type, exc, tb):
+        _current_trace.reset(self._token)
+        return False
+
+
+class StageStats:
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.samples = deque(maxlen=STAGE_WINDOW)
+
+    def percentile(self, q):
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class Telemetry:
+    """
+    Скользящая статистика по этапам и последние запросы. Экспорт — JSON lines
+    (по запросу на строку) и текст в формате Prometheus. Если задан log_path,
+    каждый завершённый запрос дописывается в файл.
+    """
+
+    def __init__(self, log_path=None):
+        self.log_path = log_path
+        self._lock = threading.Lock()
+        self._stages = {}
+        self._traces = deque(maxlen=RECENT_TRACES)
+
+    def start_trace(self, name, **attrs):
+        return Trace(name, self, **attrs)
+
+    def observe(self, stage, duration, error=False):
+        with self._lock:
+            stats = self._stages.get(stage)
+            if stats is None:
+                stats = self._stages[stage] = StageStats()
+            stats.count += 1
+            stats.errors += bool(error)
+            stats.total += duration
+            stats.samples.append(duration)
+
+    def add_trace(self, trace):
+        with self._lock:
+            self._traces.append(trace)
+            log_path = self.log_path
+        if log_path:
+            try:
+                with open(log_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(trace.to_dict(), ensure_ascii=False) + "\n")
+            except OSError as e:
+                print(f"Не удалось записать телеметрию в {log_path}: {e}")
+
+    def set_log_path(self, log_path):
+        with self._lock:
+            self.log_path = log_path
+
+    def recent_traces(self, limit=RECENT_TRACES):
+        with self._lock:
+            traces = list(self._traces)[-limit:]
+        return [trace.to_dict() for trace in reversed(traces)]
+
+    def stage_stats(self):
+        """{этап: {count, errors, mean, p50, p95, p99}}, время в секундах."""
+        with self._lock:
+            snapshot = {
+                stage: (stats.count, stats.errors, stats.total, list(stats.samples))
+                for stage, stats in self._stages.items()
+            }
+        result = {}
+        for stage, (count, errors, total, samples) in sorted(snapshot.items()):
+            window = StageStats()
+            window.samples.extend(samples)
+            result[stage] = {
+                "count": count,
+                "errors": errors,
+                "mean": total / count if count else 0.0,
+                **{f"p{int(q * 100)}": window.percentile(q) for q in QUANTILES},
+            }
+        return result
+
+    def to_jsonl(self):
+        return "".join(
+            json.dumps(trace, ensure_ascii=False) + "\n" for trace in reversed(self.recent_traces())
+        )
+
+    def to_prometheus(self):
+        # Summary: квантили по скользящему окну, _sum/_count — за всё время
+        lines = [
+            "# HELP translator_stage_seconds Duration of translation pipeline stages.",
+            "# TYPE translator_stage_seconds summary",
+        ]
+        errors = []
+        with self._lock:
+            stages = {stage: (stats.count, stats.errors, stats.total) for stage, stats in self._stages.items()}
+        percentiles = self.stage_stats()
+        for stage, (count, error_count, total) in sorted(stages.items()):
+            label = stage.replace("\\", "\\\\").replace('"', '\\"')
+            for q in QUANTILES:
+                value = percentiles[stage][f"p{int(q * 100)}"]
+                if value is not None:
+                    lines.append(f'translator_stage_seconds{{stage="{label}",quantile="{q}"}} {value:.6f}')
+            lines.append(f'translator_stage_seconds_sum{{stage="{label}"}} {total:.6f}')
+            lines.append(f'translator_stage_seconds_count{{stage="{label}"}} {count}')
+            errors.append(f'translator_stage_errors_total{{stage="{label}"}} {error_count}')
+        lines += [
+            "# HELP translator_stage_errors_total Failed stage executions.",
+            "# TYPE translator_stage_errors_total counter",
+            *errors,
+        ]
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+            self._traces.clear()
+
+
+def format_timeline(trace, width=40):
+    """
+    Текстовая диаграмма запроса из to_dict(): строка на этап с полосой,
+    сдвинутой на его начало. Для панели диагностики и логов.
+    """
+    total = trace["duration"] or max(
+        (span["offset"] + span["duration"] for span in trace["spans"]), default=0.0
+    )
+    started = time.strftime("%H:%M:%S", time.localtime(trace["started_at"]))
+    status = f"error: {trace['error']}" if trace["error"] else "ok"
+    lines = [f"{started}  #{trace['id']} {trace['name']}  {total * 1000:.0f} ms  [{status}]"]
+    scale = width / total if total > 0 else 0.0
+    for span in trace["spans"]:
+        start = min(width - 1, int(span["offset"] * scale))
+        length = max(1, min(width - start, round(span["duration"] * scale)))
+        bar = " " * start + "#" * length + " " * (width - start - length)
+        mark = " !" if span["error"] else ""
+        lines.append(f"  {span['stage']:<16}|{bar}| {span['offset'] * 1000:7.1f} +{span['duration'] * 1000:7.1f} ms{mark}")
+    return "\n".join(lines)
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+def span(stage, **attrs):
+    """
+    Замер этапа: with span("http", path=path): ... Попадает в текущий trace,
+    если он есть, и в статистику этапа в любом случае.
+    """
+    return _Span(stage, current_trace(), attrs)
+
+
+def start_trace(name, **attrs):
+    return get_telemetry().start_trace(name, **attrs)
+
+
+_telemetry = None
+_telemetry_lock = threading.Lock()
+
+
+def get_telemetry():
+    global _telemetry
+    if _telemetry is None:
+        with _telemetry_lock:
+            if _telemetry is None:
+                from settings import get_settings
+                log = get_settings().get("telemetry_log", False)
+                _telemetry = Telemetry(TELEMETRY_FILE if log else None)
+    return _telemetry
@@ -0,0 +1,100 @@
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+import types
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+# Как в бенчмарках: кэши, память и история — во временной папке, config —
+# без настоящего ключа. OpenAI указывает на закрытый порт: сеть тестам не
+# нужна, а запросы мимо поддельного бэкенда сразу получают отказ в соединении.
+os.chdir(tempfile.mkdtemp(prefix="translator-tests-"))
+
+
+def _closed_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+config = types.ModuleType("config")
+config.OPENAI_API_KEY = "test"
+config.OPENAI_BASE_URL = f"http://127.0.0.1:{_closed_port()}/v1"
+config.MODEL_NAME = "test-model"
+config.HOTKEY = "ctrl+shift+t"
+sys.modules.setdefault("config", config)
+
+
+class FakeBackend:
+    """
+    Поддельный бэкенд для router: "[код] текст". Тексты из fail падают,
+    gate (threading.Event) задерживает ответ, пока его не откроют.
+    """
+
+    name = "fake"
+    model = "fake-1"
+
+    def __init__(self):
+        self.calls = []
+        self.fail = set()
+        self.gate = None
+        self.started = threading.Event()
+        self.cancelled = threading.Event()
+        self._lock = threading.Lock()
+
+    def supports(self, target_language_code):
+        return True
+
+    def translate(self, text, target_language, target_language_code=None, source_language=None,
+                  cancel_token=None):
+        with self._lock:
+            self.calls.append(text)
+        self.started.set()
+        if self.gate is not None:
+            while not self.gate.wait(0.01):
+                if cancel_token is not None and cancel_token.cancelled:
+                    self.cancelled.set()
+                    cancel_token.raise_if_cancelled()
+        if text in self.fail:
+            raise ConnectionError(f"fake backend is down for {text!r}")
+        return f"[{target_language_code}] {text}"
+
+
+@pytest.fixture
+def stores(monkeypatch):
+    # Пустые кэш и память переводов в памяти на каждый тест
+    import translation_cache
+    import translation_memory
+    monkeypatch.setattr(translation_cache, "_cache", translation_cache.TranslationCache(":memory:"))
+    monkeypatch.setattr(translation_memory, "_memory", translation_memory.TranslationMemory(":memory:"))
+    return translation_cache._cache, translation_memory._memory
+
+
+@pytest.fixture
+def fake_backend(monkeypatch, stores):
+    """translator с единственным бэкендом — FakeBackend."""
+    import http_client
+    import translator
+    from router import Router
+    backend = FakeBackend()
+    monkeypatch.setattr(translator, "router", Router([backend], hedge=False))
+    # Отказы соединения повторяются без пауз
+    monkeypatch.setattr(http_client, "backoff_delay", lambda attempt: 0)
+    yield backend
+    if backend.gate is not None:
+        backend.gate.set()
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not met in time")
+        time.sleep(0.005)
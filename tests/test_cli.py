@@ -0,0 +1,113 @@
+import json
+
+import pytest
+
+import cli
+
+
+@pytest.fixture
+def paths(tmp_path):
+    source = tmp_path / "in.txt"
+    source.write_text("\n\n".join(f"Paragraph number {i}." for i in range(60)) + "\n", encoding="utf-8")
+    return source, tmp_path / "out.txt"
+
+
+def run(source, output, *extra):
+    return cli.main([str(source), "--to", "ru", "-o", str(output), "-q", "--no-daemon",
+                     "--concurrency", "1", *extra])
+
+
+def test_translates_in_order(fake_backend, paths):
+    source, output = paths
+    assert run(source, output) == 0
+    lines = [line for line in output.read_text(encoding="utf-8").splitlines() if line]
+    assert lines == [f"[ru] Paragraph number {i}." for i in range(60)]
+    assert not (output.parent / "out.txt.checkpoint").exists()
+
+
+def test_failing_group_is_recorded_and_run_continues(fake_backend, paths, monkeypatch):
+    source, output = paths
+    original = cli.Translation.translate_group
+    calls = []
+
+    def translate_group(self, group):
+        calls.append(len(group))
+        if len(calls) == 2:
+            raise RuntimeError("group exploded")
+        return original(self, group)
+
+    monkeypatch.setattr(cli.Translation, "translate_group", translate_group)
+    assert run(source, output) == 1
+    lines = [line for line in output.read_text(encoding="utf-8").splitlines() if line]
+    assert len(lines) == 60
+    assert lines[cli.GROUP_RECORDS] == f"Paragraph number {cli.GROUP_RECORDS}."
+    assert lines[-1] == "[ru] Paragraph number 59."
+
+
+def test_resume_truncates_partial_write(fake_backend, paths, monkeypatch):
+    source, output = paths
+    original = cli.Translation.translate_group
+    calls = []
+
+    def interrupted(self, group):
+        calls.append(len(group))
+        if len(calls) == 3:
+            raise KeyboardInterrupt
+        return original(self, group)
+
+    monkeypatch.setattr(cli, "CHECKPOINT_INTERVAL", 0)
+    monkeypatch.setattr(cli.Translation, "translate_group", interrupted)
+    assert run(source, output) == 130
+    checkpoint_path = output.parent / "out.txt.checkpoint"
+    checkpoint = json.loads(checkpoint_path.read_text(encoding="utf-8"))
+    assert checkpoint["records"] == 2 * cli.GROUP_RECORDS
+    assert checkpoint["output_bytes"] == output.stat().st_size
+
+    # Оборванная запись после контрольной точки не должна попасть в результат
+    with open(output, "ab") as f:
+        f.write(b"[ru] half-written garb")
+    monkeypatch.setattr(cli.Translation, "translate_group", original)
+    assert run(source, output) == 0
+    lines = [line for line in output.read_text(encoding="utf-8").splitlines() if line]
+    assert lines == [f"[ru] Paragraph number {i}." for i in range(60)]
+    assert fake_backend.calls.count("Paragraph number 0.") == 1
+
+
+def test_checkpoint_beyond_output_starts_over(fake_backend, paths):
+    source, output = paths
+    fingerprint = cli.input_fingerprint(str(source), "ru", "txt", None)
+    cli.save_checkpoint(str(output) + ".checkpoint", {
+        "fingerprint": fingerprint, "records": 40, "output_bytes": 10000,
+        "stats": {"records": 40, "texts": 40, "chars": 800, "errors": 0},
+    })
+    output.write_bytes(b"short")
+    assert run(source, output) == 0
+    lines = [line for line in output.read_text(encoding="utf-8").splitlines() if line]
+    assert lines == [f"[ru] Paragraph number {i}." for i in range(60)]
+
+
+def test_jsonl_fields(fake_backend, tmp_path):
+    source = tmp_path / "in.jsonl"
+    source.write_text('{"title": "Open the file", "n": 1}\nnot json\n{"title": ""}\n', encoding="utf-8")
+    output = tmp_path / "out.jsonl"
+    assert cli.main([str(source), "--to", "ru", "-o", str(output), "-q", "--no-daemon",
+                     "--fields", "title", "--keep-source"]) == 0
+    lines = output.read_text(encoding="utf-8").splitlines()
+    assert json.loads(lines[0]) == {"title": "Open the file", "n": 1, "title_ru": "[ru] Open the file"}
+    assert lines[1:] == ["not json", '{"title": ""}']
+
+
+def test_failed_document_chunk_keeps_original(fake_backend, tmp_path):
+    from segmenter import split_chunks
+    long_record = " ".join(f"Sentence number {i} is here." for i in range(400))
+    chunks = split_chunks(long_record)
+    assert len(chunks) > 1
+    fake_backend.fail.add(chunks[1][1])
+    source = tmp_path / "in.txt"
+    source.write_text(f"Short paragraph.\n\n{long_record}\n", encoding="utf-8")
+    output = tmp_path / "out.txt"
+    assert run(source, output) == 1
+    lines = output.read_text(encoding="utf-8").splitlines()
+    assert lines[0] == "[ru] Short paragraph."
+    assert lines[2] == long_record
+    assert "Translation failed" not in output.read_text(encoding="utf-8")
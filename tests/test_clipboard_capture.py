@@ -0,0 +1,51 @@
+import pytest
+
+from clipboard_capture import FakeClipboardBackend, SelectionCapture
+
+
+def test_delayed_copy_is_detected():
+    backend = FakeClipboardBackend(selection="selected text", copy_delay=0.05, text="old clipboard")
+    assert SelectionCapture(backend, timeout=1).capture() == "selected text"
+    assert backend.copies == 1
+
+
+def test_timeout_returns_empty_not_stale_text():
+    backend = FakeClipboardBackend(selection=None, text="old clipboard")
+    assert SelectionCapture(backend, timeout=0.05).capture() == ""
+    assert backend.get_text() == "old clipboard"
+
+
+def test_clipboard_is_restored():
+    backend = FakeClipboardBackend(selection="selected text", text="old clipboard")
+    assert SelectionCapture(backend).capture() == "selected text"
+    assert backend.get_text() == "old clipboard"
+
+
+def test_clipboard_is_kept_without_restore():
+    backend = FakeClipboardBackend(selection="selected text", text="old clipboard")
+    SelectionCapture(backend, restore=False).capture()
+    assert backend.get_text() == "selected text"
+
+
+def test_clipboard_is_restored_when_reading_fails(monkeypatch):
+    backend = FakeClipboardBackend(selection="selected text", text="old clipboard")
+
+    def broken_get_text():
+        raise OSError("clipboard is locked")
+
+    capture = SelectionCapture(backend)
+    monkeypatch.setattr(backend, "get_text", broken_get_text)
+    with pytest.raises(OSError):
+        capture.capture()
+    monkeypatch.undo()
+    assert backend.get_text() == "old clipboard"
+
+
+def test_capture_async_ignores_repeated_presses():
+    backend = FakeClipboardBackend(selection="selected text", copy_delay=0.1)
+    capture = SelectionCapture(backend, timeout=1)
+    results = []
+    assert capture.capture_async(results.append)
+    assert not capture.capture_async(results.append)
+    capture._executor.shutdown(wait=True)
+    assert results == ["selected text"]
@@ -0,0 +1,51 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from conftest import _closed_port
+from daemon_client import DaemonClient, DaemonUnavailable
+from translator import ErrorText
+
+
+@pytest.fixture
+def failing_daemon():
+    requests = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            requests.append(self.path)
+            self.rfile.read(int(self.headers["Content-Length"]))
+            body = json.dumps({"error": "backend exploded"}).encode()
+            self.send_response(503)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address
+    yield DaemonClient(f"http://{host}:{port}", "token"), requests
+    server.shutdown()
+    server.server_close()
+
+
+def test_daemon_error_is_not_retried_or_unavailable(failing_daemon):
+    client, requests = failing_daemon
+    result = client.translate_text("Open the file", "Russian", "ru")
+    assert isinstance(result, ErrorText) and "backend exploded" in result
+    assert requests == ["/translate"]
+
+    results = client.translate_batch(["a", "b"], "Russian", "ru")
+    assert all(isinstance(item, ErrorText) for item in results) and len(results) == 2
+    assert [isinstance(piece, ErrorText) for piece in client.translate_text_stream("a", "Russian", "ru")] == [True]
+
+
+def test_stopped_daemon_is_unavailable():
+    client = DaemonClient(f"http://127.0.0.1:{_closed_port()}", "token")
+    with pytest.raises(DaemonUnavailable):
+        client.translate_text("Open the file", "Russian", "ru")
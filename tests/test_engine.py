@@ -0,0 +1,145 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+import translator
+from cancellation import CancelToken, TranslationCancelled
+from conftest import wait_until
+from engine import PrioritySlots, get_engine
+from model_policy import SPECULATIVE, latency_budget
+
+
+def test_identical_requests_share_one_backend_call(fake_backend):
+    fake_backend.gate = threading.Event()
+    engine = get_engine()
+    coalesced = engine.coalesced
+    results = []
+
+    def translate():
+        results.append(translator.translate_text("Open the file", "Russian", "ru"))
+
+    threads = [threading.Thread(target=translate) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    wait_until(lambda: engine.coalesced - coalesced == 2)
+    fake_backend.gate.set()
+    for thread in threads:
+        thread.join(5)
+    assert results == ["[ru] Open the file"] * 3
+    assert fake_backend.calls == ["Open the file"]
+
+
+def test_cancel_interrupts_backend_call(fake_backend):
+    fake_backend.gate = threading.Event()
+    token = CancelToken()
+    errors = []
+
+    def translate():
+        try:
+            translator.translate_text("Open the file", "Russian", "ru", cancel_token=token)
+        except TranslationCancelled as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=translate)
+    thread.start()
+    assert fake_backend.started.wait(5)
+    started = time.monotonic()
+    token.cancel()
+    thread.join(5)
+    assert errors and time.monotonic() - started < 1
+    # Общий запрос отменяется, когда его больше никто не ждёт
+    assert fake_backend.cancelled.wait(5)
+
+
+def test_cancelling_one_waiter_keeps_shared_call(fake_backend):
+    fake_backend.gate = threading.Event()
+    token = CancelToken()
+    results, errors = [], []
+
+    def translate(cancel_token=None):
+        try:
+            results.append(translator.translate_text("Open the file", "Russian", "ru", cancel_token=cancel_token))
+        except TranslationCancelled as e:
+            errors.append(e)
+
+    first = threading.Thread(target=translate, args=(token,))
+    second = threading.Thread(target=translate)
+    first.start()
+    assert fake_backend.started.wait(5)
+    second.start()
+    wait_until(lambda: get_engine().stats()["in_flight"] == 1 and len(get_engine()._waiters) == 1
+               and next(iter(get_engine()._waiters.values())) == 2)
+    token.cancel()
+    first.join(5)
+    fake_backend.gate.set()
+    second.join(5)
+    assert len(errors) == 1
+    assert results == ["[ru] Open the file"]
+    assert not fake_backend.cancelled.is_set()
+
+
+def test_priority_slots_let_interactive_requests_first():
+    async def scenario():
+        slots = PrioritySlots(2, reserved=1)
+        await slots.acquire(0)
+        order = []
+
+        async def take(priority, name):
+            await slots.acquire(priority)
+            order.append(name)
+
+        background = asyncio.ensure_future(take(1, "background"))
+        interactive = asyncio.ensure_future(take(0, "interactive"))
+        await asyncio.sleep(0)
+        # Фоновым не достаётся зарезервированное место, интерактивному — достаётся
+        assert order == ["interactive"]
+        slots.release()
+        slots.release()
+        await asyncio.gather(background, interactive)
+        return order
+
+    assert asyncio.run(scenario()) == ["interactive", "background"]
+
+
+def test_run_sync_rejects_engine_thread():
+    engine = get_engine()
+
+    async def nested():
+        coroutine = asyncio.sleep(0)
+        with pytest.raises(RuntimeError):
+            engine.run_sync(coroutine)
+
+    engine.run_sync(nested())
+
+
+def test_stream_reuses_speculative_request(fake_backend):
+    fake_backend.gate = threading.Event()
+    engine = get_engine()
+    coalesced = engine.coalesced
+    results = []
+
+    def speculate():
+        with latency_budget(SPECULATIVE):
+            results.append(translator.translate_text("Open the file", "Russian", "ru"))
+
+    thread = threading.Thread(target=speculate)
+    thread.start()
+    assert fake_backend.started.wait(5)
+    stream = translator.translate_text_stream("Open the file", "Russian", "ru")
+    threading.Timer(0.1, fake_backend.gate.set).start()
+    assert list(stream) == ["[ru] Open the file"]
+    thread.join(5)
+    assert results == ["[ru] Open the file"]
+    assert fake_backend.calls == ["Open the file"]
+    assert engine.coalesced - coalesced == 1
+
+
+def test_cancel_interrupts_stream(fake_backend):
+    fake_backend.gate = threading.Event()
+    token = CancelToken()
+    threading.Timer(0.1, token.cancel).start()
+    with pytest.raises(TranslationCancelled):
+        list(translator.translate_text_stream("Open the file", "Russian", "ru", cancel_token=token))
+    assert fake_backend.cancelled.wait(5)
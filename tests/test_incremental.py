@@ -0,0 +1,36 @@
+import translator
+from incremental import IncrementalTranslator
+
+
+def test_only_changed_sentences_are_translated(fake_backend):
+    live = IncrementalTranslator()
+    text, changed, total = live.translate("Open the file. Close the window.", "Russian", "ru")
+    assert text == "[ru] Open the file. [ru] Close the window."
+    assert (changed, total) == (2, 2)
+
+    text, changed, total = live.translate("Open the file. Save the document.", "Russian", "ru")
+    assert text == "[ru] Open the file. [ru] Save the document."
+    assert (changed, total) == (1, 2)
+    assert fake_backend.calls == ["Open the file.", "Close the window.", "Save the document."]
+
+
+def test_new_target_language_starts_over(fake_backend):
+    live = IncrementalTranslator()
+    live.translate("Open the file.", "Russian", "ru")
+    text, changed, _ = live.translate("Open the file.", "German", "de")
+    assert text == "[de] Open the file."
+    assert changed == 1
+
+
+def test_errors_are_retried_next_time(fake_backend):
+    live = IncrementalTranslator()
+    fake_backend.fail.add("Close the window.")
+    text, _, _ = live.translate("Open the file. Close the window.", "Russian", "ru")
+    assert text.startswith("[ru] Open the file. ")
+    assert "fake backend is down" in text
+
+    fake_backend.fail.clear()
+    text, changed, _ = live.translate("Open the file. Close the window.", "Russian", "ru")
+    assert text == "[ru] Open the file. [ru] Close the window."
+    assert changed == 1
+    assert not isinstance(text, translator.ErrorText)
@@ -0,0 +1,114 @@
+import email.utils
+import threading
+import time
+
+import pytest
+
+from cancellation import CancelToken, TranslationCancelled
+from conftest import wait_until
+from rate_limit import RateLimited, RateLimiter, TokenBucket, parse_duration, retry_after_seconds
+
+
+def test_retry_after_formats():
+    assert retry_after_seconds({"retry-after": "3"}) == 3
+    assert retry_after_seconds({"retry-after-ms": "250", "retry-after": "3"}) == 0.25
+    now = time.time()
+    date = email.utils.formatdate(now + 10, usegmt=True)
+    assert 8 <= retry_after_seconds({"retry-after": date}, now=now) <= 10
+    assert retry_after_seconds({}) is None
+    assert retry_after_seconds({"retry-after": "soon"}) is None
+
+
+def test_parse_duration():
+    assert parse_duration("6m0s") == 360
+    assert parse_duration("250ms") == 0.25
+    assert parse_duration("20") == 20
+    assert parse_duration(None) is None
+
+
+def test_bucket_waits_for_refill():
+    bucket = TokenBucket(60)
+    bucket.take(60)
+    assert bucket.wait_time(1) == pytest.approx(1.0)
+    # Дороже всей корзины — ждём полную корзину, а не вечно
+    assert bucket.wait_time(1000) == pytest.approx(60.0)
+
+
+def test_bucket_learns_limit_from_headers():
+    bucket = TokenBucket()
+    bucket.sync(100, 40)
+    assert (bucket.limit, bucket.level) == (100, 40)
+    bucket.sync(100, 80)
+    assert bucket.level == 40
+
+
+def test_interactive_request_fails_fast_during_long_pause():
+    limiter = RateLimiter(max_interactive_wait=1)
+    limiter.on_response(429, {"retry-after": "30"})
+    with pytest.raises(RateLimited) as error:
+        limiter.acquire(priority=0)
+    assert error.value.retry_after > 1
+    assert limiter.rate_limited == 1
+    assert limiter.factor < 1
+
+
+def test_limit_guessed_from_429_grows_back():
+    limiter = RateLimiter()
+    for _ in range(3):
+        limiter.acquire(priority=1)
+    limiter.on_response(429, {"retry-after": "0"})
+    assert limiter.requests.limit == 3
+    for _ in range(5):
+        limiter.on_response(200, {})
+    assert limiter.requests.limit == 8
+    # Лимит из заголовков точнее догадки — дальше не растёт
+    limiter.on_response(200, {"x-ratelimit-limit-requests": "20"})
+    limiter.on_response(200, {})
+    assert limiter.requests.limit == 20
+
+
+def test_configured_limit_is_kept_after_429():
+    limiter = RateLimiter(requests_per_minute=50)
+    limiter.acquire(priority=1)
+    limiter.on_response(429, {"retry-after": "0"})
+    limiter.on_response(200, {})
+    assert limiter.requests.limit == 50
+
+
+def test_interactive_request_goes_before_background():
+    limiter = RateLimiter()
+    limiter.paused_until = time.monotonic() + 0.2
+    order = []
+
+    def acquire(priority, name):
+        limiter.acquire(priority=priority)
+        order.append(name)
+
+    background = threading.Thread(target=acquire, args=(1, "background"))
+    background.start()
+    wait_until(lambda: limiter.stats()["waiting"] == 1)
+    interactive = threading.Thread(target=acquire, args=(0, "interactive"))
+    interactive.start()
+    background.join(5)
+    interactive.join(5)
+    assert order == ["interactive", "background"]
+
+
+def test_cancel_releases_waiting_request():
+    limiter = RateLimiter(requests_per_minute=1)
+    limiter.acquire(priority=1)
+    token = CancelToken()
+    errors = []
+
+    def acquire():
+        try:
+            limiter.acquire(priority=1, cancel_token=token)
+        except TranslationCancelled as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=acquire)
+    thread.start()
+    wait_until(lambda: limiter.stats()["waiting"] == 1)
+    token.cancel()
+    thread.join(5)
+    assert errors and limiter.stats()["waiting"] == 0
@@ -0,0 +1,47 @@
+from segmenter import estimate_tokens, join_chunks, split_chunks, split_segments
+
+TEXT = (
+    "  First paragraph. It has two sentences!\n\n"
+    "Second paragraph is here.\r\n\r\n\n"
+    "Третий абзац. Ещё предложение?  Последнее…\n"
+)
+
+
+def test_chunks_round_trip():
+    for budget in (3, 10, 800):
+        chunks = split_chunks(TEXT, budget)
+        assert join_chunks(chunks, [body for _, body, _ in chunks]) == TEXT
+        assert all(body == body.strip() for _, body, _ in chunks)
+
+
+def test_chunks_respect_budget():
+    text = " ".join(f"Sentence number {i}." for i in range(200))
+    for _, body, _ in split_chunks(text, 50):
+        assert estimate_tokens(body) <= 50
+
+
+def test_long_sentence_is_split_by_words():
+    text = "word " * 400
+    chunks = split_chunks(text, 20)
+    assert len(chunks) > 1
+    assert join_chunks(chunks, [body for _, body, _ in chunks]) == text
+
+
+def test_segments_are_sentences():
+    bodies = [body for _, body, _ in split_segments(TEXT)]
+    assert bodies == [
+        "First paragraph.", "It has two sentences!", "Second paragraph is here.",
+        "Третий абзац.", "Ещё предложение?", "Последнее…",
+    ]
+
+
+def test_segments_keep_whitespace():
+    segments = split_segments(TEXT)
+    translated = join_chunks(segments, [f"<{body}>" for _, body, _ in segments])
+    assert translated.startswith("  <First paragraph.> <It has two sentences!>\n\n")
+    assert translated.endswith("<Последнее…>\n")
+
+
+def test_empty_text():
+    assert split_chunks("") == []
+    assert join_chunks(split_segments("   "), [""]) == "   "
@@ -0,0 +1,51 @@
+import time
+
+from translation_cache import TranslationCache, make_key
+
+
+def accessed_at(cache, key):
+    return cache._conn.execute("SELECT accessed_at FROM translations WHERE key = ?", (key,)).fetchone()[0]
+
+
+def test_hits_are_written_in_batches():
+    cache = TranslationCache(":memory:")
+    cache.put("a", "A")
+    written = accessed_at(cache, "a")
+    time.sleep(0.01)
+    assert cache.get("a") == "A"
+    assert accessed_at(cache, "a") == written
+    cache.flush()
+    assert accessed_at(cache, "a") > written
+
+
+def test_eviction_keeps_recently_read_entries():
+    cache = TranslationCache(":memory:", max_entries=10)
+    for i in range(10):
+        cache.put(str(i), "v")
+    cache.get("0")
+    cache.put("10", "v")
+    assert cache.get("0") == "v"
+    assert cache.get("1") is None
+    assert cache._count == cache.stats()["entries"] <= 10
+
+
+def test_row_count_follows_replace_and_clear():
+    cache = TranslationCache(":memory:")
+    cache.put("a", "A")
+    cache.put("a", "B")
+    assert cache._count == 1 and cache.get("a") == "B"
+    cache.clear()
+    assert cache._count == 0 and cache.get("a") is None
+
+
+def test_expired_entries_are_misses():
+    cache = TranslationCache(":memory:", ttl=1)
+    cache.put("a", "A")
+    cache._conn.execute("UPDATE translations SET created_at = created_at - 10")
+    assert cache.get("a") is None
+    assert cache._count == 0
+
+
+def test_key_ignores_surrounding_whitespace():
+    assert make_key(" text\r\n", "ru", "openai", "m") == make_key("text", "ru", "openai", "m")
+    assert make_key("text", "ru", "openai", "m") != make_key("text", "de", "openai", "m")
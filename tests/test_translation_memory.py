@@ -0,0 +1,76 @@
+import pytest
+
+import translation_memory
+from translation_memory import TranslationMemory, _band_keys
+
+
+@pytest.fixture
+def memory():
+    return TranslationMemory(":memory:")
+
+
+def test_standalone_numbers_are_substituted(memory):
+    memory.add("Total: 3", "Итого: 3", "ru")
+    assert memory.adapt("Total: 12", "ru") == "Итого: 12"
+
+
+@pytest.mark.parametrize("source, translation, text, target", [
+    ("Осталось 3 дня", "3 days left", "Осталось 1 день", "en"),
+    ("3 days left", "Осталось 3 дня", "5 days left", "ru"),
+    ("Error 404", "Błąd 404", "Error 500", "pl"),
+])
+def test_numbers_next_to_words_are_not_substituted(memory, source, translation, text, target):
+    # "1 days", "5 дня": без согласования с числом перевод неверен — пусть его сделает бэкенд
+    memory.add(source, translation, target)
+    assert memory.adapt(text, target) is None
+
+
+def test_languages_without_plural_agreement_are_substituted(memory):
+    memory.add("3 days left", "还剩3天", "zh")
+    assert memory.adapt("5 days left", "zh") == "还剩5天"
+    memory.add("3 days left", "3 gün kaldı", "tr")
+    assert memory.adapt("5 days left", "tr") == "5 gün kaldı"
+
+
+def test_mismatched_numbers_are_not_substituted(memory):
+    memory.add("From 3 to 3", "С 3 по 3", "ru")
+    assert memory.adapt("From 3 to 4", "ru") is None
+
+
+def test_lookup_finds_similar_texts(memory):
+    memory.add("The weather is nice today in the city", "Сегодня в городе хорошая погода", "ru")
+    matches = memory.lookup("The weather is nice today in the cities", "ru")
+    assert matches and matches[0][1] == "The weather is nice today in the city"
+    assert memory.lookup("The weather is nice today in the cities", "de") == []
+
+
+def test_band_keys_are_stable():
+    # Ключи лежат в базе: их формат меняется только вместе с BANDS_VERSION
+    assert translation_memory.BANDS_VERSION == 1
+    assert _band_keys("abc", "ru")[:2] == [1014029567912463592, 8559125174501115146]
+    assert all(-2 ** 63 <= key < 2 ** 63 for key in _band_keys("Hello, world", "en"))
+
+
+def test_old_band_index_is_rebuilt(tmp_path):
+    path = str(tmp_path / "memory.db")
+    memory = TranslationMemory(path)
+    memory.add("The weather is nice today in the city", "Хорошая погода", "ru")
+    memory._conn.execute("UPDATE memory_bands SET band = band + 1")
+    memory._conn.execute("PRAGMA user_version = 0")
+    memory._conn.commit()
+    memory._conn.close()
+
+    memory = TranslationMemory(path)
+    assert memory.lookup("The weather is nice today in the cities", "ru")
+
+
+def test_eviction_keeps_newest_entries():
+    memory = TranslationMemory(":memory:", max_entries=10)
+    for i in range(25):
+        memory.add(f"Phrase number {i} about cats", f"Фраза {i}", "ru")
+    entries = memory.stats()["entries"]
+    assert entries <= 10 and entries == memory._count
+    sources = {source for (source,) in memory._conn.execute("SELECT source FROM memory")}
+    assert "Phrase number 24 about cats" in sources and "Phrase number 0 about cats" not in sources
+    memory.clear()
+    assert memory._count == 0 and memory.stats()["entries"] == 0
@@ -0,0 +1,194 @@
+import pytest
+
+import translator
+from router import FunctionBackend, Router
+
+
+def test_translate_text_uses_backend_and_cache(fake_backend):
+    assert translator.translate_text("Open the file", "Russian", "ru") == "[ru] Open the file"
+    assert translator.translate_text("Open the file", "Russian", "ru") == "[ru] Open the file"
+    assert fake_backend.calls == ["Open the file"]
+
+
+def test_backend_failure_becomes_error_text(fake_backend):
+    fake_backend.fail.add("Open the file")
+    result = translator.translate_text("Open the file", "Russian", "ru")
+    assert isinstance(result, translator.ErrorText)
+    assert "fake backend is down" in result
+
+
+def test_unreachable_openai_returns_error_text(monkeypatch, stores):
+    import http_client
+    monkeypatch.setattr(http_client, "backoff_delay", lambda attempt: 0)
+    openai = FunctionBackend("openai", "test-model", lambda *args: translator._translate_openai(*args))
+    monkeypatch.setattr(translator, "router", Router([openai], hedge=False))
+
+    result = translator.translate_text("Open the file, please", "Russian", "ru")
+    assert isinstance(result, translator.ErrorText)
+    assert result.startswith("[Connection error]")
+
+    results = translator.translate_batch(["Open the file", "Close the window"], "Russian", "ru")
+    assert all(isinstance(item, translator.ErrorText) for item in results)
+
+
+def test_post_chat_wraps_connection_errors(monkeypatch):
+    import http_client
+    monkeypatch.setattr(http_client, "backoff_delay", lambda attempt: 0)
+    with pytest.raises(translator.TranslationError):
+        translator._post_chat(translator._chat_payload("system", "prompt", "test-model", 16))
+
+
+def test_batch_keeps_results_of_working_items(fake_backend):
+    fake_backend.fail.add("Close the window")
+    texts = ["Open the file", "Close the window", "Save the document", "Open the file"]
+    results = translator.translate_batch(texts, "Russian", "ru")
+    assert results[0] == results[3] == "[ru] Open the file"
+    assert results[2] == "[ru] Save the document"
+    assert isinstance(results[1], translator.ErrorText)
+
+
+def test_multi_keeps_results_of_working_languages(fake_backend, monkeypatch):
+    fail_for = {"fr"}
+
+    def translate(text, target_language, target_language_code=None, source_language=None, cancel_token=None):
+        if target_language_code in fail_for:
+            raise ConnectionError("no French today")
+        return f"[{target_language_code}] {text}"
+
+    monkeypatch.setattr(fake_backend, "translate", translate)
+    text = "Please restart the application to apply the changes."
+    results = translator.translate_multi(text, [("Russian", "ru"), ("French", "fr"), ("German", "de")])
+    assert results["ru"] == f"[ru] {text}"
+    assert results["de"] == f"[de] {text}"
+    assert isinstance(results["fr"], translator.ErrorText)
+
+
+def test_number_adaptation_is_not_cached(fake_backend, stores):
+    cache, _ = stores
+    assert translator.translate_text("Total: 3", "Russian", "ru") == "[ru] Total: 3"
+    assert translator.translate_text("Total: 7", "Russian", "ru") == "[ru] Total: 7"
+    assert fake_backend.calls == ["Total: 3"]
+    assert cache.stats()["entries"] == 1
+
+
+@pytest.mark.parametrize("text, code", [("Settings", "pt"), ("Error 404", "nl"), ("OK", "tr")])
+def test_short_or_uncertain_text_is_translated(text, code):
+    assert not translator._already_in_target(text, code)
+
+
+def test_long_confident_text_is_skipped():
+    assert translator._already_in_target("Please restart the application to apply changes.", "en")
+
+
+@pytest.fixture
+def openai_packs(monkeypatch, stores):
+    openai = FunctionBackend("openai", "test-model", lambda *args: translator._translate_openai(*args))
+    monkeypatch.setattr(translator, "router", Router([openai], hedge=False))
+    calls = []
+
+    def send_pack(texts, target_language, target_language_code, cancel_token=None):
+        calls.append(list(texts))
+        return send_pack.reply(texts)
+
+    monkeypatch.setattr(translator, "_send_pack_openai", send_pack)
+    return send_pack, calls
+
+
+def test_failing_pack_is_not_split(openai_packs):
+    send_pack, calls = openai_packs
+
+    def unauthorized(texts):
+        raise translator.TranslationError("[Error: 401]\nInvalid API key")
+
+    send_pack.reply = unauthorized
+    texts = [f"Menu item number {i}" for i in range(100)]
+    results = translator.translate_batch(texts, "Russian", "ru")
+    assert len(calls) == 1
+    assert all(isinstance(item, translator.ErrorText) and "401" in item for item in results)
+
+
+def test_pack_with_wrong_length_is_split(openai_packs):
+    send_pack, calls = openai_packs
+
+    def merges_large_packs(texts):
+        # Модель "склеивает" два сегмента в пакетах больше двух строк
+        translated = [f"[ru] {text}" for text in texts]
+        return translated[:-1] if len(texts) > 2 else translated
+
+    send_pack.reply = merges_large_packs
+    texts = [f"Menu item number {i}" for i in range(4)]
+    assert translator.translate_batch(texts, "Russian", "ru") == [f"[ru] {text}" for text in texts]
+    assert [len(pack) for pack in calls] == [4, 2, 2]
+
+
+def test_document_reports_failed_chunks(fake_backend):
+    from segmenter import split_chunks
+    text = "\n\n".join(f"Paragraph {i}. " + "Some words here. " * 20 for i in range(6))
+    chunks = split_chunks(text, 100)
+    fake_backend.fail.add(chunks[2][1])
+    result = translator.translate_document(text, "Russian", "ru", chunk_tokens=100)
+    assert isinstance(result, translator.PartialTranslation)
+    assert len(result.failures) == 1 and "fake backend is down" in result.failures[0]
+    assert "[Translation failed: " in result and chunks[2][1] in result
+
+    fake_backend.fail.clear()
+    result = translator.translate_document(text, "Russian", "ru", chunk_tokens=100)
+    assert not isinstance(result, translator.ErrorText)
+
+
+def test_multi_translates_short_text_detected_as_target(fake_backend):
+    results = translator.translate_multi("Restaurant menu", [("Spanish", "es"), ("Russian", "ru")])
+    assert results == {"es": "[es] Restaurant menu", "ru": "[ru] Restaurant menu"}
+
+
+def test_multi_skips_text_confidently_in_target(fake_backend):
+    text = "Please restart the application to apply changes."
+    results = translator.translate_multi(text, [("English", "en"), ("Russian", "ru")])
+    assert results == {"en": text, "ru": f"[ru] {text}"}
+
+
+@pytest.fixture
+def mock_openai(monkeypatch, stores):
+    from mock_server import MockOpenAIServer
+    server = MockOpenAIServer(latency=0, jitter=0).start()
+    monkeypatch.setattr(translator, "OPENAI_BASE_URL", server.base_url)
+    openai = FunctionBackend("openai", "test-model", lambda *args: translator._translate_openai(*args))
+    monkeypatch.setattr(translator, "router", Router([openai], hedge=False))
+    yield server
+    server.stop()
+
+
+def test_truncated_stream_is_an_error_and_not_cached(mock_openai, stores):
+    cache, _ = stores
+    mock_openai.truncate_at = 10
+    pieces = list(translator.translate_text_stream("Open the file, please", "Russian", "ru"))
+    assert isinstance(pieces[-1], translator.ErrorText)
+    assert "truncated" in pieces[-1]
+    assert cache.stats()["entries"] == 0
+
+    mock_openai.truncate_at = None
+    pieces = list(translator.translate_text_stream("Open the file, please", "Russian", "ru"))
+    assert "".join(pieces) == "[tr] Open the file, please"
+    assert cache.stats()["entries"] == 1
+
+
+def test_truncated_reply_is_an_error(mock_openai):
+    mock_openai.truncate_at = 10
+    result = translator.translate_text("Open the file, please", "Russian", "ru")
+    assert isinstance(result, translator.ErrorText) and "truncated" in result
+
+
+def test_cache_key_follows_chosen_model(fake_backend, monkeypatch):
+    import model_policy
+    monkeypatch.setattr(model_policy, "FAST_MODEL", "fast-model")
+    monkeypatch.setattr(model_policy, "LARGE_MODEL", "large-model")
+    monkeypatch.setattr(fake_backend, "name", "openai")
+    translator.router = Router([fake_backend], hedge=False)
+    # Между порогами быстрой модели для пакетного (150) и интерактивного (600) режимов
+    text = " ".join(f"Sentence {i} about the weather." for i in range(30))
+    assert translator.translate_text(text, "Russian", "ru") == f"[ru] {text}"
+    assert translator.translate_text(text, "Russian", "ru") == f"[ru] {text}"
+    assert len(fake_backend.calls) == 1
+    with model_policy.latency_budget(model_policy.BATCH):
+        assert translator.translate_text(text, "Russian", "ru") == f"[ru] {text}"
+    assert len(fake_backend.calls) == 2
@@ -0,0 +1,187 @@
+import atexit
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+
+CACHE_FILE = "translation_cache.db"
+CACHE_MAX_ENTRIES = 50000
+CACHE_TTL_SECONDS = 30 * 24 * 60 * 60  # 30 дней
+ACCESS_FLUSH_SIZE = 256  # отложенных отметок о чтении, после которых пишем их сразу
+
+
+def normalize_text(text):
+    # Одинаковый текст с разными переводами строк / пробелами по краям — один ключ
+    text = unicodedata.normalize("NFC", text)
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text.strip()
+
+
+def make_key(text, target, backend, model):
+    raw = "\x1f".join((backend, model or "", target or "", normalize_text(text)))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class TranslationCache:
+    """
+    Постоянный кэш переводов в SQLite с вытеснением по LRU и TTL.
+    Время последнего чтения копится в памяти и пишется пачкой при put(),
+    flush() или close(): попадание в кэш не стоит коммита.
+    """
+
+    def __init__(self, path=CACHE_FILE, max_entries=CACHE_MAX_ENTRIES, ttl=CACHE_TTL_SECONDS):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._accessed = {}  # key -> время чтения, ещё не записанное в базу
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS translations ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS translations_accessed ON translations (accessed_at)"
+        )
+        self._conn.commit()
+        (self._count,) = self._conn.execute("SELECT COUNT(*) FROM translations").fetchone()
+        self.purge_expired()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM translations WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            value, created_at = row
+            if self.ttl and created_at < now - self.ttl:
+                self._count -= self._conn.execute("DELETE FROM translations WHERE key = ?", (key,)).rowcount
+                self._conn.commit()
+                self._accessed.pop(key, None)
+                self.misses += 1
+                return None
+            self._accessed[key] = now
+            if len(self._accessed) >= ACCESS_FLUSH_SIZE:
+                self._flush_locked()
+                self._conn.commit()
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        now = time.time()
+        with self._lock:
+            self._flush_locked()
+            self._accessed.pop(key, None)
+            updated = self._conn.execute(
+                "UPDATE translations SET value = ?, created_at = ?, accessed_at = ? WHERE key = ?",
+                (value, now, now, key),
+            ).rowcount
+            if not updated:
+                self._conn.execute(
+                    "INSERT INTO translations (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    (key, value, now, now),
+                )
+                self._count += 1
+            self._evict_locked()
+            self._conn.commit()
+
+    def flush(self):
+        """Записывает накопленные отметки о чтении."""
+        with self._lock:
+            self._flush_locked()
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._flush_locked()
+            self._conn.commit()
+            self._conn.close()
+
+    def _flush_locked(self):
+        if self._accessed:
+            self._conn.executemany(
+                "UPDATE translations SET accessed_at = ? WHERE key = ?",
+                [(accessed_at, key) for key, accessed_at in self._accessed.items()],
+            )
+            self._accessed.clear()
+
+    def _evict_locked(self):
+        if not self.max_entries or self._count <= self.max_entries:
+            return
+        # Файл кэша могут делить несколько процессов (GUI и демон) — перед
+        # вытеснением сверяем счётчик с базой
+        (self._count,) = self._conn.execute("SELECT COUNT(*) FROM translations").fetchone()
+        if self._count <= self.max_entries:
+            return
+        # Удаляем с запасом, чтобы не вытеснять по одной записи на каждый put
+        excess = self._count - int(self.max_entries * 0.9)
+        self._count -= self._conn.execute(
+            "DELETE FROM translations WHERE key IN ("
+            " SELECT key FROM translations ORDER BY accessed_at LIMIT ?)",
+            (excess,),
+        ).rowcount
+
+    def purge_expired(self):
+        if not self.ttl:
+            return
+        with self._lock:
+            self._count -= self._conn.execute(
+                "DELETE FROM translations WHERE created_at < ?", (time.time() - self.ttl,)
+            ).rowcount
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM translations")
+            self._conn.commit()
+            self._accessed.clear()
+            self._count = 0
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(value)), 0) FROM translations"
+            ).fetchone()
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "bytes": size,
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                try:
+                    _cache = TranslationCache()
+                except sqlite3.Error as e:
+                    # Файл повреждён или недоступен — работаем с кэшем в памяти
+                    print(f"Не удалось открыть кэш {os.path.abspath(CACHE_FILE)}: {e}")
+                    _cache = TranslationCache(":memory:")
+                atexit.register(_cache.flush)
+    return _cache
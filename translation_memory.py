@@ -0,0 +1,294 @@
+import hashlib
+import os
+import re
+import sqlite3
+import struct
+import threading
+import time
+import zlib
+from collections import Counter
+
+from translation_cache import normalize_text
+
+# Память переводов: прошлые пары "оригинал → перевод" с нечётким поиском.
+# Похожие тексты ищутся через MinHash по символьным триграммам и LSH-корзины
+# в SQLite, поэтому поиск не зависит от размера памяти и не требует загрузки
+# всех записей при старте.
+
+MEMORY_FILE = "translation_memory.db"
+MEMORY_MAX_ENTRIES = 300000
+MEMORY_MAX_CHARS = 1000
+MATCH_THRESHOLD = 0.7
+MAX_CANDIDATES = 20
+
+SHINGLE_SIZE = 3
+NUM_PERM = 40
+BANDS = 8
+ROWS = NUM_PERM // BANDS
+
+# Версия ключей LSH-корзин: при её смене индекс корзин перестраивается
+BANDS_VERSION = 1
+
+# Языки без согласования существительного с числом ("3 日", "3 gün"):
+# в их переводах числа можно менять где угодно
+NO_PLURAL_AGREEMENT = {"zh", "ja", "ko", "vi", "th", "id", "ms", "tr", "hu", "fa", "km", "lo", "my"}
+
+_MASK = (1 << 64) - 1
+_MIX = 0x9E3779B97F4A7C15
+
+_NUMBER_RE = re.compile(r"\d+(?:[.,]\d+)*")
+_SPACE_RE = re.compile(r"\s+")
+_WORD_BEFORE_RE = re.compile(r"[^\W\d_][\s\u00a0]*$")
+_WORD_AFTER_RE = re.compile(r"^[\s\u00a0]*[^\W\d_]")
+
+
+def _fingerprint_text(text):
+    # Регистр, пробелы и конкретные числа на похожесть не влияют
+    text = _SPACE_RE.sub(" ", normalize_text(text).lower())
+    return _NUMBER_RE.sub("0", text)
+
+
+def shingles(text):
+    text = f" {_fingerprint_text(text)} "
+    if len(text) <= SHINGLE_SIZE:
+        return {text}
+    return {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def similarity(a, b):
+    """Коэффициент Жаккара по триграммам, от 0 до 1."""
+    sa, sb = shingles(a), shingles(b)
+    return len(sa & sb) / len(sa | sb)
+
+
+def _signature(text):
+    # One permutation hashing: каждый хэш попадает в одну из NUM_PERM корзин,
+    # в корзине берётся минимум — одна хэш-функция вместо NUM_PERM
+    mins = [None] * NUM_PERM
+    for shingle in shingles(text):
+        h = (zlib.crc32(shingle.encode("utf-8")) * _MIX) & _MASK
+        slot, value = h % NUM_PERM, h // NUM_PERM
+        if mins[slot] is None or value < mins[slot]:
+            mins[slot] = value
+    # Пустые корзины (короткий текст) заполняем из следующей непустой
+    filled = next(value for value in mins if value is not None)
+    for slot in range(NUM_PERM - 1, -1, -1):
+        if mins[slot] is None:
+            mins[slot] = filled
+        filled = mins[slot]
+    return mins
+
+
+def _band_keys(text, target):
+    # Ключи хранятся в базе, поэтому нужен хэш, не зависящий от версии Python
+    signature = _signature(text)
+    prefix = target.encode("utf-8") + b"\0"
+    keys = []
+    for band in range(BANDS):
+        packed = struct.pack(f"<B{ROWS}Q", band, *signature[band * ROWS:(band + 1) * ROWS])
+        digest = hashlib.blake2b(prefix + packed, digest_size=8).digest()
+        keys.append(int.from_bytes(digest, "little", signed=True))
+    return keys
+
+
+def _pattern(text):
+    return _NUMBER_RE.sub("\x00", normalize_text(text))
+
+
+def _next_to_word(text, match):
+    return bool(_WORD_BEFORE_RE.search(text, 0, match.start()) or _WORD_AFTER_RE.match(text[match.end():]))
+
+
+def _substitute_numbers(source, translation, text, target):
+    # "Осталось 3 дня" → "3 days left": для "Осталось 5 дней" меняем числа в
+    # готовом переводе, если каждое старое число встречается в нём ровно так же.
+    # Но "5 days" нельзя превратить в "1 days", а "3 дня" — в "5 дня": рядом со
+    # словом число меняем, только если язык перевода не согласует его со словом
+    if target.lower().split("-")[0] not in NO_PLURAL_AGREEMENT and any(
+        _next_to_word(translation, match) for match in _NUMBER_RE.finditer(translation)
+    ):
+        return None
+    old, new = _NUMBER_RE.findall(source), _NUMBER_RE.findall(text)
+    if len(old) != len(new):
+        return None
+    mapping = {}
+    for before, after in zip(old, new):
+        if mapping.setdefault(before, after) != after:
+            return None
+    if set(_NUMBER_RE.findall(translation)) != set(mapping):
+        return None
+    return _NUMBER_RE.sub(lambda m: mapping[m.group(0)], translation)
+
+
+class TranslationMemory:
+    """
+    Постоянная память переводов в SQLite. lookup() находит похожие прошлые
+    переводы, adapt() — готовый перевод для текста, отличающегося только
+    числами.
+    """
+
+    def __init__(self, path=MEMORY_FILE, max_entries=MEMORY_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        if path != ":memory:":
+            self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS memory ("
+            " id INTEGER PRIMARY KEY,"
+            " target TEXT NOT NULL,"
+            " source TEXT NOT NULL,"
+            " pattern TEXT NOT NULL,"
+            " translation TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " UNIQUE (target, source))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS memory_pattern ON memory (target, pattern)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS memory_created ON memory (created_at)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS memory_bands ("
+            " band INTEGER NOT NULL,"
+            " entry_id INTEGER NOT NULL,"
+            " PRIMARY KEY (band, entry_id)) WITHOUT ROWID"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS memory_bands_entry ON memory_bands (entry_id)")
+        (version,) = self._conn.execute("PRAGMA user_version").fetchone()
+        if version < BANDS_VERSION:
+            self._rebuild_bands()
+        self._conn.commit()
+        (self._count,) = self._conn.execute("SELECT COUNT(*) FROM memory").fetchone()
+
+    def _rebuild_bands(self):
+        # Корзины от прежней версии ключей ничего не найдут — считаем заново
+        self._conn.execute("DELETE FROM memory_bands")
+        rows = self._conn.execute("SELECT id, source, target FROM memory").fetchall()
+        for entry_id, source, target in rows:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO memory_bands (band, entry_id) VALUES (?, ?)",
+                [(band, entry_id) for band in _band_keys(source, target)],
+            )
+        self._conn.execute(f"PRAGMA user_version = {BANDS_VERSION}")
+
+    def add(self, source, translation, target):
+        source, translation = normalize_text(source), translation.strip()
+        if not source or not translation or source == translation or len(source) > MEMORY_MAX_CHARS:
+            return
+        bands = _band_keys(source, target)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id FROM memory WHERE target = ? AND source = ?", (target, source)
+            ).fetchone()
+            if row is not None:
+                self._conn.execute(
+                    "UPDATE memory SET translation = ?, created_at = ? WHERE id = ?",
+                    (translation, time.time(), row[0]),
+                )
+            else:
+                entry_id = self._conn.execute(
+                    "INSERT INTO memory (target, source, pattern, translation, created_at)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (target, source, _pattern(source), translation, time.time()),
+                ).lastrowid
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO memory_bands (band, entry_id) VALUES (?, ?)",
+                    [(band, entry_id) for band in bands],
+                )
+                self._count += 1
+                self._evict_locked()
+            self._conn.commit()
+
+    def _evict_locked(self):
+        if not self.max_entries or self._count <= self.max_entries:
+            return
+        # Как в TranslationCache: базу могут делить несколько процессов —
+        # перед вытеснением сверяем счётчик с ней
+        (self._count,) = self._conn.execute("SELECT COUNT(*) FROM memory").fetchone()
+        if self._count <= self.max_entries:
+            return
+        excess = self._count - int(self.max_entries * 0.9)
+        ids = [(entry_id,) for (entry_id,) in self._conn.execute(
+            "SELECT id FROM memory ORDER BY created_at LIMIT ?", (excess,)
+        )]
+        self._conn.executemany("DELETE FROM memory_bands WHERE entry_id = ?", ids)
+        self._conn.executemany("DELETE FROM memory WHERE id = ?", ids)
+        self._count -= len(ids)
+
+    def lookup(self, text, target, threshold=MATCH_THRESHOLD, limit=3):
+        """
+        Возвращает до limit пар (похожесть, оригинал, перевод) с похожестью
+        не ниже threshold, лучшие первыми.
+        """
+        text = normalize_text(text)
+        if not text or len(text) > MEMORY_MAX_CHARS:
+            return []
+        bands = _band_keys(text, target)
+        placeholders = ", ".join("?" * len(bands))
+        with self._lock:
+            hits = Counter(entry_id for (entry_id,) in self._conn.execute(
+                f"SELECT entry_id FROM memory_bands WHERE band IN ({placeholders})", bands
+            ))
+            if not hits:
+                return []
+            # Чем больше общих корзин, тем вероятнее высокая похожесть
+            ids = [entry_id for entry_id, _ in hits.most_common(MAX_CANDIDATES)]
+            rows = self._conn.execute(
+                f"SELECT source, translation FROM memory WHERE id IN ({', '.join('?' * len(ids))})",
+                ids,
+            ).fetchall()
+        matches = []
+        query = shingles(text)
+        for source, translation in rows:
+            candidate = shingles(source)
+            score = len(query & candidate) / len(query | candidate)
+            if score >= threshold and source != text:
+                matches.append((score, source, translation))
+        matches.sort(key=lambda match: match[0], reverse=True)
+        return matches[:limit]
+
+    def adapt(self, text, target):
+        """Готовый перевод текста, который отличается от прошлого только числами."""
+        text = normalize_text(text)
+        if not _NUMBER_RE.search(text) or len(text) > MEMORY_MAX_CHARS:
+            return None
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT source, translation FROM memory WHERE target = ? AND pattern = ?"
+                " ORDER BY created_at DESC LIMIT 5",
+                (target, _pattern(text)),
+            ).fetchall()
+        for source, translation in rows:
+            adapted = _substitute_numbers(source, translation, text, target)
+            if adapted is not None:
+                return adapted
+        return None
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM memory_bands")
+            self._conn.execute("DELETE FROM memory")
+            self._conn.commit()
+            self._count = 0
+
+    def stats(self):
+        with self._lock:
+            (entries,) = self._conn.execute("SELECT COUNT(*) FROM memory").fetchone()
+        return {"entries": entries, "max_entries": self.max_entries}
+
+
+_memory = None
+_memory_lock = threading.Lock()
+
+
+def get_memory():
+    global _memory
+    if _memory is None:
+        with _memory_lock:
+            if _memory is None:
+                try:
+                    _memory = TranslationMemory()
+                except sqlite3.Error as e:
+                    print(f"Не удалось открыть память переводов {os.path.abspath(MEMORY_FILE)}: {e}")
+                    _memory = TranslationMemory(":memory:")
+    return _memory
@@ -1,92 +1,833 @@
+import asyncio
+import concurrent.futures
+import json
+import queue
+import re
+import time
 import requests
+import config
 from config import OPENAI_API_KEY, OPENAI_BASE_URL, MODEL_NAME
+from translation_cache import get_cache, make_key
+from translation_memory import get_memory
+from history_store import get_history_store
+from languages import CODE_TO_NAME, NAME_TO_CODE
+import language_detector
+from http_client import (
+    HAS_GOOGLETRANS, call_with_retries, enable_rate_limit, get_google_translator, post_json, prewarm,
+)
+from rate_limit import RateLimited, retry_after_seconds
+from segmenter import CHUNK_TOKENS, estimate_tokens, join_chunks, split_chunks
+from engine import get_engine
+from cancellation import TranslationCancelled, raise_if_cancelled
+from router import AllBackendsFailed, FunctionBackend, Router
+from telemetry import span
+import model_policy
 
-# Попробуем импортировать googletrans
-try:
-    from googletrans import Translator as GoogleTranslator
-    HAS_GOOGLETRANS = True
-except ImportError:
-    HAS_GOOGLETRANS = False
+# Ниже этого порога локальному детектору не доверяем и спрашиваем модель
+DETECT_CONFIDENCE_THRESHOLD = 0.3
+# Не переводить текст, "уже написанный на целевом языке", — ошибка дороже:
+# пользователь получит оригинал вместо перевода. Поэтому порог намного строже,
+# а короткие строки ("Settings", "Error 404") переводятся всегда
+SKIP_CONFIDENCE_THRESHOLD = 0.6
+SKIP_MIN_LETTERS = 20
 
-def translate_text(text, target_language, target_language_code=None):
-    # Если есть googletrans и ISO-код — используем Google Translate
-    if HAS_GOOGLETRANS and target_language_code:
+DOCUMENT_WORKERS = 4
+DOCUMENT_CHUNK_RETRIES = 2
+
+BATCH_TOKENS = 1500
+BATCH_MAX_SEGMENTS = 100
+BATCH_WORKERS = 4
+
+# Сколько похожих прошлых переводов подсказывать модели
+MEMORY_CONTEXT_MATCHES = 2
+
+DETECT_MAX_TOKENS = 5
+
+# Лимиты аккаунта OpenAI; без них ограничитель узнаёт их из заголовков ответа
+rate_limiter = enable_rate_limit(
+    OPENAI_BASE_URL,
+    requests_per_minute=getattr(config, "RATE_LIMIT_RPM", None),
+    tokens_per_minute=getattr(config, "RATE_LIMIT_TPM", None),
+)
+
+# Один компактный шаблон: общие инструкции — в системном сообщении
+TRANSLATE_SYSTEM = (
+    "You are a professional translator. Reply with the translation only, without explanations. "
+    "Use only the official alphabet of the target language and translate the meaning, never transliterate. "
+    "If you do not know the target language, return the text unchanged."
+)
+TRANSLATE_PROMPT = "Translate from {source} to {target}.\n{reference}Text to translate:\n\n{text}"
+
+
+_LETTER_RE = re.compile(r"[^\W\d_]")
+
+
+class TranslationError(Exception):
+    """Ошибка бэкенда; текст сообщения показывается пользователю вместо перевода."""
+
+
+class TranslationTruncated(TranslationError):
+    """Ответ модели упёрся в max_tokens."""
+
+
+class RateLimitError(TranslationError):
+    """API отвечает 429 или клиентский лимит не даёт отправить запрос вовремя."""
+
+    def __init__(self, retry_after=None):
+        wait = f" Try again in {retry_after:.0f} s." if retry_after else ""
+        super().__init__(f"[Rate limited] Too many requests to the translation API.{wait}")
+        self.retry_after = retry_after
+
+
+class ErrorText(str):
+    """Сообщение об ошибке, возвращённое вместо перевода; отличимо через isinstance."""
+
+
+class PartialTranslation(ErrorText):
+    """
+    Документ переведён не целиком: упавшие куски остались в оригинале с
+    пометкой об ошибке, failures — сообщения об ошибках этих кусков.
+    """
+
+    def __new__(cls, text, failures):
+        self = super().__new__(cls, text)
+        self.failures = list(failures)
+        return self
+
+
+# Конец потока фрагментов в translate_text_stream
+_STREAM_END = object()
+
+
+def _error_text(error):
+    return ErrorText(error if isinstance(error, TranslationError) else f"[Error] {error}")
+
+
+# Порядок — предпочтение: Google, если есть googletrans и ISO-код, затем OpenAI.
+# При ошибке или разомкнутом circuit breaker запрос уходит следующему бэкенду.
+router = Router([
+    FunctionBackend(
+        "google", "googletrans",
+        lambda text, name, code, source_language, cancel_token: _translate_google(text, code, cancel_token),
+        supports=lambda code: HAS_GOOGLETRANS and bool(code),
+    ),
+    FunctionBackend("openai", MODEL_NAME, lambda *args: _translate_openai(*args)),
+])
+
+
+def register_backend(backend, first=False):
+    """Подключает дополнительный бэкенд (см. router.Backend)."""
+    router.register(backend, first=first)
+
+
+def translate_text(text, target_language, target_language_code=None, cancel_token=None):
+    try:
+        return _translate_cached(text, target_language, target_language_code, cancel_token=cancel_token)
+    except TranslationError as e:
+        return ErrorText(e)
+
+
+def _translate_cached(text, target_language, target_language_code=None, source_language=None,
+                      cancel_token=None):
+    # Как translate_text, но ошибки бэкенда пробрасываются как TranslationError
+    return get_engine().run_sync(
+        _translate_async(text, target_language, target_language_code, source_language),
+        cancel_token=cancel_token,
+    )
+
+
+async def _translate_async(text, target_language, target_language_code=None, source_language=None):
+    engine = get_engine()
+    # SQLite и детектор блокируют — не в потоке event loop
+    local = await engine.run_local(_translate_local, text, target_language, target_language_code)
+    if local is not None:
+        return local
+    _, key = _resolve_backend(text, target_language, target_language_code)
+    # Одинаковые запросы в полёте (тот же ключ кэша) делят один сетевой вызов
+    return await engine.run(
+        key, _fetch, text, target_language, target_language_code, source_language
+    )
+
+
+def _translate_local(text, target_language, target_language_code):
+    # Перевод без сети или None
+    if _already_in_target(text, target_language_code):
+        return text
+    cached = _get_cached(text, target_language, target_language_code)
+    if cached is not None:
+        return cached
+    # Тот же текст с другими числами — берём прошлый перевод без запроса.
+    # В точный кэш такой перевод не кладём: это догадка, а не ответ бэкенда
+    return get_memory().adapt(text, _memory_target(target_language, target_language_code))
+
+
+def _fetch(text, target_language, target_language_code, source_language, cancel_token=None):
+    try:
+        result, backend_name = router.translate(
+            text, target_language, target_language_code, source_language, cancel_token=cancel_token
+        )
+    except AllBackendsFailed as e:
+        raise TranslationError(f"[Error] {e}")
+    except (TranslationCancelled, TranslationError):
+        raise
+    except Exception as e:
+        # Необработанная ошибка подключённого бэкенда — тоже ошибка перевода
+        raise TranslationError(f"[Error] {e}")
+    get_cache().put(_backend_key(router.get(backend_name), text, target_language, target_language_code), result)
+    get_memory().add(text, result, _memory_target(target_language, target_language_code))
+    return result
+
+
+def _call_recorded(backend_name, func, *args, cancel_token=None):
+    # Для запросов в обход router.translate (пакеты, мультиязычный промпт):
+    # исход всё равно учитывается circuit breaker'ом
+    try:
+        result = func(*args, cancel_token=cancel_token)
+    except TranslationCancelled:
+        raise
+    except Exception:
+        router.record(backend_name, ok=False)
+        raise
+    router.record(backend_name)
+    return result
+
+
+def is_large_document(text, chunk_tokens=CHUNK_TOKENS):
+    return estimate_tokens(text) > chunk_tokens
+
+
+def translate_document(text, target_language, target_language_code=None,
+                       max_workers=DOCUMENT_WORKERS, chunk_tokens=CHUNK_TOKENS, on_progress=None,
+                       cancel_token=None):
+    """
+    Переводит большой текст по кускам параллельно и собирает результат в
+    исходном порядке с исходными пробелами между кусками. Упавший кусок
+    повторяется отдельно; если он так и не переведён, остаётся оригинал
+    с пометкой об ошибке, а результат — PartialTranslation.
+    """
+    chunks = split_chunks(text, chunk_tokens)
+    bodies = [body for _, body, _ in chunks]
+    # Документ переводится в фоне с прогрессом — здесь важнее качество, чем задержка
+    with model_policy.latency_budget(model_policy.BATCH):
+        translated, failures = get_engine().run_sync(_translate_document_async(
+            bodies, target_language, target_language_code, max_workers, on_progress
+        ), cancel_token=cancel_token)
+    result = join_chunks(chunks, translated)
+    return PartialTranslation(result, failures) if failures else result
+
+
+async def _translate_document_async(bodies, target_language, target_language_code, max_workers, on_progress):
+    translated = list(bodies)
+    failures = []
+    pending = [i for i, body in enumerate(bodies) if body]
+    limit = asyncio.Semaphore(max(1, max_workers))
+
+    async def translate_chunk(index):
+        async with limit:
+            for attempt in range(DOCUMENT_CHUNK_RETRIES + 1):
+                try:
+                    return index, await _translate_async(bodies[index], target_language, target_language_code)
+                except TranslationCancelled:
+                    raise
+                except Exception as e:
+                    if attempt == DOCUMENT_CHUNK_RETRIES:
+                        failures.append(str(e))
+                        return index, f"[Translation failed: {e}]\n{bodies[index]}"
+
+    done = 0
+    for next_done in asyncio.as_completed([translate_chunk(i) for i in pending]):
+        index, result = await next_done
+        translated[index] = result
+        done += 1
+        if on_progress:
+            on_progress(done, len(pending))
+    return translated, failures
+
+
+def translate_text_stream(text, target_language, target_language_code=None, cancel_token=None):
+    """
+    То же, что translate_text, но отдаёт перевод фрагментами по мере
+    поступления. OpenAI стримится через SSE, Google и кэш отдают
+    результат одним фрагментом. Отмена cancel_token обрывает поток.
+    """
+    raise_if_cancelled(cancel_token)
+    local = _translate_local(text, target_language, target_language_code)
+    if local is not None:
+        yield local
+        return
+    # Как _translate_async: через слоты движка и с объединением по ключу кэша.
+    # Если тот же текст уже переводится (упреждающий перевод буфера), ждём
+    # его ответа целиком вместо второго запроса
+    engine = get_engine()
+    _, key = _resolve_backend(text, target_language, target_language_code)
+    pieces = queue.Queue()
+    future = engine.submit(engine.run(
+        key, _fetch_stream, text, target_language, target_language_code, pieces.put
+    ))
+    future.add_done_callback(lambda _: pieces.put(_STREAM_END))
+    unregister = cancel_token.on_cancel(future.cancel) if cancel_token is not None else None
+    streamed = False
+    try:
+        while True:
+            piece = pieces.get()
+            if piece is _STREAM_END:
+                break
+            streamed = True
+            yield piece
         try:
-            translator = GoogleTranslator()
-            result = translator.translate(text, dest=target_language_code)
-            return result.text
-        except Exception as e:
-            return f"[Google Translate error] {e}"
-    # Fallback: OpenAI
-    source_lang = detect_language(text)
-    if target_language_code:
-        prompt = f"""
-Translate the following text from {source_lang} to {target_language} ({target_language_code}).
-- Output ONLY the translation, without any explanations, comments, or extra text.
-- Use only the official alphabet of the target language.
-- If you do not know the target language, return the original text unchanged.
-- Do not transliterate, translate the meaning.
+            result = future.result()
+        except concurrent.futures.CancelledError:
+            raise TranslationCancelled(
+                f"Request {cancel_token.request_id if cancel_token else '?'} cancelled"
+            )
+        except TranslationError as e:
+            yield ErrorText(e)
+            return
+        if not streamed:
+            yield result
+    finally:
+        if unregister:
+            unregister()
+        # Поток бросили не дочитав — запрос больше никому не нужен
+        future.cancel()
+
+
+def _fetch_stream(text, target_language, target_language_code, on_piece, cancel_token=None):
+    # Как _fetch, но фрагменты ответа сразу отдаются в on_piece
+    error = TranslationError("[Error] No translation backend available")
+    for backend in router.candidates(target_language_code):
+        parts = []
+        started = time.perf_counter()
+        try:
+            if backend.name == "openai":
+                for piece in _stream_openai(text, target_language, target_language_code, cancel_token):
+                    parts.append(piece)
+                    on_piece(piece)
+            else:
+                parts.append(backend.translate(text, target_language, target_language_code, None, cancel_token))
+                on_piece(parts[0])
+        except TranslationError as e:
+            router.record(backend.name, ok=False)
+            if parts:
+                # Часть перевода уже показана — переключаться поздно
+                raise
+            error = e
+            continue
+        router.record(backend.name, time.perf_counter() - started)
+        result = "".join(parts).strip()
+        if result:
+            get_cache().put(_backend_key(backend, text, target_language, target_language_code), result)
+            get_memory().add(text, result, _memory_target(target_language, target_language_code))
+        return result
+    raise error
+
+
+def translate_batch(texts, target_language, target_language_code=None, max_workers=BATCH_WORKERS,
+                    cancel_token=None):
+    """
+    Переводит список коротких строк, упаковывая их в минимальное число
+    запросов. Возвращает список переводов той же длины и в том же порядке;
+    для строк, которые не удалось перевести, — строку с ошибкой, как
+    translate_text.
+    """
+    results = [None] * len(texts)
+    pending = {}  # текст -> индексы; одинаковые строки переводим один раз
+    for i, text in enumerate(texts):
+        if not text.strip() or _already_in_target(text, target_language_code):
+            results[i] = text
+            continue
+        cached = _get_cached(text, target_language, target_language_code)
+        if cached is not None:
+            results[i] = cached
+        else:
+            pending.setdefault(text, []).append(i)
+
+    packs = _pack_segments(list(pending))
+    translated_packs = get_engine().run_sync(
+        _translate_packs_async(packs, target_language, target_language_code, max_workers),
+        cancel_token=cancel_token,
+    )
+    for pack, translated_pack in zip(packs, translated_packs):
+        for text, translated in zip(pack, translated_pack):
+            for i in pending[text]:
+                results[i] = translated
+    return results
+
+
+async def _translate_packs_async(packs, target_language, target_language_code, max_workers):
+    limit = asyncio.Semaphore(max(1, max_workers))
+
+    async def translate_pack(pack):
+        async with limit:
+            try:
+                return await _translate_pack_async(pack, target_language, target_language_code)
+            except TranslationCancelled:
+                raise
+            except Exception as e:
+                # Упавший пакет не должен терять переводы остальных
+                return [_error_text(e)] * len(pack)
+
+    return await asyncio.gather(*(translate_pack(pack) for pack in packs))
+
+
+def translate_multi(text, targets, on_result=None, max_workers=BATCH_WORKERS, cancel_token=None):
+    """
+    Переводит один текст сразу на несколько языков. targets — список пар
+    (название, ISO-код) как в LANGUAGES. Исходный язык определяется один раз;
+    для OpenAI все языки запрашиваются одним промптом, для Google — параллельно.
+    on_result(code, перевод) вызывается по мере готовности каждого языка.
+    Возвращает словарь {код: перевод}.
+    """
+    return get_engine().run_sync(
+        _translate_multi_async(text, targets, on_result, max_workers), cancel_token=cancel_token
+    )
+
+
+async def _translate_multi_async(text, targets, on_result, max_workers):
+    results = {}
+
+    def deliver(code, translated):
+        results[code] = translated
+        if on_result:
+            on_result(code, translated)
+
+    engine = get_engine()
+    source_name, _ = await engine.run(None, detect_source_language, text)
+    cache = get_cache()
+    missing = []
+    for name, code in targets:
+        # Тот же строгий порог, что и в translate_text: при сомнении переводим
+        if await engine.run_local(_already_in_target, text, code):
+            deliver(code, text)
+            continue
+        cached = await engine.run_local(_get_cached, text, name, code)
+        if cached is not None:
+            deliver(code, cached)
+        else:
+            missing.append((name, code))
+
+    openai_targets = [(name, code) for name, code in missing
+                      if _resolve_backend(text, name, code)[0] == "openai"]
+    if len(openai_targets) > 1:
+        try:
+            packed = await engine.run(
+                None, _call_recorded, "openai", _send_multi_openai, text, source_name, openai_targets
+            )
+        except TranslationCancelled:
+            raise
+        except Exception:
+            packed = {}
+        for name, code in openai_targets:
+            if packed.get(code):
+                await engine.run_local(cache.put, _resolve_backend(text, name, code)[1], packed[code])
+                deliver(code, packed[code])
+        missing = [(name, code) for name, code in missing if code not in results]
+
+    limit = asyncio.Semaphore(max(1, max_workers))
+
+    async def translate_one(name, code):
+        async with limit:
+            try:
+                return code, await _translate_async(text, name, code, source_language=source_name)
+            except TranslationCancelled:
+                raise
+            except Exception as e:
+                # Ошибка одного языка не должна терять переводы остальных
+                return code, _error_text(e)
+
+    for next_done in asyncio.as_completed([translate_one(name, code) for name, code in missing]):
+        deliver(*await next_done)
+    return results
+
+
+def _send_multi_openai(text, source_language, targets, cancel_token=None):
+    languages = ", ".join(f'"{code}" ({name})' for name, code in targets)
+    prompt = f"""Translate the text below from {source_language} to each of these languages: {languages}.
+- Return ONLY a JSON object whose keys are the language codes and values are the translations.
+- Use only the official alphabet of each target language. Do not transliterate, translate the meaning.
 
 Text to translate:
 
 {text}
 """
-    else:
-        prompt = f"""
-Translate the following text from {source_lang} to {target_language}.
-- Output ONLY the translation, without any explanations, comments, or extra text.
-- Use only the official alphabet of the target language.
-- If you do not know the target language, return the original text unchanged.
-- Do not transliterate, translate the meaning.
+    model, max_tokens = model_policy.choose(text, outputs=len(targets), overhead=8 * len(targets))
+    payload = _chat_payload(
+        "You are a professional translator. Reply with a JSON object only.", prompt, model, max_tokens
+    )
+    content = _chat(payload, cancel_token)
+    start, end = content.find("{"), content.rfind("}")
+    if start == -1 or end < start:
+        return {}
+    packed = json.loads(content[start:end + 1])
+    return {code: value.strip() for code, value in packed.items() if isinstance(value, str)}
 
-Text to translate:
 
-{text}
+def _pack_segments(texts, budget=BATCH_TOKENS):
+    packs = []
+    current, current_tokens = [], 0
+    for text in texts:
+        # +4 токена на кавычки, запятую и экранирование в JSON-массиве
+        tokens = estimate_tokens(text) + 4
+        if current and (current_tokens + tokens > budget or len(current) >= BATCH_MAX_SEGMENTS):
+            packs.append(current)
+            current, current_tokens = [], 0
+        current.append(text)
+        current_tokens += tokens
+    if current:
+        packs.append(current)
+    return packs
+
+
+async def _translate_pack_async(texts, target_language, target_language_code):
+    if len(texts) == 1:
+        try:
+            return [await _translate_async(texts[0], target_language, target_language_code)]
+        except TranslationCancelled:
+            raise
+        except Exception as e:
+            return [_error_text(e)]
+    backend, _ = _resolve_backend(texts[0], target_language, target_language_code)
+    if backend not in ("google", "openai"):
+        # Подключённые бэкенды пакетов не умеют — переводим строки по одной
+        singles = await asyncio.gather(
+            *(_translate_pack_async([text], target_language, target_language_code) for text in texts)
+        )
+        return [single[0] for single in singles]
+    try:
+        if backend == "google":
+            translated = await get_engine().run(
+                None, _call_recorded, "google", _send_pack_google, texts, target_language_code
+            )
+        else:
+            translated = await get_engine().run(
+                None, _call_recorded, "openai", _send_pack_openai, texts, target_language, target_language_code
+            )
+    except TranslationCancelled:
+        raise
+    except Exception as e:
+        # Ошибка бэкенда (401, 429, сеть, 5xx после повторов) повторится и для
+        # половинок пакета — делить его незачем
+        return [_error_text(e)] * len(texts)
+    if translated is None or len(translated) != len(texts):
+        # Модель склеила или потеряла сегменты — делим пополам и повторяем
+        middle = len(texts) // 2
+        halves = await asyncio.gather(
+            _translate_pack_async(texts[:middle], target_language, target_language_code),
+            _translate_pack_async(texts[middle:], target_language, target_language_code),
+        )
+        return halves[0] + halves[1]
+    # Ключ — под модель, которая переводила пакет целиком
+    model = _pack_choice(texts)[1] if backend == "openai" else None
+    keys = [_backend_key(router.get(backend), text, target_language, target_language_code, model) for text in texts]
+    await get_engine().run_local(_put_cached, keys, translated)
+    return translated
+
+
+def _send_pack_google(texts, target_language_code, cancel_token=None):
+    # googletrans переводит список по одному запросу на строку, поэтому
+    # однострочные сегменты отправляем одним текстом построчно
+    if any("\n" in text for text in texts):
+        return None
+    joined = _translate_google("\n".join(texts), target_language_code, cancel_token)
+    return [line.strip() for line in joined.split("\n")]
+
+
+def _pack_choice(texts):
+    # (JSON-массив, модель, max_tokens) для пакетного запроса к OpenAI
+    array = json.dumps(texts, ensure_ascii=False)
+    return (array, *model_policy.choose(array, overhead=4 * len(texts)))
+
+
+def _send_pack_openai(texts, target_language, target_language_code, cancel_token=None):
+    target = _target_label(target_language, target_language_code)
+    array, model, max_tokens = _pack_choice(texts)
+    prompt = f"""Translate every string of the JSON array below to {target}.
+- Return ONLY a JSON array of strings with exactly {len(texts)} elements, in the same order.
+- Each element must be the translation of the element with the same index; never merge or split elements.
+- Use only the official alphabet of the target language. Do not transliterate, translate the meaning.
+
+{array}
 """
+    payload = _chat_payload(
+        "You are a professional translator. Reply with a JSON array only.", prompt, model, max_tokens
+    )
+    try:
+        content = _chat(payload, cancel_token).strip()
+    except TranslationTruncated:
+        return None  # Пакет не влез в лимит ответа — поделится пополам
+    # Модели иногда оборачивают ответ в ```json ... ```
+    start, end = content.find("["), content.rfind("]")
+    if start == -1 or end < start:
+        return None
+    try:
+        translated = json.loads(content[start:end + 1])
+    except ValueError:
+        return None
+    if not all(isinstance(item, str) for item in translated):
+        return None
+    return [item.strip() for item in translated]
 
-    headers = {
-        "Authorization": f"Bearer {OPENAI_API_KEY}",
-        "Content-Type": "application/json"
-    }
 
-    payload = {
-        "model": MODEL_NAME,
-        "messages": [
-            {"role": "system", "content": "You are a professional translator. Return ONLY the translation, without any explanations or extra text."},
-            {"role": "user", "content": prompt}
-        ]
-    }
+def needs_translation(text, target_language, target_language_code=None):
+    """False, если текст уже на целевом языке или его перевод лежит в кэше."""
+    return not (_already_in_target(text, target_language_code)
+                or _get_cached(text, target_language, target_language_code) is not None)
+
+
+def _already_in_target(text, target_language_code):
+    # Текст уже на целевом языке — переводить нечего. При сомнении переводим
+    if not target_language_code or len(_LETTER_RE.findall(text)) < SKIP_MIN_LETTERS:
+        return False
+    source_code, confidence = language_detector.detect(text)
+    return source_code == target_language_code and confidence >= SKIP_CONFIDENCE_THRESHOLD
+
+
+def _resolve_backend(text, target_language, target_language_code):
+    # Первый доступный бэкенд с учётом circuit breaker
+    backend = router.candidates(target_language_code)[0]
+    return backend.name, _backend_key(backend, text, target_language, target_language_code)
+
+
+def _backend_key(backend, text, target_language, target_language_code, model=None):
+    # Модель OpenAI выбирает model_policy по размеру текста и режиму: перевод
+    # быстрой модели не должен доставаться запросам, которым положена большая
+    if model is None:
+        model = model_policy.choose(text)[0] if backend.name == "openai" else backend.model
+    return make_key(text, target_language_code or target_language, backend.name, model)
+
+
+def _memory_target(target_language, target_language_code=None):
+    return target_language_code or NAME_TO_CODE.get(target_language.strip().lower(), target_language)
+
+
+def _memory_context(text, target_language, target_language_code=None):
+    matches = get_memory().lookup(
+        text, _memory_target(target_language, target_language_code), limit=MEMORY_CONTEXT_MATCHES
+    )
+    if not matches:
+        return ""
+    examples = "\n\n".join(f"Source: {source}\nTranslation: {translation}" for _, source, translation in matches)
+    return f"""Earlier translations of similar texts (keep their terminology and wording where it still fits):
+
+{examples}
+
+"""
+
 
-    response = requests.post(f"{OPENAI_BASE_URL}/chat/completions", headers=headers, json=payload)
+def _get_cached(text, target_language, target_language_code):
+    # Перевод любого из бэкендов годится, даже если сейчас его цепь разомкнута
+    cache = get_cache()
+    for backend in router.backends_for(target_language_code):
+        cached = cache.get(_backend_key(backend, text, target_language, target_language_code))
+        if cached is not None:
+            return cached
+    return None
 
-    if response.status_code == 200:
-        return response.json()["choices"][0]["message"]["content"].strip()
-    else:
-        return f"[Error: {response.status_code}]\n{response.text}"
 
+def _put_cached(keys, results):
+    cache = get_cache()
+    for key, result in zip(keys, results):
+        cache.put(key, result)
 
-def detect_language(text):
-    prompt = f"Detect the language of the following text. Reply with a single word (e.g., English, Russian, etc.):\n\n{text}"
-    headers = {
+
+def get_cache_stats():
+    return get_cache().stats()
+
+
+def get_engine_stats():
+    return get_engine().stats()
+
+
+def get_router_stats():
+    return router.stats()
+
+
+def get_rate_limit_stats():
+    return rate_limiter.stats()
+
+
+def prewarm_connections():
+    return prewarm(OPENAI_BASE_URL, google=HAS_GOOGLETRANS)
+
+
+def _translate_google(text, target_language_code, cancel_token=None):
+    try:
+        translator = get_google_translator()
+        with span("google"):
+            result = call_with_retries(
+                translator.translate, text, dest=target_language_code, cancel_token=cancel_token
+            )
+        return result.text
+    except TranslationCancelled:
+        raise
+    except Exception as e:
+        raise TranslationError(f"[Google Translate error] {e}")
+
+
+def _target_label(target_language, target_language_code=None):
+    return f"{target_language} ({target_language_code})" if target_language_code else target_language
+
+
+def _openai_headers():
+    return {
         "Authorization": f"Bearer {OPENAI_API_KEY}",
         "Content-Type": "application/json"
     }
-    payload = {
-        "model": MODEL_NAME,
+
+
+def _chat_payload(system, prompt, model, max_tokens):
+    return {
+        "model": model,
+        "max_tokens": max_tokens,
         "messages": [
-            {"role": "system", "content": "You are a language detector. Reply with a single word (e.g., English, Russian, etc.)."},
+            {"role": "system", "content": system},
             {"role": "user", "content": prompt}
         ]
     }
-    response = requests.post(f"{OPENAI_BASE_URL}/chat/completions", headers=headers, json=payload)
 
-    if response.status_code == 200:
-        return response.json()["choices"][0]["message"]["content"].strip()
-    else:
+
+def _post_chat(payload, stream=False, cancel_token=None):
+    try:
+        response = post_json(
+            OPENAI_BASE_URL, "/chat/completions", _openai_headers(), payload, stream=stream, cancel_token=cancel_token
+        )
+    except RateLimited as e:
+        raise RateLimitError(e.retry_after)
+    except requests.RequestException as e:
+        # Повторы исчерпаны: сервер недоступен или не отвечает
+        raise TranslationError(f"[Connection error] {e}")
+    if response.status_code == 429:
+        # Повторы исчерпаны; тело ответа — не перевод, пользователю его не показываем
+        response.close()
+        raise RateLimitError(retry_after_seconds(response.headers))
+    if response.status_code != 200:
+        error = TranslationError(f"[Error: {response.status_code}]\n{response.text}")
+        response.close()
+        raise error
+    return response
+
+
+def _chat(payload, cancel_token=None):
+    # Обычный (не потоковый) запрос: текст ответа или TranslationError
+    response = _post_chat(payload, cancel_token=cancel_token)
+    try:
+        choice = response.json()["choices"][0]
+        content = choice["message"]["content"]
+    except (ValueError, KeyError, IndexError, TypeError) as e:
+        raise TranslationError(f"[Error] Unexpected API response: {e!r}")
+    if choice.get("finish_reason") == "length":
+        # Ответ упёрся в max_tokens — обрезанный перевод не отдаём и не кэшируем
+        raise TranslationTruncated(f"[Error] Translation truncated at {payload['max_tokens']} tokens")
+    return content
+
+
+def _openai_request(text, target_language, target_language_code=None, source_language=None,
+                    cancel_token=None):
+    # Fallback: OpenAI
+    source_lang = source_language or detect_language(text, cancel_token)
+    prompt = TRANSLATE_PROMPT.format(
+        source=source_lang,
+        target=_target_label(target_language, target_language_code),
+        reference=_memory_context(text, target_language, target_language_code),
+        text=text,
+    )
+    model, max_tokens = model_policy.choose(text)
+    return _chat_payload(TRANSLATE_SYSTEM, prompt, model, max_tokens)
+
+
+def _translate_openai(text, target_language, target_language_code=None, source_language=None,
+                      cancel_token=None):
+    payload = _openai_request(text, target_language, target_language_code, source_language, cancel_token)
+    return _chat(payload, cancel_token).strip()
+
+
+def _stream_openai(text, target_language, target_language_code=None, cancel_token=None):
+    payload = _openai_request(text, target_language, target_language_code, cancel_token=cancel_token)
+    payload["stream"] = True
+    response = _post_chat(payload, stream=True, cancel_token=cancel_token)
+    # Отмена закрывает соединение, и чтение потока сразу прерывается
+    unregister = cancel_token.on_cancel(response.close) if cancel_token is not None else None
+    try:
+        # SSE обычно приходит без charset, а requests тогда считает текст latin-1
+        response.encoding = "utf-8"
+        started = False
+        for line in _iter_sse_lines(response, cancel_token):
+            if not line or not line.startswith("data:"):
+                continue
+            data = line[5:].strip()
+            if data == "[DONE]":
+                break
+            try:
+                choices = json.loads(data).get("choices") or [{}]
+                piece = (choices[0].get("delta") or {}).get("content")
+                finish_reason = choices[0].get("finish_reason")
+            except (ValueError, AttributeError, IndexError) as e:
+                raise TranslationError(f"[Error] Unexpected API response: {e!r}")
+            if finish_reason == "length":
+                # Как в _chat: обрезанный перевод не кэшируем и не сохраняем в историю
+                raise TranslationTruncated(f"[Error] Translation truncated at {payload['max_tokens']} tokens")
+            if not piece:
+                continue
+            if not started:
+                # Как и в обычном режиме, отбрасываем ведущие пробелы и переводы строк
+                piece = piece.lstrip()
+                if not piece:
+                    continue
+                started = True
+            yield piece
+    finally:
+        if unregister:
+            unregister()
+        response.close()
+
+
+def _iter_sse_lines(response, cancel_token):
+    try:
+        for line in response.iter_lines(decode_unicode=True):
+            raise_if_cancelled(cancel_token)
+            yield line
+    except TranslationCancelled:
+        raise
+    except Exception as e:
+        # Ответ закрыли из другого потока — это отмена, а не сетевая ошибка
+        raise_if_cancelled(cancel_token)
+        raise TranslationError(f"[Connection error] {e}")
+    # Закрытый при отмене ответ может просто закончиться без ошибки
+    raise_if_cancelled(cancel_token)
+
+
+def detect_source_language(text, cancel_token=None):
+    """
+    Возвращает (название языка, ISO-код). Сначала локальный детектор,
+    модель — только при низкой уверенности. Код может быть None.
+    """
+    with span("detect_language") as detect_span:
+        code, confidence = language_detector.detect(text)
+        if code and confidence >= DETECT_CONFIDENCE_THRESHOLD:
+            return CODE_TO_NAME[code], code
+        detect_span.set(remote=True)
+        name = _detect_language_remote(text, cancel_token)
+        return name, NAME_TO_CODE.get(name.strip(" .").lower())
+
+
+def detect_language(text, cancel_token=None):
+    return detect_source_language(text, cancel_token)[0]
+
+
+def _detect_language_remote(text, cancel_token=None):
+    # Ответ — одно слово, поэтому всегда быстрая модель
+    payload = _chat_payload(
+        "You are a language detector. Reply with the name of the language in English, a single word.",
+        f"Text:\n\n{text}", model_policy.FAST_MODEL, DETECT_MAX_TOKENS,
+    )
+    try:
+        return _chat(payload, cancel_token).strip()
+    except TranslationError:
         return "Unknown"
 
+
 def save_history(source, target, result):
-    with open("history.txt", "a", encoding="utf-8") as f:
-        f.write(f"[{source} → {target}]\n")
-        f.write(f"Source text:\n{source}\n")
-        f.write(f"Translation:\n{result}\n\n---\n\n")
+    if isinstance(result, ErrorText):
+        return
+    get_memory().add(source, result, _memory_target(target))
+    get_history_store().add(source, target, result)